@@ -88,6 +88,32 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/1.9/topics/cache/
+# The 'classify' cache keeps classification results (project/resultcache.py) for CLASSIFY_CACHE_TIMEOUT seconds.
+# It holds at most CLASSIFY_CACHE_MAX_ENTRIES results per worker process, evicting the least recently used ones
+# when full (the local-memory backend evicts by least recent use since Django 2.1).
+# To keep results across restarts and share them between workers, use the file-based backend:
+# CLASSIFY_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CLASSIFY_CACHE_LOCATION=/tmp/classify-cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'classify': {
+        'BACKEND': os.environ.get('CLASSIFY_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CLASSIFY_CACHE_LOCATION', 'classify'),
+        'TIMEOUT': int(os.environ.get('CLASSIFY_CACHE_TIMEOUT', 7 * 24 * 3600)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CLASSIFY_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+}
+
+# How long the latest revision id of an article is trusted before asking Wikipedia for it again, in seconds
+# Until then, requests for an article that was already classified are answered without any outbound request
+CLASSIFY_REVISION_TIMEOUT = int(os.environ.get('CLASSIFY_REVISION_TIMEOUT', 300))
+
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
 
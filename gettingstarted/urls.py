@@ -11,6 +11,7 @@ import project.views
 
 urlpatterns = [
     url(r'^$', project.views.index, name='index'),
+    url(r'^classify/batch$', project.views.classifyBatch, name='classify_batch'),
     url(r'^classify', project.views.classify, name='classify'),
     url(r'^admin/', admin.site.urls),
 ]
@@ -13,3 +13,8 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gettingstarted.settings")
 from django.core.wsgi import get_wsgi_application
 
 application = get_wsgi_application()
+
+# Load the model now rather than on the first request
+# With gunicorn --preload this runs once in the master process, and the forked workers share the loaded model
+import project.views
+project.views.preloadModel()
@@ -0,0 +1,327 @@
+# benchmark.py
+# Natural Language Processing
+
+# Benchmarks the whole pipeline, without any network access, on the fixture corpus of saved article pages in
+# benchmarks/fixtures: parse (extract), clean and featurize throughput, then for every n-gram size and classifier
+# trainer.py supports, the training time, scoring throughput, accuracy, model file sizes, model load time and peak
+# memory. Each model is trained in a fresh process, so that its peak memory is its own.
+# The results are written as JSON, and can be compared against a stored baseline (benchmarks/baseline.json) to catch
+# regressions. Timings depend on the machine, so a baseline is only meaningful on the machine that recorded it.
+# The manifest records where the fixture pages came from - generated by samplePages, or real articles from
+# trainer.py's corpus file - and so do the results. The checked-in fixtures are generated pages: their text is
+# random words, so the accuracies measured on them say nothing about real articles, and the timings only roughly
+# match real pages. Quote numbers from a run on real fixtures (--fixtures-from) only.
+
+# Usage:
+# python -m project.benchmark                                      run, and write benchmarks/results.json
+# python -m project.benchmark --compare benchmarks/baseline.json   run, and compare against the baseline
+# python -m project.benchmark --output benchmarks/baseline.json    record a new baseline
+# python -m project.benchmark --fixtures-from corpus.sqlite3 12    replace the fixtures with 12 real pages of each
+#                                                                  label from trainer.py's corpus file
+# python -m project.benchmark --sample-fixtures 12                 replace the fixtures with 12 generated pages of each label
+
+import argparse
+import gzip
+import json
+import os
+import pickle
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import nltk
+import numpy
+
+from project import cleaner
+from project import compactmodel
+from project import extractor
+from project import featurizer
+from project import registry
+from project import scorer
+from project import training
+
+fixture_directory = os.path.join('benchmarks', 'fixtures')
+manifest_name = 'manifest.json'
+default_output = os.path.join('benchmarks', 'results.json')
+
+ngram_sizes = [1, 2, 3, 4]
+
+# Words for the generated fixture pages: the labels share the common words, and each has words of its own
+common_words = ['the', 'of', 'and', 'in', 'was', 'a', 'to', 'is', 'by', 'with', 'for', 'its', 'as', 'from']
+label_words = {
+    'Good': ['river', 'moon', 'orbit', 'century', 'population', 'crater', 'basin', 'dynasty', 'treaty', 'species',
+             'observed', 'located', 'described', 'measured', 'Zürich', 'naïve'],
+    'Bad': ['company', 'founded', 'award', 'leading', 'provider', 'innovative', 'solutions', 'customers', 'platform',
+            'world-class', 'premier', 'passionate', 'award-winning', 'clients', 'résumé', 'renowned'],
+}
+
+# The categories trainer.py downloads the articles of each label from
+corpus_categories = {
+    'Good': 'Featured articles',
+    'Bad': 'Articles with a promotional tone from November 2017',
+}
+
+# Metrics where a larger value is better - for every other metric, smaller is better
+def higherIsBetter(name):
+    return name.endswith('_per_s') or name == 'accuracy'
+
+# Changes smaller than these, for metrics with these units, are noise rather than regressions
+noise_floors = {'_ms': 5.0, '_s': 0.05, '_mb': 5.0}
+
+def noiseFloor(name):
+    for suffix, floor in noise_floors.items():
+        if name.endswith(suffix) and not name.endswith('_per_s'):
+            return floor
+    return 0
+
+# Where fixture pages came from
+fixture_sources = ['generated', 'corpus']
+
+# Where the fixture pages came from: one of fixture_sources, 'mixed', or 'unknown' for fixtures written before the
+# manifest recorded it
+def fixtureSource(directory=fixture_directory):
+    with open(os.path.join(directory, manifest_name)) as file:
+        sources = set(entry.get('source', 'unknown') for entry in json.load(file))
+    return sources.pop() if len(sources) == 1 else 'mixed'
+
+# The fixture pages, as (page bytes, label) tuples, in manifest order
+def loadFixtures(directory=fixture_directory):
+    with open(os.path.join(directory, manifest_name)) as file:
+        manifest = json.load(file)
+    fixtures = []
+    for entry in manifest:
+        with gzip.open(os.path.join(directory, entry['file']), 'rb') as file:
+            fixtures.append((file.read(), entry['label']))
+    return fixtures
+
+# Replace the fixtures with pages (as (page bytes or string, label) tuples), gzipped, and a manifest of their labels
+# and source (one of fixture_sources)
+def writeFixtures(pages, source, directory=fixture_directory):
+    if source not in fixture_sources:
+        raise ValueError('Unrecognized fixture source ' + repr(source) + ', use one of ' + ', '.join(fixture_sources))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for name in os.listdir(directory):
+        if name.endswith('.html.gz') or name == manifest_name:
+            os.remove(os.path.join(directory, name))
+    manifest = []
+    for number, (page, label) in enumerate(pages):
+        if not isinstance(page, bytes):
+            page = page.encode('utf-8')
+        name = '%s_%03d.html.gz' % (label.lower(), number)
+        # mtime=0 keeps the files the same from one run to the next
+        with open(os.path.join(directory, name), 'wb') as file:
+            with gzip.GzipFile(fileobj=file, mode='wb', mtime=0) as compressed:
+                compressed.write(page)
+        manifest.append({'file': name, 'label': label, 'source': source})
+    with open(os.path.join(directory, manifest_name), 'w') as file:
+        json.dump(manifest, file, indent=1)
+
+# Generated pages of each label, alternating between the labels
+def samplePages(count):
+    random.seed(0)
+    pages = []
+    for i in range(count):
+        for label in sorted(label_words):
+            pages.append((extractor.samplePage(8, common_words * 2 + label_words[label]), label))
+    return pages
+
+# Real pages of each label from a corpus file written by trainer.py, alternating between the labels
+def corpusPages(path, count):
+    from project.corpus import Corpus
+    corpus = Corpus(path)
+    pages = []
+    members = dict((label, corpus.categoryMembers(category)[:count]) for label, category in corpus_categories.items())
+    for i in range(count):
+        for label in sorted(members):
+            if i < len(members[label]):
+                pages.append((corpus.article(members[label][i])['html'], label))
+    corpus.close()
+    return pages
+
+# Peak resident memory of this process, in MB
+def peakRss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == 'darwin':
+        return peak / (1024.0 * 1024.0)
+    return peak / 1024.0
+
+# Time a function over every item, returning its results and the number of items per second
+# The items are gone over again until min_time seconds have passed, so that fast stages are timed over more than
+# a few milliseconds
+def throughput(function, items, min_time=0.2):
+    rounds = 0
+    start = time.time()
+    while True:
+        results = [function(item) for item in items]
+        rounds += 1
+        elapsed = time.time() - start
+        if elapsed >= min_time:
+            return results, rounds * len(items) / elapsed
+
+# Train one model and measure it - run in a fresh process for each model
+# train and test are lists of (cleaned text, label) tuples
+def benchmarkModel(kind, ngram_size, train, test):
+    word_mincount, word_maxcount, bigram_mincount = training.featureLimits(kind)
+    featurize = lambda text: featurizer.articleFeatures(text, [ngram_size], word_mincount, word_maxcount, bigram_mincount)
+    train_set = [(featurize(text), label) for text, label in train]
+    test_set = [(featurize(text), label) for text, label in test]
+    result = measureModel(kind, '%s_%dgram' % (kind, ngram_size), train_set, test_set)
+    result['peak_rss_mb'] = peakRss()
+    return result
+
+# Train a model on labeled featuresets and measure its training time, file sizes, load time, scoring throughput
+# and accuracy on the test featuresets
+# name is the model's filename without its extension, which tells the registry how to load it
+# If training fails, the result only holds the error
+def measureModel(kind, name, train_set, test_set):
+    result = {}
+    start = time.time()
+    try:
+        classifier = training.train(kind, train_set)
+    except (OverflowError, ValueError, MemoryError) as error:
+        return {'error': type(error).__name__ + ': ' + str(error)}
+    result['train_s'] = time.time() - start
+
+    directory = tempfile.mkdtemp()
+    pickle_path = os.path.join(directory, name + '.pickle')
+    with open(pickle_path, 'wb') as file:
+        pickle.dump(classifier, file)
+    result['pickle_bytes'] = os.path.getsize(pickle_path)
+    model_path = pickle_path
+    if compactmodel.isCompactable(classifier):
+        model_path = compactmodel.compactPath(pickle_path)
+        compactmodel.exportClassifier(classifier, model_path)
+        result['compact_bytes'] = os.path.getsize(model_path)
+
+    # Load the file the Web front-end would load, the way it loads it
+    start = time.time()
+    model = registry.loadModel(model_path)
+    if hasattr(model, 'prepare'):
+        model.prepare()
+    result['load_ms'] = 1000 * (time.time() - start)
+
+    # The test articles are scored one at a time, like the Web front-end scores them
+    featuresets = [featureset for featureset, label in test_set]
+    if isinstance(model, compactmodel.CompactClassifier):
+        labels, rate = throughput(lambda featureset: scorer.classify(model, [featureset])[0], featuresets)
+    else:
+        labels, rate = throughput(model.classify, featuresets)
+    result['score_articles_per_s'] = rate
+    result['accuracy'] = sum(label == expected for label, (featureset, expected) in zip(labels, test_set)) / float(len(test_set))
+
+    for path in (pickle_path, model_path):
+        if os.path.exists(path):
+            os.remove(path)
+    os.rmdir(directory)
+    return result
+
+# Run the whole benchmark on fixture pages, given as (page bytes, label) tuples, which came from source (see
+# fixtureSource)
+def runBenchmark(fixtures, kinds=training.classifier_kinds, sizes=ngram_sizes, source='unknown', log=sys.stderr):
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': numpy.__version__,
+            'nltk': nltk.__version__,
+        },
+        'fixtures': {'pages': len(fixtures), 'bytes': sum(len(page) for page, label in fixtures), 'source': source},
+    }
+
+    texts, parse_rate = throughput(extractor.contentText, [page for page, label in fixtures])
+    texts, clean_rate = throughput(cleaner.cleanArticle, texts)
+    results['stages'] = {'parse_pages_per_s': parse_rate, 'clean_pages_per_s': clean_rate}
+    results['featurize'] = {}
+    for size in sizes:
+        featuresets, rate = throughput(lambda text: featurizer.articleFeatures(text, [size]), texts)
+        results['featurize'][str(size) + 'gram'] = {'featurize_pages_per_s': rate}
+
+    # Every other page of each label is for training, the rest for testing
+    labeled = list(zip(texts, [label for page, label in fixtures]))
+    train, test = [], []
+    seen = {}
+    for text, label in labeled:
+        (train if seen.get(label, 0) % 2 == 0 else test).append((text, label))
+        seen[label] = seen.get(label, 0) + 1
+
+    results['models'] = {}
+    for kind in kinds:
+        for size in sizes:
+            name = '%s_%dgram' % (kind, size)
+            log.write('Benchmarking ' + name + '...\n')
+            log.flush()
+            with featurizer.poolContext().Pool(1) as pool:
+                results['models'][name] = pool.apply(benchmarkModel, (kind, size, train, test))
+    return results
+
+# The numeric metrics of a results dict, keyed by their path, e.g. 'models.bayes_2gram.train_s'
+def flatten(results, prefix=''):
+    metrics = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            metrics.update(flatten(value, prefix + key + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[prefix + key] = value
+    return metrics
+
+# The metrics that got worse than the baseline by more than the tolerance (a fraction, e.g. 0.2 for 20%),
+# as (path, baseline value, new value) tuples
+# Timings and memory also have to have changed by more than their noise floor
+# The fixture corpus is described by counts, not measured, so it is left out
+def regressions(baseline, results, tolerance):
+    old = flatten(baseline)
+    new = flatten(results)
+    worse = []
+    for path in sorted(set(old) & set(new)):
+        if path.startswith('fixtures.'):
+            continue
+        name = path.rsplit('.', 1)[-1]
+        if higherIsBetter(name):
+            regressed = new[path] < old[path] * (1 - tolerance)
+        else:
+            regressed = new[path] > old[path] * (1 + tolerance) and new[path] - old[path] > noiseFloor(name)
+        if regressed:
+            worse.append((path, old[path], new[path]))
+    return worse
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks parsing, cleaning, featurizing, training and scoring on the fixture corpus.')
+    parser.add_argument('--output', default=default_output, metavar='FILE', help='where to write the results (default ' + default_output + ')')
+    parser.add_argument('--compare', metavar='FILE', help='a baseline results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, metavar='F', help='how much worse than the baseline a metric may get, as a fraction (default 0.25)')
+    parser.add_argument('--classifiers', nargs='+', default=training.classifier_kinds, choices=training.classifier_kinds, help='the classifiers to benchmark (default all)')
+    parser.add_argument('--ngram-sizes', nargs='+', type=int, default=ngram_sizes, choices=ngram_sizes, help='the n-gram sizes to benchmark (default all)')
+    parser.add_argument('--fixtures-from', nargs=2, metavar=('CORPUS', 'N'), help='replace the fixtures with N pages of each label from a corpus file')
+    parser.add_argument('--sample-fixtures', type=int, metavar='N', help='replace the fixtures with N generated pages of each label')
+    args = parser.parse_args()
+
+    if args.fixtures_from:
+        writeFixtures(corpusPages(args.fixtures_from[0], int(args.fixtures_from[1])), 'corpus')
+    elif args.sample_fixtures:
+        writeFixtures(samplePages(args.sample_fixtures), 'generated')
+
+    source = fixtureSource()
+    if source != 'corpus':
+        sys.stderr.write('Warning - the fixtures are ' + source + ' pages, not real articles: the accuracies say nothing about real articles and the timings only roughly match them. Use --fixtures-from for numbers to quote.\n')
+    results = runBenchmark(loadFixtures(), args.classifiers, args.ngram_sizes, source)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=1, sort_keys=True)
+    sys.stdout.write('Results written to ' + args.output + '\n')
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        baseline_source = baseline.get('fixtures', {}).get('source', 'unknown')
+        if baseline_source != source:
+            sys.stdout.write('Warning - the baseline was recorded on ' + baseline_source + ' fixtures, these results on ' + source + ' fixtures\n')
+        worse = regressions(baseline, results, args.tolerance)
+        for path, old, new in worse:
+            sys.stdout.write('REGRESSION %s: %.4g -> %.4g\n' % (path, old, new))
+        sys.stdout.write('%d regressions against %s\n' % (len(worse), args.compare))
+        if worse:
+            sys.exit(1)
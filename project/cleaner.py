@@ -0,0 +1,123 @@
+# cleaner.py
+# Natural Language Processing
+
+# Cleans punctuation, Wikipedia template messages and references out of an article text, for both trainer.py and
+# the Web front-end.
+# The template messages are removed one at a time, in the same order as always, by str.replace - removing one can
+# join the text around it into a later message, so a combined regex over several messages would miss some. The
+# references are removed by one compiled regex, and ASCII texts have their punctuation removed by a single
+# str.translate pass, which only has a fast path for ASCII.
+# The speed was only compared on generated texts (see below), not on a corpus of real articles.
+
+# Usage, to check the output is the same as the one-replace-per-pass version and compare speed:
+# python -m project.cleaner
+
+import pickle
+import random
+import re
+import sys
+import time
+
+# The promotional articles already contain these template messages.
+# They are parsed out because it would bias the training set to expect these alerts to appear in any random article.
+# Articles in question may not be marked with these template messages, so they are removed from the training input.
+ad_message = 'This article contains content that is written like an advertisement.'
+template_message = 'This article contains content that is written like an advertisement. Please help improve it by removing promotional content and inappropriate external links, and by adding encyclopedic content written from a neutral point of view.'
+template_message_part = '(Learn how and when to remove this template message)'
+date_message = '(November 2017)'
+interesting_template_message = "This article may have been created or edited in return for undisclosed payments, a violation of Wikipedia's terms of use. It may require cleanup to comply with Wikipedia's content policies."
+another_interesting_template_message = "This article reads like a press release or a news article or is entirely based on routine coverage. Please expand this article with properly sourced content to meet Wikipedia's quality standards, event notability guideline, or encyclopedic content policy."
+bio_template_message = "This biographical article is written like a résumé. Please help improve it by revising it to be neutral and encyclopedic."
+multiple_issues = "This article has multiple issues. Please help improve it or discuss these issues on the talk page. "
+autobio_template_message = "This article is an autobiography or has been extensively edited by the subject or by someone connected to the subject."
+yet_another_template_message = "A major contributor to this article appears to have a close connection with its subject."
+catch_all = "This article"
+
+# The messages in the order they are removed
+template_messages = [
+    template_message,
+    ad_message,
+    template_message_part,
+    date_message,
+    interesting_template_message,
+    another_interesting_template_message,
+    bio_template_message,
+    multiple_issues,
+    autobio_template_message,
+    yet_another_template_message,
+    catch_all,
+]
+
+# This is a reference regex. Wikipedia articles contain references in the form of: [1] which need to be removed
+reference_regex = re.compile(r"\[[0-9]+\]")
+
+# Newlines become spaces, and commas, full stops and semicolons are removed
+punctuation = str.maketrans({'\n': ' ', ',': None, '.': None, ';': None})
+
+# Function to clean punctuation and Wikipedia template messages and references out of an article text
+def cleanArticle(article):
+    for message in template_messages:
+        article = article.replace(message, '')
+    article = reference_regex.sub('', article)
+
+    # Escaped newlines ("\n" as two characters, left in texts that were extracted from the str() of the response bytes) become
+    # spaces before the punctuation is removed, so that removing a full stop can't create a new one
+    article = article.replace("\\n", " ")
+    # (str.isascii is new in Python 3.7, older versions always take the replace() path)
+    if hasattr(article, 'isascii') and article.isascii():
+        return article.translate(punctuation)
+    return article.replace("\n", " ").replace(",", "").replace(".", "").replace(";", "")
+
+# The previous version of cleanArticle, one pass over the text per replacement, kept to check against
+def cleanArticleByPasses(article):
+    for message in template_messages:
+        article = article.replace(message, '')
+    article = re.sub(r"(\[[0-9]+\])", "", article)
+    article = article.replace("\n", " ")
+    article = article.replace("\\n", " ")
+    article = article.replace(",", "")
+    article = article.replace(".", "")
+    article = article.replace(";", "")
+    return article
+
+# An article-like text for the benchmark - the given words in sentences, with references, newlines (real and
+# escaped) and template messages mixed in
+def sampleArticle(words, length):
+    pieces = []
+    for i in range(length):
+        pieces.append(random.choice(words))
+        roll = random.random()
+        if roll < 0.05:
+            pieces.append(',')
+        elif roll < 0.1:
+            pieces.append('.[' + str(random.randint(1, 200)) + ']')
+        elif roll < 0.12:
+            pieces.append(random.choice(['.\n', '.\\n\\n', ';']))
+        elif roll < 0.125:
+            pieces.append(' ' + random.choice(template_messages))
+    return ' '.join(pieces)
+
+if __name__ == '__main__':
+    # Real article words: the n-grams of a trained maxent model, if one is given
+    words = ['article', 'company', 'founded', 'award', 'leading', 'Wikipedia', 'This', 'innovative', 'solutions', 'résumé']
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as file:
+            classifier = pickle.load(file)
+        words = sorted(set(fname for fname, fval, label in classifier._encoding._mapping if fname != 'article_length'))
+    random.seed(0)
+    articles = [sampleArticle(words, 5000) for i in range(100)]
+
+    # Texts parsed from the str() of the response bytes are ASCII, with escapes for everything else
+    for kind, texts in (('unicode', articles), ('ascii', [article.encode('ascii', 'backslashreplace').decode('ascii') for article in articles])):
+        mismatches = sum(cleanArticle(text) != cleanArticleByPasses(text) for text in texts)
+        start = time.time()
+        for text in texts:
+            cleanArticleByPasses(text)
+        passes_time = time.time() - start
+        start = time.time()
+        for text in texts:
+            cleanArticle(text)
+        compiled_time = time.time() - start
+        sys.stdout.write(kind + ': ' + str(mismatches) + ' mismatches in ' + str(len(texts)) + ' articles\n')
+        sys.stdout.write('  per article: one pass per replacement %.3f ms, compiled %.3f ms\n' % (
+            1000 * passes_time / len(texts), 1000 * compiled_time / len(texts)))
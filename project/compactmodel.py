@@ -0,0 +1,431 @@
+# compactmodel.py
+# Natural Language Processing
+
+# A compact binary model format that replaces pickled NLTK classifiers.
+# A pickled classifier is a tree of Python dicts keyed by (fname, fval, label) tuples, which is slow to load and
+# takes a lot of memory. A compact model file instead holds a sorted string table of feature names plus flat
+# NumPy weight arrays. The arrays are opened with numpy.memmap, so loading a model costs next to nothing and every
+# worker process shares one page-cached copy of the file.
+
+# File layout:
+# 8 byte magic string, 8 byte little-endian header length, a JSON header, then the arrays.
+# The header records the classifier kind, its labels and each array's dtype, shape and offset in the file.
+# Arrays start on 64 byte boundaries.
+
+# Both kinds of model have the same two tables:
+# The name table - every feature name (n-gram), sorted, as one NUL-separated UTF-8 blob plus byte offsets
+# The pair table - one sorted 64-bit key per (feature name, feature value) pair: the name's row in the high
+# 32 bits, and the value offset by 2^31 in the low 32 bits
+# Weights are stored per pair table row and per label. Scoring is done by scorer.py.
+
+# Usage, to convert pickled models trained by trainer.py:
+# python -m project.compactmodel models/bayes_2gram.pickle maxent_3gram100.pickle
+
+import json
+import os
+import pickle
+import struct
+import sys
+
+import numpy
+
+magic = b'WPCDMDL1'
+
+# Bumped whenever the layout changes - older files have to be converted again
+format_version = 2
+
+# Arrays are aligned to this many bytes inside the file
+alignment = 64
+
+# Feature values are stored in 32 bits, offset so that they are never negative
+# The lowest value stands in for None (Naive Bayes uses it for "feature not present in the article")
+value_bias = 2 ** 31
+none_value = -value_bias
+
+# Log probability NLTK uses for impossible events
+negative_infinity = -1e300
+
+# How many of the most informative features are ranked when a model is exported, and kept in its header
+informative_feature_count = 100
+
+# Pack strings into one NUL-separated UTF-8 blob plus an array of offsets
+def stringTable(strings):
+    encoded = []
+    for string in strings:
+        if '\x00' in string:
+            raise ValueError('Compact models cannot hold feature names containing NUL characters')
+        encoded.append(string.encode('utf-8'))
+    offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+    offsets[1:] = numpy.cumsum([len(e) + 1 for e in encoded])
+    return numpy.frombuffer(b''.join(e + b'\x00' for e in encoded), dtype=numpy.uint8), offsets
+
+# Check a feature value fits in the pair table
+def encodeValue(fval):
+    if fval is None:
+        return none_value
+    if not isinstance(fval, int) or not none_value < fval < value_bias:
+        raise ValueError('Compact models only support 32-bit integer feature values, got ' + repr(fval))
+    return fval
+
+def decodeValue(value):
+    value = int(value)
+    if value == none_value:
+        return None
+    return value
+
+# Pair table keys for arrays of name rows and values
+def pairKeys(rows, values):
+    rows = numpy.asarray(rows, dtype=numpy.int64)
+    values = numpy.asarray(values, dtype=numpy.int64)
+    return (rows.astype(numpy.uint64) << numpy.uint64(32)) | (values + value_bias).astype(numpy.uint64)
+
+# Sort the name table, and build the pair table
+# names: list of feature names, pairs: list of (name index, value)
+# Returns the tables and the order of the pairs, so callers can sort their per-pair data to match
+def buildTables(names, pairs):
+    name_order = sorted(range(len(names)), key=names.__getitem__)
+    name_rank = numpy.empty(len(names), dtype=numpy.int64)
+    name_rank[name_order] = numpy.arange(len(names))
+
+    pair_keys = pairKeys([name_rank[n] for n, fval in pairs], [encodeValue(fval) for n, fval in pairs])
+    pair_order = numpy.argsort(pair_keys, kind='stable')
+    name_blob, name_offsets = stringTable([names[i] for i in name_order])
+
+    arrays = {
+        'name_blob': name_blob,
+        'name_offsets': name_offsets,
+        'pair_keys': pair_keys[pair_order],
+    }
+    return arrays, name_order, pair_order
+
+# Flatten a trained NLTK MaxentClassifier into arrays
+def maxentArrays(classifier):
+    encoding = classifier._encoding
+    if getattr(encoding, '_unseen', None):
+        raise ValueError('Compact models do not support maxent unseen-value features')
+    if not classifier._logarithmic:
+        raise ValueError('Compact models only support logarithmic maxent weights')
+    labels = list(encoding.labels())
+    label_index = dict((label, i) for i, label in enumerate(labels))
+    weights = numpy.asarray(classifier._weights, dtype=numpy.float64)
+
+    # Every (fname, fval) pair becomes one row, with one weight per label
+    names = []
+    name_index = {}
+    pairs = []
+    pair_index = {}
+    joint = []
+    for (fname, fval, label), fid in encoding._mapping.items():
+        if fname not in name_index:
+            name_index[fname] = len(names)
+            names.append(fname)
+        pair = (name_index[fname], fval)
+        if pair not in pair_index:
+            pair_index[pair] = len(pairs)
+            pairs.append(pair)
+        joint.append((pair_index[pair], label_index[label], fid))
+
+    pair_weights = numpy.zeros((len(pairs), len(labels)), dtype=numpy.float64)
+    pair_active = numpy.zeros((len(pairs), len(labels)), dtype=numpy.uint8)
+    for row, column, fid in joint:
+        pair_weights[row, column] = weights[fid]
+        pair_active[row, column] = 1
+
+    arrays, name_order, pair_order = buildTables(names, pairs)
+    arrays['pair_weights'] = pair_weights[pair_order]
+    arrays['pair_active'] = pair_active[pair_order]
+
+    # Always-on features add a weight for their label to every article
+    alwayson = numpy.zeros(len(labels), dtype=numpy.float64)
+    if getattr(encoding, '_alwayson', None):
+        for label, fid in encoding._alwayson.items():
+            alwayson[label_index[label]] = weights[fid]
+    arrays['alwayson'] = alwayson
+
+    # GIS models have a correction feature, whose value is C minus the number of active features
+    meta = {'alwayson': bool(getattr(encoding, '_alwayson', None))}
+    if hasattr(encoding, '_C'):
+        meta['correction_constant'] = encoding._C
+        meta['correction_weight'] = float(weights[encoding._length])
+    return labels, arrays, meta
+
+# Flatten a trained NLTK NaiveBayesClassifier into arrays
+# Log probabilities are base 2, like NLTK's
+def bayesArrays(classifier):
+    labels = list(classifier._labels)
+    label_index = dict((label, i) for i, label in enumerate(labels))
+    unseen = object()
+
+    names = []
+    name_index = {}
+    for label, fname in classifier._feature_probdist:
+        if fname not in name_index:
+            name_index[fname] = len(names)
+            names.append(fname)
+
+    # The log probability of a value this feature never had in training, per label
+    name_default = numpy.full((len(names), len(labels)), negative_infinity, dtype=numpy.float64)
+    pairs = []
+    pair_index = {}
+    samples = {}
+    for (label, fname), probdist in classifier._feature_probdist.items():
+        n = name_index[fname]
+        name_default[n, label_index[label]] = probdist.logprob(unseen)
+        samples[label, fname] = set(probdist.samples())
+        for fval in samples[label, fname]:
+            pair = (n, fval)
+            if pair not in pair_index:
+                pair_index[pair] = len(pairs)
+                pairs.append(pair)
+
+    # Each pair's log probability under each label, and whether the pair was seen with that label
+    pair_logprob = numpy.full((len(pairs), len(labels)), negative_infinity, dtype=numpy.float64)
+    pair_seen = numpy.zeros((len(pairs), len(labels)), dtype=numpy.uint8)
+    for row, (n, fval) in enumerate(pairs):
+        fname = names[n]
+        for label, column in label_index.items():
+            probdist = classifier._feature_probdist.get((label, fname))
+            if probdist is None:
+                continue
+            pair_logprob[row, column] = probdist.logprob(fval)
+            if fval in samples[label, fname]:
+                pair_seen[row, column] = 1
+
+    arrays, name_order, pair_order = buildTables(names, pairs)
+    arrays['name_default'] = name_default[name_order]
+    arrays['pair_logprob'] = pair_logprob[pair_order]
+    arrays['pair_seen'] = pair_seen[pair_order]
+    arrays['prior'] = numpy.array([classifier._label_probdist.logprob(label) for label in labels], dtype=numpy.float64)
+    return labels, arrays, {}
+
+# Write arrays to a compact model file
+def writeModel(path, kind, labels, arrays, meta):
+    header = {'version': format_version, 'kind': kind, 'labels': labels, 'meta': meta, 'arrays': {}}
+    names = sorted(arrays)
+
+    # The header size decides where the arrays start, so lay out the offsets relative to the data section first
+    offset = 0
+    for name in names:
+        array = numpy.ascontiguousarray(arrays[name])
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+        offset += -offset % alignment
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    data_start = len(magic) + 8 + len(header_bytes)
+    data_start += -data_start % alignment
+    header['data_start'] = data_start
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+
+    # Adding data_start to the header may have pushed the arrays past the next boundary
+    while len(magic) + 8 + len(header_bytes) > data_start:
+        data_start += alignment
+        header['data_start'] = data_start
+        header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+
+    # Write to a temporary file first, so a running server never sees a half-written model
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(magic)
+        file.write(struct.pack('<Q', len(header_bytes)))
+        file.write(header_bytes)
+        for name in names:
+            array = numpy.ascontiguousarray(arrays[name])
+            file.write(b'\x00' * (data_start + header['arrays'][name]['offset'] - file.tell()))
+            file.write(array.tobytes())
+    os.replace(temp_path, path)
+
+# Read a compact model file - the arrays are memory-mapped, not read
+def readModel(path):
+    with open(path, 'rb') as file:
+        if file.read(len(magic)) != magic:
+            raise ValueError(path + ' is not a compact model file')
+        header_length = struct.unpack('<Q', file.read(8))[0]
+        header = json.loads(file.read(header_length).decode('utf-8'))
+    if header['version'] != format_version:
+        raise ValueError(path + ' is an older compact model file, convert the pickled model again')
+    arrays = {}
+    for name, info in header['arrays'].items():
+        shape = tuple(info['shape'])
+        if numpy.prod(shape) == 0:
+            arrays[name] = numpy.zeros(shape, dtype=info['dtype'])
+        else:
+            arrays[name] = numpy.memmap(path, dtype=info['dtype'], mode='r', offset=header['data_start'] + info['offset'], shape=shape)
+    return header, arrays
+
+# Shared parts of the compact classifiers
+class CompactClassifier(object):
+    def __init__(self, labels, arrays, meta):
+        self._labels = list(labels)
+        self._arrays = arrays
+        self._meta = meta
+
+    def labels(self):
+        return self._labels
+
+    # Name of the feature in a row of the name table
+    def featureName(self, row):
+        offsets = self._arrays['name_offsets']
+        return bytes(self._arrays['name_blob'][offsets[row]:offsets[row + 1] - 1]).decode('utf-8')
+
+    # (name, value) of the feature in a row of the pair table
+    def feature(self, row):
+        key = int(self._arrays['pair_keys'][row])
+        return self.featureName(key >> 32), decodeValue((key & 0xffffffff) - value_bias)
+
+    # Dict from feature name to its row in the name table, used by the scorer to look up features
+    # Python caches the hash of every string, so looking up the n-grams of an article in a dict is much cheaper
+    # than hashing or searching for them again. The dict is built once per process, on first use.
+    def nameIndex(self):
+        index = getattr(self, '_name_index', None)
+        if index is None:
+            names = bytes(self._arrays['name_blob']).decode('utf-8').split('\x00')[:-1]
+            index = dict(zip(names, range(len(names))))
+            self._name_index = index
+        return index
+
+    # The n most informative features, as dicts of the feature name, its value, the label it points to, and its
+    # weight: how much it adds to the log odds of that label (the weight NLTK shows for maxent, the natural log of the
+    # likelihood ratio for Naive Bayes)
+    # Exported models keep the top informative_feature_count in their header; otherwise they are ranked once, on
+    # first use, so callers never sort the weights per request
+    def informativeFeatures(self, n=10):
+        features = getattr(self, '_informative_features', None)
+        if features is None or len(features) < min(n, informative_feature_count):
+            features = self._meta.get('informative_features')
+            if features is None or len(features) < min(n, informative_feature_count):
+                features = self.rankInformativeFeatures(max(n, informative_feature_count))
+            self._informative_features = features
+        return features[:n]
+
+    # The extractor version of the model's training texts (see extractor.version) - 0 for models from before it was
+    # recorded
+    def textVersion(self):
+        return self._meta.get('text_version', 0)
+
+    # Build the name index and the informative feature list ahead of time, e.g. before the server forks its workers
+    def prepare(self):
+        self.nameIndex()
+        self.informativeFeatures(informative_feature_count)
+
+    # Probability of each label for an article's featureset
+    def probabilities(self, featureset):
+        from project import scorer
+        return scorer.probabilities(self, [featureset])[0]
+
+    # The most likely label for an article's featureset
+    def classify(self, featureset):
+        from project import scorer
+        return scorer.classify(self, [featureset])[0]
+
+# Compact form of nltk.MaxentClassifier
+class CompactMaxentClassifier(CompactClassifier):
+    kind = 'maxent'
+
+    # Joint features (pair table row, label column) ranked by the absolute value of their weight
+    def most_informative_features(self, n=10):
+        if not hasattr(self, '_most_informative_features'):
+            weights = numpy.abs(numpy.asarray(self._arrays['pair_weights'])).ravel()
+            active = numpy.flatnonzero(numpy.asarray(self._arrays['pair_active']).ravel())
+            ranked = active[numpy.argsort(-weights[active], kind='stable')]
+            self._most_informative_features = [divmod(int(i), len(self._labels)) for i in ranked]
+        return self._most_informative_features[:n]
+
+    # Prints the same lines as nltk.MaxentClassifier.show_most_informative_features
+    def show_most_informative_features(self, n=10):
+        for row, column in self.most_informative_features(n):
+            fname, fval = self.feature(row)
+            print('%8.3f %s==%r and label is %r' % (self._arrays['pair_weights'][row, column], fname, fval, self._labels[column]))
+
+    def rankInformativeFeatures(self, n):
+        features = []
+        for row, column in self.most_informative_features(n):
+            fname, fval = self.feature(row)
+            features.append({'feature': fname, 'value': fval, 'label': self._labels[column], 'weight': float(self._arrays['pair_weights'][row, column])})
+        return features
+
+# Compact form of nltk.NaiveBayesClassifier
+class CompactNaiveBayesClassifier(CompactClassifier):
+    kind = 'bayes'
+
+    # (name, value) features ranked the way nltk.NaiveBayesClassifier ranks them:
+    # by the ratio of their lowest to highest probability among the labels they were seen with
+    def most_informative_features(self, n=100):
+        if not hasattr(self, '_most_informative_features'):
+            logprob = numpy.asarray(self._arrays['pair_logprob'])
+            seen = numpy.asarray(self._arrays['pair_seen']).astype(bool)
+            maxlog = numpy.where(seen, logprob, -numpy.inf).max(axis=1)
+            minlog = numpy.where(seen, logprob, numpy.inf).min(axis=1)
+            ratio = numpy.exp2(minlog - maxlog)
+            features = []
+            for row in numpy.flatnonzero(minlog > negative_infinity):
+                fname, fval = self.feature(row)
+                features.append((ratio[row], fname, fval in [None, False, True], str(fval).lower(), fval, row))
+            features.sort(key=lambda f: f[:4])
+            self._most_informative_features = [(f[1], f[4]) for f in features]
+            self._most_informative_rows = [f[5] for f in features]
+        return self._most_informative_features[:n]
+
+    # The label each feature points to is the one it is most likely under, and its weight is the log of the ratio
+    # nltk.NaiveBayesClassifier.show_most_informative_features prints
+    def rankInformativeFeatures(self, n):
+        logprob = numpy.asarray(self._arrays['pair_logprob'])
+        seen = numpy.asarray(self._arrays['pair_seen']).astype(bool)
+        features = []
+        for (fname, fval), row in zip(self.most_informative_features(n), self._most_informative_rows):
+            seen_logprob = logprob[row][seen[row]]
+            column = numpy.flatnonzero(seen[row])[numpy.argmax(seen_logprob)]
+            weight = float((seen_logprob.max() - seen_logprob.min()) * numpy.log(2))
+            features.append({'feature': fname, 'value': fval, 'label': self._labels[column], 'weight': weight})
+        return features
+
+kinds = {
+    'maxent': CompactMaxentClassifier,
+    'bayes': CompactNaiveBayesClassifier,
+}
+
+# Build an in-memory compact classifier from a trained NLTK classifier
+def fromClassifier(classifier):
+    kind, labels, arrays, meta = classifierArrays(classifier)
+    return kinds[kind](labels, arrays, meta)
+
+# Only maxent and Naive Bayes models can be made compact
+def isCompactable(classifier):
+    return type(classifier).__name__ in ('MaxentClassifier', 'NaiveBayesClassifier')
+
+# Flatten a trained NLTK classifier
+# The extractor version of its training texts (the text_version trainer.py sets on it) goes in the header
+def classifierArrays(classifier):
+    name = type(classifier).__name__
+    if name == 'MaxentClassifier':
+        kind, (labels, arrays, meta) = 'maxent', maxentArrays(classifier)
+    elif name == 'NaiveBayesClassifier':
+        kind, (labels, arrays, meta) = 'bayes', bayesArrays(classifier)
+    else:
+        raise ValueError('Cannot make a compact model out of a ' + name)
+    meta['text_version'] = getattr(classifier, 'text_version', 0)
+    return kind, labels, arrays, meta
+
+# Save a trained NLTK classifier as a compact model file, with its most informative features ranked in the header
+def exportClassifier(classifier, path):
+    kind, labels, arrays, meta = classifierArrays(classifier)
+    meta['informative_features'] = kinds[kind](labels, arrays, meta).informativeFeatures(informative_feature_count)
+    writeModel(path, kind, labels, arrays, meta)
+
+# Load a compact model file
+def loadModel(path):
+    header, arrays = readModel(path)
+    return kinds[header['kind']](header['labels'], arrays, header['meta'])
+
+# Filename of the compact model to write for a pickled model
+def compactPath(path):
+    return os.path.splitext(path)[0] + '.model'
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Error - Needs the pickled model files to convert.')
+        sys.exit(1)
+    for pickle_path in sys.argv[1:]:
+        with open(pickle_path, 'rb') as file:
+            classifier = pickle.load(file)
+        exportClassifier(classifier, compactPath(pickle_path))
+        sys.stdout.write(pickle_path + ' -> ' + compactPath(pickle_path) + '\n')
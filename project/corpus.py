@@ -0,0 +1,116 @@
+# corpus.py
+# Natural Language Processing
+
+# A local store of downloaded Wikipedia articles, so that retraining doesn't have to download them again.
+# Articles are kept in an SQLite file, keyed by pageid and revision id, with their raw HTML and their cleaned
+# text (both zlib-compressed). The members of each training category are kept too, in the order the API listed
+# them, so that trainer.py can run entirely from the store without network access (--from-cache).
+# Each text records the version of the extractor that produced it, so that texts can be extracted again from the
+# stored HTML when the extractor changes.
+
+import sqlite3
+import time
+import zlib
+
+schema = '''
+CREATE TABLE IF NOT EXISTS articles (
+    pageid INTEGER NOT NULL,
+    revid INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    html BLOB NOT NULL,
+    text BLOB NOT NULL,
+    text_version INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (pageid, revid)
+);
+CREATE TABLE IF NOT EXISTS category_members (
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    pageid INTEGER NOT NULL,
+    PRIMARY KEY (category, position)
+);
+'''
+
+# Columns added after the first version of the schema, which are added to older corpus files when they are opened
+added_columns = [
+    ('articles', 'text_version', 'INTEGER NOT NULL DEFAULT 0'),
+]
+
+# Revision id stored for pages whose revision is not known
+unknown_revision = 0
+
+def compress(text):
+    return sqlite3.Binary(zlib.compress(text.encode('utf-8')))
+
+def decompress(blob):
+    return zlib.decompress(bytes(blob)).decode('utf-8')
+
+class Corpus(object):
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(schema)
+        for table, column, definition in added_columns:
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(' + table + ')')]
+            if column not in columns:
+                with self.connection:
+                    self.connection.execute('ALTER TABLE ' + table + ' ADD COLUMN ' + column + ' ' + definition)
+
+    # The latest stored revision id of a page, or None if the page isn't stored
+    def revision(self, pageid):
+        row = self.connection.execute('SELECT MAX(revid) FROM articles WHERE pageid = ?', (pageid,)).fetchone()
+        return row[0]
+
+    # A stored article as a dict with its pageid, revid, html and text, or None if it isn't stored
+    # Without a revid, the latest stored revision is returned
+    def article(self, pageid, revid=None):
+        if revid is None:
+            revid = self.revision(pageid)
+            if revid is None:
+                return None
+        row = self.connection.execute('SELECT html, text FROM articles WHERE pageid = ? AND revid = ?', (pageid, revid)).fetchone()
+        if row is None:
+            return None
+        return {'pageid': pageid, 'revid': revid, 'html': decompress(row[0]), 'text': decompress(row[1])}
+
+    # The cleaned text of the latest stored revision of a page, without decompressing its HTML
+    def text(self, pageid):
+        row = self.connection.execute('SELECT text FROM articles WHERE pageid = ? ORDER BY revid DESC LIMIT 1', (pageid,)).fetchone()
+        if row is None:
+            return None
+        return decompress(row[0])
+
+    # The extractor version of the text of the latest stored revision of a page, or None if the page isn't stored
+    def textVersion(self, pageid):
+        row = self.connection.execute('SELECT text_version FROM articles WHERE pageid = ? ORDER BY revid DESC LIMIT 1', (pageid,)).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    # Store an article (replacing the same revision if it was already stored)
+    def store(self, pageid, revid, html, text, text_version=0):
+        if revid is None:
+            revid = unknown_revision
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO articles (pageid, revid, fetched, html, text, text_version) VALUES (?, ?, ?, ?, ?, ?)',
+                                    (pageid, revid, time.time(), compress(html), compress(text), text_version))
+
+    # Replace the text of a stored article, e.g. after extracting it again with a newer extractor
+    def setText(self, pageid, revid, text, text_version):
+        with self.connection:
+            self.connection.execute('UPDATE articles SET text = ?, text_version = ? WHERE pageid = ? AND revid = ?',
+                                    (compress(text), text_version, pageid, revid))
+
+    # Record the pageids of a category's members, in the order the API listed them, in place of the ones recorded before
+    def setCategoryMembers(self, category, pageids):
+        with self.connection:
+            self.connection.execute('DELETE FROM category_members WHERE category = ?', (category,))
+            self.connection.executemany('INSERT OR REPLACE INTO category_members (category, position, pageid) VALUES (?, ?, ?)',
+                                        [(category, position, pageid) for position, pageid in enumerate(pageids)])
+
+    # The recorded pageids of a category's members, in order
+    def categoryMembers(self, category):
+        rows = self.connection.execute('SELECT pageid FROM category_members WHERE category = ? ORDER BY position', (category,))
+        return [row[0] for row in rows]
+
+    def close(self):
+        self.connection.close()
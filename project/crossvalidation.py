@@ -0,0 +1,118 @@
+# crossvalidation.py
+# Natural Language Processing
+
+# Estimates a classifier's accuracy by stratified k-fold cross-validation, optionally repeated with other shuffles,
+# for trainer.py --folds. With only 20 - 100 articles, one fixed split into a training and a test set gives a noisy
+# accuracy; the mean and standard deviation over the folds say how much of a difference is real.
+# Every article is featurized once into a training.SparseFeaturesets. Each fold's training set is a subset of its
+# rows, sliced out of the arrays, and its test articles are rebuilt from their rows, so no featureset is computed or
+# copied again. The folds are trained by a pool of processes, which share the featuresets (inherited when the pool
+# forks).
+
+import random
+import statistics
+
+from project import featurizer
+from project import training
+from project import vocabulary
+
+# The featuresets of every article, shared with the pool's processes
+_data = None
+
+def setData(data):
+    global _data
+    _data = data
+
+# Assign each row to one of k folds, so that each label is spread as evenly as possible over the folds
+# The rows of each label are shuffled with the seed first; returns the list of rows of each fold
+def stratifiedFolds(labels, folds, seed=0):
+    shuffler = random.Random(seed)
+    rows_by_label = {}
+    for row, label in enumerate(labels):
+        rows_by_label.setdefault(label, []).append(row)
+    assigned = [[] for fold in range(folds)]
+    position = 0
+    for label in sorted(rows_by_label):
+        rows = rows_by_label[label]
+        shuffler.shuffle(rows)
+        # Each label starts at the fold after the one the previous label ended at, so the folds stay the same size
+        for row in rows:
+            assigned[position % folds].append(row)
+            position += 1
+    return [sorted(rows) for rows in assigned]
+
+# The (training rows, test rows) of every fold of every repeat, each repeat shuffled with a seed of its own
+def foldSplits(labels, folds, repeats=1, seed=0):
+    splits = []
+    for repeat in range(repeats):
+        assigned = stratifiedFolds(labels, folds, seed + repeat)
+        for fold, test_rows in enumerate(assigned):
+            train_rows = [row for other, rows in enumerate(assigned) if other != fold for row in rows]
+            splits.append((train_rows, test_rows))
+    return splits
+
+# Train on one fold's training rows and classify its test rows - the work each process of the pool does
+# With selection (the arguments of vocabulary.selectVocabulary), the vocabulary is selected from the fold's training
+# rows only, as trainer.py selects it from its training articles
+# Returns the predicted and the true labels of the test rows
+def runFold(kind, train_rows, test_rows, options, selection=None):
+    data = _data.subset(train_rows)
+    restrict = lambda featureset: featureset
+    if selection is not None:
+        features = set(vocabulary.selectVocabulary(data, **selection))
+        data = training.SparseFeaturesets(vocabulary.restrictedFeaturesets(data, features))
+        restrict = lambda featureset: vocabulary.restrict(featureset, features)
+    classifier = training.train(kind, data, **options)
+    predicted = [classifier.classify(restrict(_data.featureset(row))) for row in test_rows]
+    return predicted, [_data.labels[row] for row in test_rows]
+
+# The precision and recall of each label, from predicted and true labels
+# A label that was never predicted (or never true) has a precision (or recall) of 0
+def labelScores(predicted, expected):
+    scores = {}
+    for label in sorted(set(expected) | set(predicted)):
+        true_positives = sum(1 for guess, truth in zip(predicted, expected) if guess == label and truth == label)
+        predicted_count = sum(1 for guess in predicted if guess == label)
+        expected_count = sum(1 for truth in expected if truth == label)
+        scores[label] = {
+            'precision': float(true_positives) / predicted_count if predicted_count else 0.0,
+            'recall': float(true_positives) / expected_count if expected_count else 0.0,
+        }
+    return scores
+
+# Cross-validate a kind of classifier on SparseFeaturesets, with folds folds, repeated repeats times
+# options are passed on to training.train (e.g. maxent_backend and l2), and selection to vocabulary.selectVocabulary
+# Returns the accuracy of every fold, their mean and standard deviation, and each label's precision and recall over
+# the predictions of all the folds
+def crossValidate(data, kind, folds=5, repeats=1, workers=1, seed=0, selection=None, **options):
+    if folds < 2 or folds > len(data):
+        raise ValueError('Cannot split ' + str(len(data)) + ' articles into ' + str(folds) + ' folds')
+    splits = foldSplits(data.labels, folds, repeats, seed)
+    setData(data)
+    if workers <= 1:
+        outcomes = [runFold(kind, train_rows, test_rows, options, selection) for train_rows, test_rows in splits]
+    else:
+        with featurizer.poolContext().Pool(workers, initializer=setData, initargs=(data,)) as pool:
+            pending = [pool.apply_async(runFold, (kind, train_rows, test_rows, options, selection)) for train_rows, test_rows in splits]
+            outcomes = [result.get() for result in pending]
+
+    accuracies = [sum(guess == truth for guess, truth in zip(predicted, expected)) / float(len(expected)) for predicted, expected in outcomes]
+    all_predicted = [label for predicted, expected in outcomes for label in predicted]
+    all_expected = [label for predicted, expected in outcomes for label in expected]
+    return {
+        'folds': folds,
+        'repeats': repeats,
+        'accuracies': accuracies,
+        'accuracy_mean': statistics.mean(accuracies),
+        'accuracy_stdev': statistics.stdev(accuracies) if len(accuracies) > 1 else 0.0,
+        'labels': labelScores(all_predicted, all_expected),
+    }
+
+# The results of crossValidate as lines of text, for trainer.py to print
+def report(results):
+    lines = ['%d-fold cross-validation%s: accuracy %.3f +/- %.3f (min %.3f, max %.3f)' % (
+        results['folds'], ' x %d repeats' % results['repeats'] if results['repeats'] > 1 else '',
+        results['accuracy_mean'], results['accuracy_stdev'], min(results['accuracies']), max(results['accuracies']))]
+    for label, scores in sorted(results['labels'].items()):
+        lines.append('%s: precision %.3f, recall %.3f' % (label, scores['precision'], scores['recall']))
+    return lines
@@ -0,0 +1,228 @@
+# dumpscorer.py
+# Natural Language Processing
+
+# Screens a whole wiki offline: scores every article of a Wikipedia XML dump (pages-articles.xml.bz2) with a trained
+# model, and writes each article's probability of being promotional to a TSV file (or the most promotional ones,
+# ranked).
+# The dump is decompressed and parsed as a stream with lxml's iterparse, and each page element is cleared once it
+# has been read, so memory use stays the same however large the dump is. The wikitext of each page is stripped to
+# plain text, then cleaned and featurized the same way as the Web front-end does for downloaded pages. Pages are
+# scored in chunks by a pool of processes, each with the model loaded once (and, where processes are forked, the
+# model loaded before forking is shared by all of them).
+
+# Usage:
+# python -m project.dumpscorer enwiki-latest-pages-articles.xml.bz2 maxent_3gram100.model scores.tsv --workers 4
+# The output has one line per article: page id, title, and the probability of the --label label (default Bad),
+# written as soon as the article is scored, in the order of the dump, so that no score is kept in memory. To rank
+# the articles afterwards:
+# tail -n +2 scores.tsv | sort -t "$(printf '\t')" -k3,3gr > ranked.tsv
+# --top N instead ranks the N most promotional articles, in memory proportional to N, and adds a rank column
+
+import argparse
+import bz2
+import heapq
+import html
+import re
+import sys
+import time
+from collections import deque
+
+from lxml import etree
+
+from project import cleaner
+from project import extractor
+from project import featurizer
+from project import registry
+from project import scorer
+from project.compactmodel import CompactClassifier
+
+# Only articles are scored, not talk, user, template or other pages
+article_namespace = '0'
+
+# The local name of an element, without its namespace (the export schema's namespace changes between versions)
+def localName(element):
+    return etree.QName(element).localname
+
+# The articles of a dump, as (page id, title, wikitext) tuples
+# file is the dump, compressed (.bz2) or not, as a path or an open binary file
+# Redirects and pages outside the article namespace are skipped
+def dumpPages(file):
+    if isinstance(file, str):
+        file = bz2.open(file, 'rb') if file.endswith('.bz2') else open(file, 'rb')
+    with file:
+        for event, page in etree.iterparse(file, events=('end',), tag='{*}page'):
+            fields = {}
+            redirect = False
+            for child in page:
+                name = localName(child)
+                if name == 'redirect':
+                    redirect = True
+                elif name in ('id', 'title', 'ns'):
+                    fields[name] = child.text
+                elif name == 'revision':
+                    for field in child:
+                        if localName(field) == 'text':
+                            fields['text'] = field.text or ''
+            if not redirect and fields.get('ns') == article_namespace and 'text' in fields:
+                yield int(fields['id']), fields['title'], fields['text']
+
+            # Drop the page, and the (already cleared) pages before it, so the tree never grows
+            page.clear()
+            while page.getprevious() is not None:
+                del page.getparent()[0]
+
+comment_regex = re.compile(r'<!--.*?-->', re.S)
+reference_regex = re.compile(r'<ref[^>]*?/>|<ref[^>]*>.*?</ref>', re.S | re.I)
+template_regex = re.compile(r'\{\{[^{}]*\}\}')
+table_regex = re.compile(r'\{\|(?:[^{|]|\{(?!\|)|\|(?!\}))*\|\}')
+link_regex = re.compile(r'\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]')
+external_link_regex = re.compile(r'\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]')
+tag_regex = re.compile(r'</?[a-zA-Z][^>]*>')
+heading_regex = re.compile(r'^(=+)\s*(.*?)\s*\1\s*$', re.M)
+quote_regex = re.compile(r"'{2,}")
+list_regex = re.compile(r'^[*#:;]+\s*', re.M)
+
+# Links to these namespaces are images and categories, not text
+hidden_link_prefixes = ('file:', 'image:', 'category:', 'media:')
+
+# Remove the innermost matches of a regex until none are left, for markup that nests
+def removeNested(regex, text, replacement=''):
+    count = 1
+    while count:
+        text, count = regex.subn(replacement, text)
+    return text
+
+# The text of a wiki link: its label, or its target if it has none; nothing for images and categories
+def linkText(match):
+    if match.group(1).strip().lower().startswith(hidden_link_prefixes):
+        return ''
+    return match.group(2) if match.group(2) is not None else match.group(1)
+
+# Strip wikitext down to the plain text a reader sees, close to what extractor.contentText gets from the page:
+# comments, references, templates (infoboxes, navboxes, maintenance messages), tables, images and categories are
+# removed, links and external links become their text, and headings, bold, italics and list markers lose their markup
+def wikitextToText(wikitext):
+    text = comment_regex.sub('', wikitext)
+    text = reference_regex.sub('', text)
+    text = removeNested(template_regex, text)
+    text = removeNested(table_regex, text)
+    text = removeNested(link_regex, text, linkText)
+    text = external_link_regex.sub(r'\1', text)
+    text = tag_regex.sub('', text)
+    text = heading_regex.sub(r'\2', text)
+    text = quote_regex.sub('', text)
+    text = list_regex.sub('', text)
+    return html.unescape(text)
+
+# Probability of the label for each of a batch of featuresets
+# Compact maxent and Bayes models score the whole batch at once with the vectorized scorer
+# Models that can't give probabilities count as 1 for articles they classify with the label, and 0 otherwise
+def labelProbabilities(classifier, featuresets, label):
+    if isinstance(classifier, CompactClassifier):
+        return [probabilities.get(label, 0.0) for probabilities in scorer.probabilities(classifier, featuresets)]
+    result = []
+    for featureset in featuresets:
+        try:
+            result.append(classifier.prob_classify(featureset).prob(label))
+        except NotImplementedError:
+            result.append(1.0 if classifier.classify(featureset) == label else 0.0)
+    return result
+
+# Score a chunk of pages - the work each process of the pool does at a time
+# Returns (probability, page id, title) tuples
+def scoreChunk(model_path, pages, label):
+    classifier = registry.getModel(model_path)
+    orders = [registry.ngramSize(model_path)]
+    hash_bits = registry.hashBits(model_path)
+    vocabulary = registry.getVocabulary(model_path)
+    text_version = registry.textVersion(model_path)
+    featuresets = [featurizer.articleFeatures(cleaner.cleanArticle(extractor.textAs(wikitextToText(text), text_version)), orders, hash_bits=hash_bits, vocabulary=vocabulary) for pageid, title, text in pages]
+    if not featuresets:
+        return []
+    probabilities = labelProbabilities(classifier, featuresets, label)
+    return [(probability, pageid, title) for probability, (pageid, title, text) in zip(probabilities, pages)]
+
+# Score the pages of a dump, yielding (probability, page id, title) tuples in the order of the dump
+# With more than one worker, the pages are sent to a pool of processes in chunks of `chunksize`, with only a few
+# chunks per worker read ahead of the scores being consumed
+def scorePages(pages, model_path, label, workers=1, chunksize=32):
+    if workers <= 1:
+        for chunk in featurizer.chunks(pages, chunksize):
+            for score in scoreChunk(model_path, chunk, label):
+                yield score
+        return
+
+    pending = deque()
+    with featurizer.poolContext().Pool(workers) as pool:
+        for chunk in featurizer.chunks(pages, chunksize):
+            pending.append(pool.apply_async(scoreChunk, (model_path, chunk, label)))
+            if len(pending) >= workers * 2:
+                for score in pending.popleft().get():
+                    yield score
+        while pending:
+            for score in pending.popleft().get():
+                yield score
+
+# Write (probability, page id, title) scores as they come, returning how many were written
+def writeScores(path, scores):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('pageid\ttitle\tprobability\n')
+        for probability, pageid, title in scores:
+            file.write('%d\t%s\t%.6f\n' % (pageid, title.replace('\t', ' '), probability))
+            count += 1
+    return count
+
+# The n highest scores, ranked by probability, then by page id, so that ties are kept and written in the same order
+# whatever order the pages were scored in
+def topScores(scores, n):
+    kept = []
+    for probability, pageid, title in scores:
+        score = (probability, -pageid, title)
+        if len(kept) < n:
+            heapq.heappush(kept, score)
+        else:
+            heapq.heappushpop(kept, score)
+    kept.sort(reverse=True)
+    return [(probability, -pageid, title) for probability, pageid, title in kept]
+
+# Pass scores through, writing how many have been scored so far to stderr every so often
+# progress['count'] holds the number of scores passed through
+def reportProgress(scores, progress, start, every=10000):
+    for score in scores:
+        progress['count'] += 1
+        if progress['count'] % every == 0:
+            sys.stderr.write('%d articles scored (%.0f per second)\n' % (progress['count'], progress['count'] / (time.time() - start)))
+        yield score
+
+# Write the scores ranked from the most to the least likely to have the label
+def writeRanking(path, scores):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('rank\tpageid\ttitle\tprobability\n')
+        for rank, (probability, pageid, title) in enumerate(scores, 1):
+            file.write('%d\t%d\t%s\t%.6f\n' % (rank, pageid, title.replace('\t', ' '), probability))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scores every article of a Wikipedia XML dump and ranks them by their probability of being promotional.')
+    parser.add_argument('dump', help='the pages-articles.xml(.bz2) dump')
+    parser.add_argument('model', help='the trained model file (.model or .pickle)')
+    parser.add_argument('output', help='the TSV file to write')
+    parser.add_argument('--workers', type=int, default=1, metavar='N', help='number of processes to score pages with')
+    parser.add_argument('--label', default='Bad', help='the label to rank by (default Bad, promotional)')
+    parser.add_argument('--top', type=int, default=None, metavar='N', help='only keep the N highest ranked articles, and rank them')
+    parser.add_argument('--chunksize', type=int, default=32, metavar='N', help='number of pages sent to a process at a time')
+    args = parser.parse_args()
+
+    # Load the model before the pool forks, so that the processes share it
+    registry.preload(args.model)
+
+    start = time.time()
+    progress = {'count': 0}
+    scores = reportProgress(scorePages(dumpPages(args.dump), args.model, args.label, args.workers, args.chunksize), progress, start)
+    if args.top is None:
+        written = writeScores(args.output, scores)
+    else:
+        ranked = topScores(scores, args.top)
+        writeRanking(args.output, ranked)
+        written = len(ranked)
+    sys.stdout.write('%d articles scored in %.1f seconds, %d written to %s\n' % (progress['count'], time.time() - start, written, args.output))
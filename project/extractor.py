@@ -0,0 +1,215 @@
+# extractor.py
+# Natural Language Processing
+
+# Gets the article text out of a Wikipedia page, for both trainer.py and the Web front-end.
+# The page is parsed by lxml's C HTML parser, the content div (div.mw-content-ltr) is found with a compiled XPath
+# query, and its text is taken after dropping the parts that aren't article prose: navboxes, reference lists, and
+# script and style elements. This used to be a BeautifulSoup tree of the whole page, built from the str() of the
+# response bytes - which also turned every newline into a literal "\n" and every non-ASCII character into an escape.
+
+# Usage, to compare speed with the BeautifulSoup extraction on saved pages (or on generated pages, without any):
+# python -m project.extractor page1.html page2.html ...
+
+import random
+import re
+import sys
+import time
+
+import lxml.html
+from lxml import etree
+
+# Bump this whenever the extracted text changes, so that texts stored by an older version get extracted again
+# Models record the version their training texts came from (see registry.textVersion), and the front-end extracts
+# the texts it classifies the same way, with contentTextAs and textAs. Version 0 is the BeautifulSoup extraction
+# (contentTextBySoup) that the first models, like the shipped maxent_3gram100, were trained on.
+version = 1
+
+# Elements with these classes are dropped before taking the text
+skipped_classes = [
+    'navbox',
+    'vertical-navbox',
+    'navbox-styles',
+    'reflist',
+    'references',
+    'mw-references-wrap',
+]
+
+def classTest(name):
+    return 'contains(concat(" ", normalize-space(@class), " "), " ' + name + ' ")'
+
+content_query = etree.XPath('//div[' + classTest('mw-content-ltr') + ']')
+skipped_query = etree.XPath(' | '.join(['.//script', './/style'] + ['.//*[' + classTest(name) + ']' for name in skipped_classes]))
+
+# Pages given as bytes are decoded as UTF-8, which is what Wikipedia sends
+utf8_parser = lxml.html.HTMLParser(encoding='utf-8')
+
+# The content div of a Wikipedia page
+# html is the page, as a string or as the bytes of the response
+# Raises ValueError if the page has no content div
+def contentDiv(html):
+    if isinstance(html, bytes):
+        document = lxml.html.document_fromstring(html, parser=utf8_parser)
+    else:
+        document = lxml.html.document_fromstring(html)
+    content = content_query(document)
+    if not content:
+        raise ValueError('The page has no article content')
+    return content[0]
+
+# The text of the content div of a Wikipedia page
+# Raises ValueError if the page has no content div
+def contentText(html):
+    content = contentDiv(html)
+
+    # drop_tree keeps the text that follows a dropped element
+    for element in skipped_query(content):
+        element.drop_tree()
+    return str(content.text_content())
+
+# Elements whose text is one paragraph of the article, for contentParagraphs
+paragraph_tags = set(['p', 'li', 'dd', 'dt', 'blockquote'])
+heading_tags = set(['h2', 'h3', 'h4'])
+
+def isContentDiv(element):
+    return element.tag == 'div' and 'mw-content-ltr' in (element.get('class') or '').split()
+
+def isSkipped(element):
+    return element.tag in ('script', 'style') or any(name in skipped_classes for name in (element.get('class') or '').split())
+
+# Drop an element's children and text once it has been read, but keep the text that follows it
+def clearElement(element):
+    tail = element.tail
+    element.clear()
+    element.tail = tail
+
+# The paragraphs of the content div of a Wikipedia page, as (section heading, paragraph text) pairs, read from the
+# page as it arrives
+# chunks are the bytes of the page, in pieces (e.g. from Fetcher.stream). Each paragraph is yielded as soon as the
+# parser has read its end tag, and is then cleared out of the tree, so the page is never held as a whole. Parsing
+# stops at the end of the content div. The same parts are left out as by contentText. Nested list items are
+# yielded before, and left out of, the items that hold them.
+# Raises ValueError if the page has no content div
+def contentParagraphs(chunks):
+    parser = etree.HTMLPullParser(events=('start', 'end'), encoding='utf-8')
+    parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+    content = None
+    skipping = None
+    section = ''
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if content is None:
+                if event == 'start' and isContentDiv(element):
+                    content = element
+                continue
+            if skipping is not None:
+                if event == 'end' and element is skipping:
+                    clearElement(element)
+                    skipping = None
+                continue
+            if event == 'start':
+                if isSkipped(element):
+                    skipping = element
+            elif element is content:
+                return
+            elif element.tag in heading_tags:
+                section = str(element.text_content()).strip()
+                if section.endswith('[edit]'):
+                    section = section[:-len('[edit]')].strip()
+                clearElement(element)
+            elif element.tag in paragraph_tags:
+                text = str(element.text_content())
+                if text.strip():
+                    yield section, text
+                clearElement(element)
+    if content is None:
+        raise ValueError('The page has no article content')
+
+# The revision id of a Wikipedia page, from the page's JavaScript configuration, or None if the page doesn't say
+revision_regex = re.compile(r'"wgRevisionId":([0-9]+)')
+revision_regex_bytes = re.compile(br'"wgRevisionId":([0-9]+)')
+
+def pageRevision(html):
+    match = (revision_regex_bytes if isinstance(html, bytes) else revision_regex).search(html)
+    if match:
+        return int(match.group(1))
+    return None
+
+# The text of the content div as version 0 got it, from the same lxml tree as contentText: nothing is dropped, and
+# the text gets the escapes of the str() of the page bytes (see textAs)
+# Raises ValueError if the page has no content div
+def contentTextLegacy(html):
+    return textAs(str(contentDiv(html).text_content()), 0)
+
+# The previous extraction (version 0), with BeautifulSoup, kept to check contentTextLegacy against
+# bs4 4.9 and later leave script and style text out of .text, which the bs4 4.6 the version 0 models were trained
+# with (and contentTextLegacy) keep, so the two only agree on content divs without scripts or styles
+# Raises ValueError if the page has no content div
+def contentTextBySoup(html):
+    from bs4 import BeautifulSoup
+    if not isinstance(html, bytes):
+        html = html.encode('utf-8')
+    parsed_html = BeautifulSoup(str(html).encode('utf-8').strip(), 'lxml')
+    content = parsed_html.body.find('div', attrs={'class':'mw-content-ltr'}) if parsed_html.body is not None else None
+    if content is None:
+        raise ValueError('The page has no article content')
+    return content.text
+
+# The text of the content div of a page, as the given version of the extractor got it
+def contentTextAs(html, text_version=version):
+    if text_version == 0:
+        return contentTextLegacy(html)
+    return contentText(html)
+
+# A text, e.g. a paragraph from contentParagraphs, as the given version of the extractor would have given it
+# Version 0 texts were parsed out of the str() of the page bytes, so newlines are a literal "\n" and every non-ASCII
+# character is the escapes of its UTF-8 bytes. A whole page always holds both kinds of quote, so its single quotes
+# were escaped too - the added double quote makes str() do the same here.
+def textAs(text, text_version=version):
+    if text_version == 0:
+        return str((text + '"').encode('utf-8'))[2:-2]
+    return text
+
+# The words of the sample pages, unless others are given
+sample_words = ['company', 'founded', 'award', 'leading', 'provider', 'innovative', 'solutions', 'the', 'of', 'and',
+                'in', 'was', 'river', 'moon', 'orbit', 'century', 'population', 'résumé', 'naïve', 'Zürich']
+
+# A page shaped like a Wikipedia article page for the benchmark: a head full of links and scripts, an infobox,
+# paragraphs with references, navboxes, a reference list and the page footer
+def samplePage(paragraphs, words=sample_words):
+
+    def sentence(length):
+        return ' '.join(random.choice(words) for i in range(length)).capitalize() + '.'
+
+    head = ''.join('<link rel="stylesheet" href="/w/load.php?modules=site.styles&amp;n=%d"/><script>RLQ.push(%d);</script>' % (i, i) for i in range(40))
+    infobox = '<table class="infobox vcard"><tbody>' + ''.join('<tr><th>%s</th><td>%s</td></tr>' % (sentence(2), sentence(4)) for i in range(12)) + '</tbody></table>'
+    body = ''.join('<h2><span class="mw-headline">%s</span><span class="mw-editsection">[<a href="#">edit</a>]</span></h2><p>%s<sup class="reference"><a href="#cite_note-%d">[%d]</a></sup> %s</p>\n' % (
+        sentence(3), ' '.join(sentence(15) for j in range(6)), i, i, sentence(20)) for i in range(paragraphs))
+    navboxes = ''.join('<div role="navigation" class="navbox"><table class="nowraplinks"><tbody>' + ''.join('<tr><td class="navbox-list"><a href="#">%s</a> · <a href="#">%s</a></td></tr>' % (sentence(2), sentence(2)) for j in range(15)) + '</tbody></table></div>' for i in range(3))
+    references = '<div class="reflist"><ol class="references">' + ''.join('<li id="cite_note-%d"><cite>%s</cite></li>' % (i, sentence(12)) for i in range(paragraphs * 2)) + '</ol></div>'
+    footer = '<div id="catlinks">' + sentence(10) + '</div><div id="footer">' + sentence(40) + '</div>'
+    return ('<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"/><title>Sample</title>' + head + '</head><body>'
+            '<div id="content"><h1>Sample</h1><div id="mw-content-text" class="mw-body-content">'
+            '<style>.mw-parser-output .hatnote{font-style:italic}</style>'
+            '<div class="mw-content-ltr mw-parser-output" lang="en" dir="ltr">' + infobox + body + navboxes + references + '</div></div></div>' + footer + '</body></html>')
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        pages = []
+        for path in sys.argv[1:]:
+            with open(path, 'rb') as file:
+                pages.append(file.read())
+    else:
+        random.seed(0)
+        pages = [samplePage(40).encode('utf-8') for i in range(20)]
+
+    start = time.time()
+    for page in pages:
+        contentTextBySoup(page)
+    soup_time = time.time() - start
+    start = time.time()
+    for page in pages:
+        contentText(page)
+    lxml_time = time.time() - start
+    sys.stdout.write('per page (%d pages, %d KB on average): BeautifulSoup %.1f ms, lxml %.1f ms\n' % (
+        len(pages), sum(len(page) for page in pages) // len(pages) // 1024, 1000 * soup_time / len(pages), 1000 * lxml_time / len(pages)))
@@ -0,0 +1,217 @@
+# featurizer.py
+# Natural Language Processing
+
+# Turns cleaned article text into a featureset (bag of n-grams), for both trainer.py and the Web front-end.
+# N-grams are counted as tuples of words with collections.Counter, straight from zip() over the word list, so the
+# counting loop runs in C and no n-gram string is built while counting. Only the n-grams that survive pruning are
+# joined into the 'word word word' strings the models are keyed by.
+# Each order is counted in a pass of its own over the word list, not all orders in one sweep: a single sweep has to
+# slice every window in Python, and counts 4 orders of an 8,000 word article about 4 times slower than the 4 C-level
+# Counter passes. Pruning reads the counts in place, without copying their keys.
+
+# Optionally n-grams are hashed into a fixed number of buckets (the hashing trick). The featureset then holds at
+# most 2^hash_bits bucket features, named '#<bucket>', whatever the vocabulary size or n-gram order, which keeps
+# both model size and per-article memory bounded. N-grams that hash to the same bucket share one count.
+
+# Many articles can be featurized by a pool of processes (articleFeaturesMany), for training on large corpora.
+
+import multiprocessing
+import zlib
+from collections import Counter, deque
+from itertools import islice
+
+# Features of a featureset that aren't n-grams
+non_ngram_features = ['article_length']
+
+# To decrease the number of features, there are limits on the acceptable n-gram count.
+# N-grams that appear too few or too many times are not included in the featureset.
+word_mincount = 3
+word_maxcount = 60
+bigram_mincount = 2
+
+# Count the n-grams of one order in a word list
+# Unigrams are the words themselves, longer n-grams are tuples of words
+def countNgrams(wordlist, order):
+    if order == 1:
+        return Counter(wordlist)
+    return Counter(zip(*[islice(wordlist, i, None) for i in range(order)]))
+
+# Stable bucket number of an n-gram string - it must be the same when training and when classifying,
+# so Python's hash() (which changes every time the interpreter starts) can't be used
+def bucket(ngram, hash_bits):
+    return zlib.crc32(ngram.encode('utf-8')) & ((1 << hash_bits) - 1)
+
+# Feature name of a bucket
+def bucketName(number):
+    return '#' + str(number)
+
+# The n-grams of one order that are kept in a featureset, as ('word word word', count) pairs, from their counts
+# Unigrams are kept if they appear between word_mincount and word_maxcount times,
+# bigrams and trigrams if they appear at least bigram_mincount times, and quadgrams (or longer) are all kept
+def keptNgrams(order, counts, word_mincount, word_maxcount, bigram_mincount):
+    if order == 1:
+        return ((word, count) for word, count in counts.items() if word_mincount <= count <= word_maxcount)
+    if order <= 3:
+        return ((' '.join(ngram), count) for ngram, count in counts.items() if count >= bigram_mincount)
+    return ((' '.join(ngram), count) for ngram, count in counts.items())
+
+# The loosest limits, which keep every n-gram - featuresets built with them can be pruned later by prunedFeatures
+unpruned_limits = (1, float('inf'), 1)
+
+# Prune the featureset of one n-gram order, built with unpruned_limits, to what articleFeatures gives with other limits
+# (and hash_bits), without counting the article's n-grams again - e.g. to try many limits on one featurized corpus
+def prunedFeatures(featureset, order, word_mincount=word_mincount, word_maxcount=word_maxcount, bigram_mincount=bigram_mincount, hash_bits=None):
+    ngrams = ((ngram, count) for ngram, count in featureset.items() if ngram != "article_length")
+    if order == 1:
+        kept = ((word, count) for word, count in ngrams if word_mincount <= count <= word_maxcount)
+    elif order <= 3:
+        kept = ((ngram, count) for ngram, count in ngrams if count >= bigram_mincount)
+    else:
+        kept = ngrams
+    if hash_bits:
+        pruned = {}
+        for ngram, count in kept:
+            name = bucketName(bucket(ngram, hash_bits))
+            pruned[name] = pruned.get(name, 0) + count
+    else:
+        pruned = dict(kept)
+    pruned["article_length"] = featureset["article_length"]
+    return pruned
+
+# Constructs a bag of n-grams of every requested order (e.g. [1, 2, 3, 4]) from a word list, pruned by keptNgrams
+# With hash_bits, the kept n-grams are counted by bucket instead
+# With a vocabulary (a set of feature names, see project/vocabulary.py), features outside it are left out
+def findNgrams(wordlist, orders, word_mincount=word_mincount, word_maxcount=word_maxcount, bigram_mincount=bigram_mincount, hash_bits=None, vocabulary=None):
+    if hash_bits:
+        return findHashedNgrams(wordlist, orders, word_mincount, word_maxcount, bigram_mincount, hash_bits, vocabulary)
+    featureset = {}
+    for order in orders:
+        kept = keptNgrams(order, countNgrams(wordlist, order), word_mincount, word_maxcount, bigram_mincount)
+        if vocabulary is not None:
+            kept = ((ngram, count) for ngram, count in kept if ngram in vocabulary)
+        featureset.update(kept)
+    return featureset
+
+# Hashing trick version of findNgrams
+# Pruned orders have to be counted exactly first, but unpruned ones (quadgrams) go straight into the bucket
+# counts, so no per-n-gram table is ever built for them
+def findHashedNgrams(wordlist, orders, word_mincount, word_maxcount, bigram_mincount, hash_bits, vocabulary=None):
+    buckets = Counter()
+    for order in orders:
+        if order <= 3:
+            for ngram, count in keptNgrams(order, countNgrams(wordlist, order), word_mincount, word_maxcount, bigram_mincount):
+                buckets[bucket(ngram, hash_bits)] += count
+        else:
+            ngrams = zip(*[islice(wordlist, i, None) for i in range(order)])
+            buckets.update(bucket(' '.join(ngram), hash_bits) for ngram in ngrams)
+    featureset = dict((bucketName(number), count) for number, count in buckets.items())
+    if vocabulary is not None:
+        featureset = dict((name, count) for name, count in featureset.items() if name in vocabulary)
+    return featureset
+
+# Constructs the featureset of a cleaned article text
+# The article length (in words) is always included as a feature
+def articleFeatures(text, orders, word_mincount=word_mincount, word_maxcount=word_maxcount, bigram_mincount=bigram_mincount, hash_bits=None, vocabulary=None):
+    wordlist = text.split(" ")
+    featureset = findNgrams(wordlist, orders, word_mincount, word_maxcount, bigram_mincount, hash_bits, vocabulary)
+    featureset["article_length"] = len(wordlist)
+    return featureset
+
+# N-gram counts of a text that arrives in pieces, e.g. paragraph by paragraph
+# Adding the pieces one at a time gives the same featureset as articleFeatures on the pieces joined with spaces
+# (n-grams spanning two pieces included), while only the counts are kept, not the text
+# The featureset is kept up to date as the pieces are added: only the n-grams of the new piece are pruned (and
+# hashed) again, so adding a piece costs time in proportion to the piece, not to the text so far
+class NgramCounts(object):
+    def __init__(self, orders, word_mincount=word_mincount, word_maxcount=word_maxcount, bigram_mincount=bigram_mincount, hash_bits=None, vocabulary=None):
+        self.orders = orders
+        self.limits = (word_mincount, word_maxcount, bigram_mincount)
+        self.hash_bits = hash_bits
+        self.vocabulary = vocabulary
+        self.counts = dict((order, Counter()) for order in orders)
+        self.features = {}
+        self.length = 0
+        self._last_words = []
+
+    def add(self, text):
+        wordlist = text.split(" ")
+        for order in self.orders:
+            # The last words of the earlier pieces start the n-grams that end in this one
+            carried = self._last_words[-(order - 1):] if order > 1 else []
+            counts = self.counts[order]
+            for ngram, added in countNgrams(carried + wordlist, order).items():
+                previous = counts[ngram]
+                counts[ngram] = previous + added
+                self.updateFeature(order, ngram, previous, previous + added)
+        self._last_words = (self._last_words + wordlist)[-(max(self.orders) - 1):] if max(self.orders) > 1 else []
+        self.length += len(wordlist)
+
+    # The count an n-gram of an order adds to the featureset, by the limits keptNgrams applies: its count, or 0
+    def keptCount(self, order, count):
+        word_mincount, word_maxcount, bigram_mincount = self.limits
+        if order == 1:
+            return count if word_mincount <= count <= word_maxcount else 0
+        if order <= 3:
+            return count if count >= bigram_mincount else 0
+        return count
+
+    # Update the featureset for an n-gram whose count went from previous to count
+    def updateFeature(self, order, ngram, previous, count):
+        change = self.keptCount(order, count) - self.keptCount(order, previous)
+        if not change:
+            return
+        name = ngram if order == 1 else ' '.join(ngram)
+        if self.hash_bits:
+            name = bucketName(bucket(name, self.hash_bits))
+        if self.vocabulary is not None and name not in self.vocabulary:
+            return
+        value = self.features.get(name, 0) + change
+        if value:
+            self.features[name] = value
+        else:
+            del self.features[name]
+
+    # The featureset of the pieces added so far
+    def featureset(self):
+        featureset = dict(self.features)
+        featureset["article_length"] = self.length
+        return featureset
+
+# Featurize a list of texts - the work each process of the pool does at a time
+def featurizeChunk(texts, orders, word_mincount, word_maxcount, bigram_mincount, hash_bits):
+    return [articleFeatures(text, orders, word_mincount, word_maxcount, bigram_mincount, hash_bits) for text in texts]
+
+# Split an iterable into lists of up to `size` items
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+# Processes are forked where possible, so that they don't have to import the calling script again
+def poolContext():
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+# Constructs the featuresets of many cleaned article texts, yielding them in the same order as the texts
+# With more than one worker, the texts are sent to a pool of processes in chunks of `chunksize`
+# Only a few chunks per worker are read ahead of the featuresets being consumed, so the texts can be streamed
+def articleFeaturesMany(texts, orders, word_mincount=word_mincount, word_maxcount=word_maxcount, bigram_mincount=bigram_mincount, hash_bits=None, workers=1, chunksize=8):
+    if workers <= 1:
+        for text in texts:
+            yield articleFeatures(text, orders, word_mincount, word_maxcount, bigram_mincount, hash_bits)
+        return
+
+    options = (orders, word_mincount, word_maxcount, bigram_mincount, hash_bits)
+    pending = deque()
+    with poolContext().Pool(workers) as pool:
+        for chunk in chunks(texts, chunksize):
+            pending.append(pool.apply_async(featurizeChunk, (chunk,) + options))
+            if len(pending) >= workers * 2:
+                for featureset in pending.popleft().get():
+                    yield featureset
+        while pending:
+            for featureset in pending.popleft().get():
+                yield featureset
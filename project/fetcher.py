@@ -0,0 +1,259 @@
+# fetcher.py
+# Natural Language Processing
+
+# Downloads Wikipedia category listings, revision ids and article pages for trainer.py.
+# Pages are fetched by a bounded pool of threads sharing one keep-alive connection pool, with a per-host rate
+# limit, and failed requests (connection errors, 429 and 5xx responses) are retried with exponential backoff.
+# The retries are made by urllib3 inside the connection pool, so they wait for the rate limiter there
+# (LimitedRetry), and count against the rate like any other request.
+# Category listings are followed through their cmcontinue tokens in a loop rather than by recursion.
+# The API URLs are passed in, so the fetcher can be pointed at a local stub server.
+# The Web front-end uses a fetcher too, with a limit on the response size and on the total time to read it, so that
+# a slow or huge upstream response holds a worker for a bounded time. Several requests can share one deadline.
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError, ReadTimeoutError
+from urllib3.util.retry import Retry
+
+# Wikimedia asks API clients to identify themselves
+user_agent = 'wikipedia-content-detector/1.0 (https://github.com/1PhoenixM/wikipedia-content-detector)'
+
+# The most category members the API returns per request
+category_batch_size = 500
+
+# The most pages the API looks up per request
+revision_batch_size = 50
+
+# Raised when a response is larger than a fetcher's max_bytes
+class ResponseTooLarge(requests.RequestException):
+    pass
+
+# Size of the pieces a response is read in, when its size is limited
+read_chunk_size = 64 * 1024
+
+# The pieces of a streamed response's body, decoded, as they arrive
+# urllib3 2's read1 returns whatever has arrived so far, so a slowly trickling response still yields often enough
+# for the deadline to be checked. Older versions only have reads that wait for a whole chunk.
+def responseChunks(response):
+    if not hasattr(response.raw, 'read1'):
+        for chunk in response.iter_content(read_chunk_size):
+            yield chunk
+        return
+    while True:
+        # iter_content turns urllib3's errors into requests' own, so do the same here
+        try:
+            chunk = response.raw.read1(read_chunk_size, decode_content=True)
+        except ReadTimeoutError as error:
+            raise requests.ReadTimeout(error)
+        except HTTPError as error:
+            raise requests.ConnectionError(error)
+        if not chunk:
+            return
+        yield chunk
+
+# Spaces out requests to each host so that no host gets more than `rate` requests per second
+class RateLimiter(object):
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    # Block until the next request to this URL's host is allowed
+    def wait(self, url):
+        self.waitHost(urlsplit(url).hostname)
+
+    # Block until the next request to a host (its name, without the port) is allowed
+    def waitHost(self, host):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# urllib3's retry policy, which also waits for a rate limiter before each retry, as the retries are sent by urllib3
+# without going through Fetcher.get
+# The limiter is handed on to each new Retry urllib3 makes as it counts the tries, along with the host of the
+# connection pool that failed
+class LimitedRetry(Retry):
+    def __init__(self, *args, **kwargs):
+        self.limiter = kwargs.pop('limiter', None)
+        self.host = None
+        super(LimitedRetry, self).__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        retry = super(LimitedRetry, self).new(**kwargs)
+        retry.limiter = self.limiter
+        retry.host = self.host
+        return retry
+
+    def increment(self, *args, **kwargs):
+        retry = super(LimitedRetry, self).increment(*args, **kwargs)
+        pool = kwargs.get('_pool')
+        if pool is not None:
+            retry.host = pool.host
+        return retry
+
+    # Wait out the backoff (or the Retry-After header), then for the rate limiter
+    def sleep(self, response=None):
+        super(LimitedRetry, self).sleep(response)
+        if self.limiter is not None and self.host is not None:
+            self.limiter.waitHost(self.host)
+
+class Fetcher(object):
+    # workers - how many pages are downloaded at once
+    # rate - the most requests per second to one host (0 for no limit)
+    # retries, backoff - how often to retry a failed request, and the base of the exponential wait between tries
+    # timeout - seconds to wait for a connection or for data, or a (connect, read) tuple of the two
+    # max_bytes - the largest response body to accept (None for no limit)
+    # deadline - the most seconds a request may take in all, however steadily the data trickles in (None for no limit)
+    def __init__(self, workers=8, rate=20, retries=5, backoff=0.5, timeout=30, max_bytes=None, deadline=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.limiter = RateLimiter(rate)
+
+        retry = LimitedRetry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504), respect_retry_after_header=True, limiter=self.limiter)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(workers, 1), max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    # GET a URL, raising an exception for error responses that are still failing after the retries
+    # expires is a time (as time.time() gives it) the whole request must be done by, e.g. when it is one of several
+    # that share a deadline - the timeouts are cut short to fit in, and past it the request isn't sent at all
+    def get(self, url, expires=None):
+        self.limiter.wait(url)
+        if self.max_bytes is None and self.deadline is None and expires is None:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response
+        return self.getLimited(url, expires)
+
+    # GET a URL, reading the response as a stream so that the size and deadline limits are checked as it arrives
+    # The request takes at most until its stop time (see stopTime) plus one read timeout (the longest a single read may
+    # wait for data)
+    def getLimited(self, url, expires=None):
+        stop = self.stopTime(url, expires)
+        response = self.session.get(url, timeout=self.requestTimeout(stop), stream=True)
+        try:
+            # Hand the body over as if requests had read it, so that .content, .text and .json() work as usual
+            response._content = b''.join(self.limitedChunks(url, response, stop))
+        finally:
+            response.close()
+        return response
+
+    # GET a URL and yield the pieces of its body as they arrive, within the size and deadline limits
+    # The caller can stop reading at any time, which closes the connection instead of reading the rest of the body
+    def stream(self, url, expires=None):
+        self.limiter.wait(url)
+        stop = self.stopTime(url, expires)
+        response = self.session.get(url, timeout=self.requestTimeout(stop), stream=True)
+        try:
+            for chunk in self.limitedChunks(url, response, stop):
+                yield chunk
+        finally:
+            response.close()
+
+    # The time a request starting now must be done by - the earlier of the deadline and expires - or None for no limit
+    # Raises requests.Timeout if that time has already passed
+    def stopTime(self, url, expires=None):
+        now = time.time()
+        stop = now + self.deadline if self.deadline is not None else None
+        if expires is not None:
+            if expires <= now:
+                raise requests.Timeout('No time was left to request ' + url)
+            stop = expires if stop is None else min(stop, expires)
+        return stop
+
+    # The timeout of a request, cut short so that no wait for a connection or for data runs past the stop time
+    def requestTimeout(self, stop):
+        if stop is None:
+            return self.timeout
+        remaining = max(stop - time.time(), 0.001)
+        if isinstance(self.timeout, tuple):
+            return tuple(remaining if limit is None else min(limit, remaining) for limit in self.timeout)
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+    # The pieces of a streamed response's body, raising an exception for error responses, or once the response
+    # is larger than max_bytes or is still arriving at the stop time (see stopTime)
+    def limitedChunks(self, url, response, stop):
+        response.raise_for_status()
+        length = response.headers.get('Content-Length', '')
+        if self.max_bytes is not None and length.isdigit() and int(length) > self.max_bytes:
+            raise ResponseTooLarge('The response from ' + url + ' is larger than ' + str(self.max_bytes) + ' bytes', response=response)
+        size = 0
+        for chunk in responseChunks(response):
+            size += len(chunk)
+            if self.max_bytes is not None and size > self.max_bytes:
+                raise ResponseTooLarge('The response from ' + url + ' is larger than ' + str(self.max_bytes) + ' bytes', response=response)
+            if stop is not None and time.time() > stop:
+                raise requests.Timeout('The response from ' + url + ' took too long to arrive', response=response)
+            yield chunk
+
+    # GET several URLs at once, yielding the responses in the same order as the URLs
+    # At most a few requests per worker are in flight or waiting to be consumed, however many URLs there are
+    # With return_exceptions, a request that fails yields its exception instead of raising it, so the other
+    # URLs still get fetched
+    # With expires (see get), every request must be done by that time, and those that aren't fail with requests.Timeout
+    def getMany(self, urls, return_exceptions=False, expires=None):
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for url in urls:
+                pending.append(pool.submit(self.get, url, expires))
+                if len(pending) >= self.workers * 2:
+                    yield self.result(pending.popleft(), return_exceptions)
+            while pending:
+                yield self.result(pending.popleft(), return_exceptions)
+
+    def result(self, future, return_exceptions):
+        if return_exceptions:
+            exception = future.exception()
+            if exception is not None:
+                return exception
+        return future.result()
+
+    # Get the first `number` members of a category
+    # category_url is the categorymembers API query for the category, without a cmcontinue parameter
+    def categoryMembers(self, category_url, number):
+        members = []
+        continue_token = None
+        while len(members) < number:
+            url = category_url + '&cmlimit=' + str(min(category_batch_size, number - len(members)))
+            if continue_token is not None:
+                url += '&cmcontinue=' + quote(continue_token)
+            data = self.get(url).json()
+            members.extend(data['query']['categorymembers'])
+
+            # The Wikipedia API sends the category back in chunks, with a continue token pointing at the next one
+            if 'continue' not in data:
+                break
+            continue_token = data['continue']['cmcontinue']
+        return members[:number]
+
+    # Get the current revision id of each of the pages, as a dict keyed by pageid
+    # revisions_url is the revisions API query, ending in its pageids parameter - the pageids are appended to it
+    # Pages that don't exist any more are left out
+    def latestRevisions(self, revisions_url, pageids):
+        revisions = {}
+        for start in range(0, len(pageids), revision_batch_size):
+            batch = pageids[start:start + revision_batch_size]
+            data = self.get(revisions_url + quote('|'.join(str(pageid) for pageid in batch))).json()
+            for page in data['query']['pages'].values():
+                if 'revisions' in page:
+                    revisions[page['pageid']] = page['revisions'][0]['revid']
+        return revisions
+
+    def close(self):
+        self.session.close()
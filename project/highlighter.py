@@ -0,0 +1,68 @@
+# highlighter.py
+# Natural Language Processing
+
+# Marks n-grams of a model in a cleaned article text, for the Web front-end.
+# The text is split into words the same way the featurizer splits it, and each n-gram is matched on word boundaries
+# in a single pass over the word list: a word is only joined with the words after it when it is the first word of
+# some n-gram to mark, so the cost grows with the article length, not with the number of n-grams marked.
+# The matches are spans of character offsets with the label and weight of their n-gram, and the marked-up HTML is
+# built from them in one more pass. This used to be one str.replace() over the whole marked-up text per n-gram,
+# which copied the text every time and could match inside the markup added for an earlier n-gram.
+
+import html
+from itertools import accumulate
+
+from project import featurizer
+
+# Character offset of the start of each word of a word list, as split from a text with text.split(" ")
+def wordStarts(words):
+    return [0] + list(accumulate(len(word) + 1 for word in words[:-1]))
+
+# The spans of a text where n-grams to mark appear, as (start, end, n-gram, label, weight) tuples, sorted
+# weights maps each n-gram to mark to its (label, weight), e.g. from the model's most informative features
+# For a model with hashed features (hash_bits), weights maps bucket names instead, and orders gives the n-gram
+# orders to look for - every n-gram of those orders is then hashed and looked up
+def ngramSpans(text, weights, orders=None, hash_bits=None):
+    words = text.split(" ")
+    starts = wordStarts(words)
+    spans = []
+
+    if hash_bits:
+        for order in orders:
+            for i in range(len(words) - order + 1):
+                name = featurizer.bucketName(featurizer.bucket(" ".join(words[i:i + order]), hash_bits))
+                if name in weights:
+                    spans.append((starts[i], starts[i + order - 1] + len(words[i + order - 1]), name) + tuple(weights[name]))
+        spans.sort()
+        return spans
+
+    # The first words of the n-grams of each order - only positions starting with one of them can match
+    first_words = {}
+    for ngram in weights:
+        ngram_words = ngram.split(" ")
+        if ngram.strip():
+            first_words.setdefault(len(ngram_words), set()).add(ngram_words[0])
+
+    for order, firsts in first_words.items():
+        for i in [i for i, word in enumerate(words[:len(words) - order + 1]) if word in firsts]:
+            ngram = " ".join(words[i:i + order])
+            if ngram in weights:
+                spans.append((starts[i], starts[i + order - 1] + len(words[i + order - 1]), ngram) + tuple(weights[ngram]))
+    spans.sort()
+    return spans
+
+# The text as HTML, with the spans in <mark> elements titled with their label and weight
+# Where spans overlap, the one that starts first (or the longer of two starting together) is marked
+def markText(text, spans):
+    pieces = []
+    position = 0
+    for start, end, ngram, label, weight in sorted(spans, key=lambda span: (span[0], -span[1])):
+        if start < position:
+            continue
+        pieces.append(html.escape(text[position:start]))
+        pieces.append('<mark title="%s">' % html.escape('%s %+.3f' % (label, weight)))
+        pieces.append(html.escape(text[start:end]))
+        pieces.append('</mark>')
+        position = end
+    pieces.append(html.escape(text[position:]))
+    return ''.join(pieces)
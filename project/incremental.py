@@ -0,0 +1,120 @@
+# incremental.py
+# Natural Language Processing
+
+# Keeps a model up to date as new articles are tagged, without training it again from the start.
+# The training state is kept in a file next to the model: the sufficient statistics of the model (the per-label
+# feature counts for Naive Bayes, the weights for maxent), and, for each training category, the pageids already
+# ingested and the time the latest of them was added to the category. Each run lists the category from that time
+# on (category members sorted by the time they were added), ingests only the articles it hasn't seen, updates the
+# statistics with them and publishes the next version of the model. The time a run takes is proportional to the
+# number of new articles, not to the size of the corpus.
+# Naive Bayes updates are exact - the model is the same as one trained on all the articles at once. Maxent updates
+# start from the previous weights and are regularized towards them (see training.trainMaxent), so the previous
+# model acts as a prior for the new articles.
+
+import os
+import pickle
+import tempfile
+from urllib.parse import quote
+
+from project import training
+
+# Lists category members in the order they were added to the category, with the time each was added
+members_query = '&cmsort=timestamp&cmdir=asc&cmprop=ids|title|timestamp'
+
+# The kinds of classifier that can be updated
+incremental_kinds = ['maxent', 'bayes']
+
+# The training state of an incrementally updated model
+# kind, ngram_size, hash_bits and limits (word_mincount, word_maxcount, bigram_mincount) say how its featuresets are
+# built, and must stay the same from one update to the next
+class TrainingState(object):
+    def __init__(self, kind, ngram_size, hash_bits=None, limits=None):
+        if kind not in incremental_kinds:
+            raise ValueError('Only ' + ' and '.join(incremental_kinds) + ' models can be updated incrementally, not ' + repr(kind))
+        self.kind = kind
+        self.ngram_size = ngram_size
+        self.hash_bits = hash_bits
+        self.limits = limits
+        self.version = 0
+        self.categories = {}
+        self.statistics = training.NaiveBayesCounts() if kind == 'bayes' else None
+
+    # The settings a run must use to update this state, as a tuple to compare with
+    def settings(self):
+        return self.kind, self.ngram_size, self.hash_bits, self.limits
+
+    # The members of a category that haven't been ingested yet, oldest first, up to number of them
+    # category_url is the categorymembers API query for the category - the members_query parameters and the time of
+    # the latest ingested member are added to it. Members added at that same time are listed again, so they are
+    # told apart by their pageids.
+    def newMembers(self, fetcher, category_url, category, number):
+        progress = self.categories.get(category)
+        url = category_url + members_query
+        if progress is not None and progress['timestamp']:
+            url += '&cmstart=' + quote(progress['timestamp'])
+        ingested = progress['pageids'] if progress is not None else set()
+
+        # Ask for enough members to skip the ones listed again
+        listed = fetcher.categoryMembers(url, number + len(progress['latest']) if progress is not None else number)
+        return [member for member in listed if member['pageid'] not in ingested][:number]
+
+    # Record that the members of a category (as returned by newMembers) have been ingested
+    def markIngested(self, category, members):
+        progress = self.categories.setdefault(category, {'timestamp': None, 'pageids': set(), 'latest': set()})
+        for member in members:
+            progress['pageids'].add(member['pageid'])
+            timestamp = member.get('timestamp')
+            if timestamp is None:
+                continue
+            if timestamp != progress['timestamp'] and (progress['timestamp'] is None or timestamp > progress['timestamp']):
+                progress['timestamp'] = timestamp
+                progress['latest'] = set()
+            if timestamp == progress['timestamp']:
+                progress['latest'].add(member['pageid'])
+
+    # The number of articles ingested from all the categories
+    def __len__(self):
+        return sum(len(progress['pageids']) for progress in self.categories.values())
+
+    # The current model, or None if nothing has been ingested yet
+    def classifier(self):
+        if self.kind == 'bayes':
+            return self.statistics.classifier() if len(self.statistics) else None
+        return self.statistics
+
+    # Update the statistics with new (featureset, label) tuples, and move on to the next version
+    # l2 is the regularization strength of maxent updates, towards the previous weights
+    def update(self, labeled_featuresets, l2=1.0):
+        if self.kind == 'bayes':
+            for featureset, label in labeled_featuresets:
+                self.statistics.add(featureset, label)
+        else:
+            data = training.SparseFeaturesets(labeled_featuresets)
+            if len(data):
+                self.statistics = training.trainMaxent(data, l2, previous=self.statistics)
+        self.version += 1
+
+    # Save the state to a file, replacing the previous one only once the new one is completely written
+    def save(self, path):
+        dumpAtomic(self, path)
+
+# Load the training state saved in a file, or None if there is none yet
+def loadState(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+# Pickle an object to a file through a temporary file in the same directory, which then replaces the file
+# Readers, like the Web front-end's model registry, only ever see the old file or the complete new one
+def dumpAtomic(obj, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump(obj, file)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
@@ -0,0 +1,129 @@
+# registry.py
+# Natural Language Processing
+
+# Keeps trained models in memory so each worker process loads a model file once instead of on every request.
+# A loaded model is shared read-only by every request and thread in the process.
+# The file is only loaded again when it changes on disk (its mtime/size changes and so does its contents hash).
+
+import gc
+import hashlib
+import os
+import pickle
+import re
+import threading
+
+from project import compactmodel
+from project import vocabulary
+
+# Loaded models, keyed by absolute file path
+# Each entry holds the model plus the mtime, size and hash of the file it was loaded from
+_models = {}
+
+# Only one thread at a time may load or reload a model
+_lock = threading.Lock()
+
+# Loader for pickled NLTK classifiers
+def loadPickle(path):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+# Default loader - compact model files (.model) are memory-mapped, anything else is a pickled NLTK classifier
+# Pickled maxent and Bayes classifiers are converted to the compact layout in memory, so that they are scored
+# by the vectorized scorer instead of NLTK
+def loadModel(path):
+    if path.endswith('.model'):
+        return compactmodel.loadModel(path)
+    classifier = loadPickle(path)
+    if compactmodel.isCompactable(classifier):
+        return compactmodel.fromClassifier(classifier)
+    return classifier
+
+# Hash of the file contents, used to tell a real change apart from a touched or re-copied file
+def fileDigest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Get the model stored in a file
+# The cached model is returned as long as the file hasn't changed, so this is cheap to call on every request
+def getModel(path, loader=loadModel):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+
+    # Fast path - no lock needed to read a finished entry
+    entry = _models.get(path)
+    if entry is not None and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+        return entry['model']
+
+    with _lock:
+        # Another thread may have reloaded the model while we waited for the lock
+        entry = _models.get(path)
+        if entry is not None and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['model']
+
+        # The mtime changed, but the contents may not have - keep the loaded model if so
+        digest = fileDigest(path)
+        if entry is not None and entry['digest'] == digest:
+            _models[path] = dict(entry, mtime=stat.st_mtime_ns, size=stat.st_size)
+            return entry['model']
+
+        model = loader(path)
+        _models[path] = {'model': model, 'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'digest': digest}
+        return model
+
+# Hash of the file the loaded model came from, e.g. to tell the results of different models apart
+def getDigest(path):
+    getModel(path)
+    return _models[os.path.abspath(path)]['digest']
+
+# Load a model ahead of time, e.g. in the gunicorn master before it forks (gunicorn --preload)
+# The loaded objects are moved out of the garbage collector's reach so that the collector doesn't write to
+# their pages in the workers, which would make each worker copy the memory it could have shared
+def preload(path, loader=loadModel):
+    model = getModel(path, loader)
+    if hasattr(model, 'prepare'):
+        model.prepare()
+    if hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+    return model
+
+# The vocabulary a model was trained with (trainer.py --vocabulary-size saves it next to the model file), as a
+# frozenset of feature names, or None if it has none
+# Like models, it is loaded once and loaded again only when its file changes
+def getVocabulary(path):
+    vocabulary_path = vocabulary.vocabularyPath(path)
+    if not os.path.exists(vocabulary_path):
+        return None
+    return getModel(vocabulary_path, vocabulary.loadVocabulary)
+
+# The n-gram size a model was trained on, from its filename (trainer.py names models like maxent_3gram100.pickle)
+def ngramSize(path):
+    for size in range(1, 4):
+        if str(size) + 'gram' in os.path.basename(path):
+            return size
+    return 4
+
+# The number of hash bits a model was trained with (trainer.py --hash-bits adds '_hash<bits>' to the filename),
+# or None if its features aren't hashed
+def hashBits(path):
+    match = re.search(r"_hash([0-9]+)", os.path.basename(path))
+    if match:
+        return int(match.group(1))
+    return None
+
+# The extractor version of the texts a model was trained on (see extractor.version), which the texts it classifies
+# have to be extracted with too
+# Models from before trainer.py recorded it were trained on version 0 texts
+def textVersion(path):
+    model = getModel(path)
+    if isinstance(model, compactmodel.CompactClassifier):
+        return model.textVersion()
+    return getattr(model, 'text_version', 0)
+
+# Forget every loaded model, so the next getModel call loads the file again
+def clear():
+    with _lock:
+        _models.clear()
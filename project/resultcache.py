@@ -0,0 +1,58 @@
+# resultcache.py
+# Natural Language Processing
+
+# Keeps classification results, so that an article that was classified before is answered without downloading,
+# parsing, featurizing and scoring it again.
+# Results are stored in the Django cache named 'classify' (see CACHES in gettingstarted/settings.py), keyed by the
+# model, the article's normalized title and its revision id - so an edited article is classified again.
+# The latest revision id of each title is remembered too, for CLASSIFY_REVISION_TIMEOUT seconds, so that repeated
+# requests for a popular article don't even have to ask Wikipedia for its revision.
+
+import hashlib
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from django.conf import settings
+from django.core.cache import caches
+
+def cache():
+    return caches['classify']
+
+# URL parameters that pick a page other than the latest revision of the titled article, e.g. an old revision
+unkeyed_parameters = ['oldid', 'diff', 'curid']
+
+# The normalized "host/Title" of a Wikipedia article URL, or None if the URL doesn't name an article by title
+# Mobile and desktop URLs, underscores and spaces, and a lowercase first letter all give the same title
+# URLs of old revisions, diffs and special pages give None, so they are classified without the cache
+def articleKey(url):
+    parts = urlsplit(url)
+    host = parts.netloc.lower().replace('.m.wikipedia.org', '.wikipedia.org')
+    query = parse_qs(parts.query)
+    if any(parameter in query for parameter in unkeyed_parameters):
+        return None
+    if parts.path.startswith('/wiki/'):
+        title = unquote(parts.path[len('/wiki/'):])
+    else:
+        title = query.get('title', [''])[0]
+    title = title.replace('_', ' ').strip()
+    if not host or not title or title.lower().startswith('special:'):
+        return None
+    return host + '/' + title[0].upper() + title[1:]
+
+# Cache keys are hashed, as titles can be longer than, or contain characters not allowed in, some backends' keys
+def cacheKey(*parts):
+    return hashlib.sha1('\x00'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+# The remembered latest revision id of an article, or None if it isn't known (or was remembered too long ago)
+def getRevision(article_key):
+    return cache().get(cacheKey('revision', article_key))
+
+def setRevision(article_key, revid):
+    cache().set(cacheKey('revision', article_key), revid, settings.CLASSIFY_REVISION_TIMEOUT)
+
+# The stored result of classifying a revision of an article with a model, or None
+# model_version identifies the model, e.g. the hash of its file, so that a new model doesn't get old results
+def getResult(model_version, article_key, revid):
+    return cache().get(cacheKey('result', model_version, article_key, revid))
+
+def setResult(model_version, article_key, revid, result):
+    cache().set(cacheKey('result', model_version, article_key, revid), result)
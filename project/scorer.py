@@ -0,0 +1,240 @@
+# scorer.py
+# Natural Language Processing
+
+# Vectorized scoring for compact maxent and Naive Bayes models, used instead of NLTK's classify().
+# NLTK walks every feature of an article through Python dicts, building (fname, fval, label) tuples once per label.
+# Here a batch of featuresets is mapped once to a sparse vector per article - each feature's row in the model's
+# name and pair tables - and the label scores are the products of those sparse vectors with the model's weight
+# matrices, computed with NumPy for the whole batch at once.
+
+# Usage, to check the scores match NLTK's on trained models and compare speed:
+# python -m project.scorer maxent_3gram100.pickle models/bayes_2gram.pickle
+
+import itertools
+import math
+import pickle
+import random
+import sys
+import time
+
+import numpy
+
+from project import compactmodel
+from project import featurizer
+
+# A batch of featuresets as sparse vectors over a model's features, in parallel arrays
+# Only features whose name the model knows are kept: one entry per (article, known feature)
+class FeatureBatch(object):
+    def __init__(self, size, articles, name_rows, values, pair_keys, pair_valid):
+        self.size = size
+        self.articles = articles
+        self.name_rows = name_rows
+        self.values = values
+        self.pair_keys = pair_keys
+        self.pair_valid = pair_valid
+
+# Map featuresets to sparse vectors over a model's features, so they can be scored together
+def vectorize(model, featuresets):
+    index = model.nameIndex()
+    rows = []
+    values = []
+    for featureset in featuresets:
+        rows.append(numpy.fromiter(map(index.get, featureset, itertools.repeat(-1)), dtype=numpy.int64, count=len(featureset)))
+        values.append(numpy.fromiter(featureset.values(), dtype=numpy.int64, count=len(featureset)))
+    lengths = [len(r) for r in rows]
+    rows = numpy.concatenate(rows) if rows else numpy.zeros(0, dtype=numpy.int64)
+    values = numpy.concatenate(values) if values else numpy.zeros(0, dtype=numpy.int64)
+    articles = numpy.repeat(numpy.arange(len(featuresets)), lengths)
+
+    known = rows >= 0
+    rows = rows[known]
+    values = values[known]
+
+    # Values too large for the pair table can't have been seen in training
+    valid = (values > compactmodel.none_value) & (values < compactmodel.value_bias)
+    pair_keys = compactmodel.pairKeys(rows, numpy.where(valid, values, 0))
+    return FeatureBatch(len(featuresets), articles[known], rows, values, pair_keys, valid)
+
+# Find keys in a sorted key table
+# Returns the row of each key, and whether the key was found at all
+def lookup(sorted_keys, keys):
+    if len(sorted_keys) == 0:
+        return numpy.zeros(len(keys), dtype=numpy.int64), numpy.zeros(len(keys), dtype=bool)
+    rows = numpy.searchsorted(sorted_keys, keys)
+    rows[rows == len(sorted_keys)] = 0
+    return rows, sorted_keys[rows] == keys
+
+# Sparse matrix product: for each article, the sum of the given matrix rows that belong to it
+# rows and articles are parallel arrays, the result has one row per article and one column per label
+def sumRows(matrix, rows, articles, size):
+    selected = numpy.asarray(matrix[rows], dtype=numpy.float64)
+    scores = numpy.zeros((size, matrix.shape[1]), dtype=numpy.float64)
+    for column in range(matrix.shape[1]):
+        scores[:, column] = numpy.bincount(articles, weights=selected[:, column], minlength=size)
+    return scores
+
+# Maxent scores are the sums of the weights of the features present in the article
+# NLTK normalizes these sums as base 2 logs (a DictionaryProbDist with log=True), so they are used as they are
+def maxentScores(model, batch):
+    arrays = model._arrays
+    rows, found = lookup(arrays['pair_keys'], batch.pair_keys)
+    found &= batch.pair_valid
+    rows = rows[found]
+    articles = batch.articles[found]
+    scores = sumRows(arrays['pair_weights'], rows, articles, batch.size) + arrays['alwayson']
+
+    # GIS models have a correction feature, whose value is C minus the number of active features
+    if 'correction_constant' in model._meta:
+        active = sumRows(arrays['pair_active'], rows, articles, batch.size) + (1 if model._meta['alwayson'] else 0)
+        scores += model._meta['correction_weight'] * (model._meta['correction_constant'] - active)
+    return scores
+
+# Naive Bayes scores are the label's prior plus the log probability of each feature's value under the label
+def bayesScores(model, batch):
+    arrays = model._arrays
+    pair_rows, pair_found = lookup(arrays['pair_keys'], batch.pair_keys)
+    pair_found &= batch.pair_valid
+
+    # Features the model has never seen were already dropped, as NLTK ignores them
+    # Known features with a value never seen in training get the default probability for their name
+    unseen_value = ~pair_found
+    scores = sumRows(arrays['name_default'], batch.name_rows[unseen_value], batch.articles[unseen_value], batch.size)
+    scores += sumRows(arrays['pair_logprob'], pair_rows[pair_found], batch.articles[pair_found], batch.size)
+    return scores + arrays['prior']
+
+scorers = {
+    'maxent': maxentScores,
+    'bayes': bayesScores,
+}
+
+# Base 2 log scores of each label for a batch, one row per article, before normalizing
+def logScores(model, batch):
+    return scorers[model.kind](model, batch)
+
+# The part of the label scores each entry of a batch adds, one row per entry and one column per label (base 2 logs)
+# Summed per article, these are the scores above without the parts that don't belong to any one feature:
+# the maxent always-on and GIS correction weights, and the Bayes prior
+def maxentEntryScores(model, batch):
+    arrays = model._arrays
+    rows, found = lookup(arrays['pair_keys'], batch.pair_keys)
+    found &= batch.pair_valid
+    entry_scores = numpy.zeros((len(rows), len(model.labels())), dtype=numpy.float64)
+    entry_scores[found] = arrays['pair_weights'][rows[found]]
+    return entry_scores
+
+def bayesEntryScores(model, batch):
+    arrays = model._arrays
+    pair_rows, pair_found = lookup(arrays['pair_keys'], batch.pair_keys)
+    pair_found &= batch.pair_valid
+    entry_scores = numpy.asarray(arrays['name_default'][batch.name_rows], dtype=numpy.float64)
+    entry_scores[pair_found] = arrays['pair_logprob'][pair_rows[pair_found]]
+    return entry_scores
+
+entry_scorers = {
+    'maxent': maxentEntryScores,
+    'bayes': bayesEntryScores,
+}
+
+# Turn log scores into probabilities that sum to 1 for each article
+def normalize(scores):
+    scores = numpy.exp2(scores - scores.max(axis=1, keepdims=True))
+    return scores / scores.sum(axis=1, keepdims=True)
+
+# Probability of each label for each featureset - a list of dicts
+def probabilities(model, featuresets):
+    probs = normalize(logScores(model, vectorize(model, featuresets)))
+    labels = model.labels()
+    return [dict(zip(labels, row)) for row in probs.tolist()]
+
+# Probability of each label for each featureset, plus why: the n-grams that moved each article's log odds of its
+# most likely label against the next most likely one the most, as lists of dicts of the n-gram, its count in the
+# article and its contribution (natural log, positive if it points to the most likely label)
+# Features that aren't n-grams (e.g. article_length, which Naive Bayes models count as if it were one) still count
+# towards the probabilities, but aren't part of the explanation
+# The contributions come from the same sparse vectors the scores do, so they cost one more lookup, not another pass
+# over the articles. count limits how many features are kept for each article.
+def explainedProbabilities(model, featuresets, count=None):
+    batch = vectorize(model, featuresets)
+    scores = logScores(model, batch)
+    entry_scores = entry_scorers[model.kind](model, batch)
+    labels = model.labels()
+    index = model.nameIndex()
+    hidden_rows = [index[name] for name in featurizer.non_ngram_features if name in index]
+
+    # The entries of each article are contiguous, in article order
+    bounds = numpy.searchsorted(batch.articles, numpy.arange(batch.size + 1))
+    results = []
+    for article, (row, probs) in enumerate(zip(scores, normalize(scores).tolist())):
+        ranked = numpy.argsort(-row, kind='stable')
+        entries = numpy.arange(bounds[article], bounds[article + 1])
+        if len(labels) > 1:
+            contributions = (entry_scores[entries, ranked[0]] - entry_scores[entries, ranked[1]]) * math.log(2)
+        else:
+            contributions = numpy.zeros(len(entries))
+        # Features that add the same to every label (e.g. maxent features whose value wasn't seen in training) don't explain anything
+        order = numpy.argsort(-numpy.abs(contributions), kind='stable')
+        shown = contributions[order] != 0
+        if hidden_rows:
+            shown &= ~numpy.isin(batch.name_rows[entries[order]], hidden_rows)
+        order = order[shown][:count]
+        explanation = []
+        for i in order:
+            value = batch.values[entries[i]]
+            explanation.append({'feature': model.featureName(batch.name_rows[entries[i]]), 'value': int(value), 'contribution': float(contributions[i])})
+        results.append((dict(zip(labels, probs)), explanation))
+    return results
+
+# Most likely label for each featureset
+def classify(model, featuresets):
+    labels = model.labels()
+    return [labels[i] for i in logScores(model, vectorize(model, featuresets)).argmax(axis=1)]
+
+# Random featuresets for comparing against NLTK - a mix of the model's own features, their names with other
+# values, and names the model has never seen
+def sampleFeaturesets(pairs, count, size):
+    featuresets = []
+    for i in range(count):
+        featureset = {}
+        for fname, fval in random.sample(pairs, min(size, len(pairs))):
+            featureset[fname] = fval if random.random() < 0.7 else fval + 1
+        for j in range(size * 4):
+            featureset['unseen ' + str(i) + ' ' + str(j)] = random.randint(1, 5)
+        featureset['article_length'] = random.randint(100, 10000)
+        featuresets.append(featureset)
+    return featuresets
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as file:
+            classifier = pickle.load(file)
+        if not compactmodel.isCompactable(classifier):
+            sys.stdout.write(path + ': skipped, only maxent and bayes models are scored by the vectorized scorer\n')
+            continue
+        model = compactmodel.fromClassifier(classifier)
+        model.prepare()
+        if model.kind == 'maxent':
+            pairs = [(fname, fval) for fname, fval, label in classifier._encoding._mapping]
+        else:
+            pairs = [(fname, fval) for (label, fname), probdist in classifier._feature_probdist.items() for fval in probdist.samples() if fval is not None]
+        random.seed(0)
+        featuresets = sampleFeaturesets(pairs, 50, 300)
+
+        start = time.time()
+        nltk_labels = [classifier.classify(featureset) for featureset in featuresets]
+        nltk_probs = [classifier.prob_classify(featureset) for featureset in featuresets]
+        nltk_time = (time.time() - start) / 2
+
+        start = time.time()
+        single_labels = [classify(model, [featureset])[0] for featureset in featuresets]
+        single_time = time.time() - start
+
+        start = time.time()
+        batch_labels = classify(model, featuresets)
+        batch_time = time.time() - start
+
+        probs = probabilities(model, featuresets)
+        difference = max(abs(nltk.prob(label) - mine[label]) for nltk, mine in zip(nltk_probs, probs) for label in model.labels())
+        mismatches = sum(a != b or a != c for a, b, c in zip(nltk_labels, single_labels, batch_labels))
+        sys.stdout.write(path + ': ' + str(mismatches) + ' label mismatches, max probability difference ' + str(difference) + '\n')
+        sys.stdout.write('  per article: nltk %.2f ms, vectorized %.2f ms, vectorized batch %.2f ms\n' % (
+            1000 * nltk_time / len(featuresets), 1000 * single_time / len(featuresets), 1000 * batch_time / len(featuresets)))
@@ -0,0 +1,68 @@
+# streaming.py
+# Natural Language Processing
+
+# Classifies an article paragraph by paragraph, for the Web front-end.
+# The paragraphs come from extractor.contentParagraphs as the page is downloaded. They are cleaned and grouped into
+# chunks of about chunk_words words within a section, and each chunk is scored on its own, which tells which part
+# of the article reads as promotional. The n-gram counts of all the chunks so far are kept (featurizer.NgramCounts),
+# along with their featureset, which each chunk only updates for its own n-grams. The article verdict is the score
+# of that featureset - once the whole article is read, exactly the verdict of the article's paragraphs as one text.
+# Reading stops early once the verdict is confident enough.
+# The page's HTML is never held whole, but the cleaned text of every chunk read is (the result page shows it), as
+# are the counts of every n-gram read, so memory still grows with the part of the article that is read. Scoring
+# the article so far after each chunk also goes over its whole featureset, which grows the same way.
+
+from project import cleaner
+from project import featurizer
+
+# Classify the paragraphs of an article
+# paragraphs - (section heading, paragraph text) pairs, e.g. from extractor.contentParagraphs
+# score - a function giving the label and label probabilities (or None) of each of a list of featuresets
+# orders, bigram_mincount, hash_bits, vocabulary - how the model's featuresets are built (see featurizer.articleFeatures)
+# Reading stops once the most likely label has a probability of at least confidence, after at least min_words words
+# Returns the article's label and label probabilities, its chunks (each with its section, cleaned text, number of
+# words, label and label probabilities), the number of words read and whether the whole article was read
+def classifyParagraphs(paragraphs, score, orders, bigram_mincount=featurizer.bigram_mincount, hash_bits=None, vocabulary=None, chunk_words=150, confidence=0.99, min_words=1000):
+    counts = featurizer.NgramCounts(orders, bigram_mincount=bigram_mincount, hash_bits=hash_bits, vocabulary=vocabulary)
+    result = {'label': None, 'probabilities': None, 'chunks': [], 'words': 0, 'complete': True}
+
+    # Score a chunk and the article so far together, and stop if the article's verdict is confident
+    def addChunk(section, texts):
+        text = " ".join(texts)
+        counts.add(text)
+        chunk_features = featurizer.articleFeatures(text, orders, bigram_mincount=bigram_mincount, hash_bits=hash_bits, vocabulary=vocabulary)
+        article_features = counts.featureset()
+        chunk_score, article_score = score([chunk_features, article_features])
+        result['chunks'].append({'section': section, 'text': text, 'words': chunk_features["article_length"], 'label': chunk_score[0], 'probabilities': chunk_score[1]})
+        result['label'], result['probabilities'] = article_score[:2]
+        result['words'] = counts.length
+        probabilities = result['probabilities']
+        return probabilities is not None and counts.length >= min_words and max(probabilities.values()) >= confidence
+
+    chunk_section = None
+    chunk_texts = []
+    chunk_length = 0
+    for section, paragraph in paragraphs:
+        if chunk_texts and section != chunk_section:
+            if addChunk(chunk_section, chunk_texts):
+                result['complete'] = False
+                return result
+            chunk_texts = []
+            chunk_length = 0
+        chunk_section = section
+        text = cleaner.cleanArticle(paragraph).strip()
+        if not text:
+            continue
+        chunk_texts.append(text)
+        chunk_length += text.count(" ") + 1
+        if chunk_length >= chunk_words:
+            if addChunk(chunk_section, chunk_texts):
+                result['complete'] = False
+                return result
+            chunk_texts = []
+            chunk_length = 0
+    if chunk_texts:
+        addChunk(chunk_section, chunk_texts)
+    if not result['chunks']:
+        raise ValueError('The article has no paragraphs')
+    return result
@@ -0,0 +1,163 @@
+# sweep.py
+# Natural Language Processing
+
+# Trains and measures a model for every cell of a grid of classifiers, n-gram sizes, training set sizes and n-gram
+# count limits (word_mincount, word_maxcount, bigram_mincount), like the accuracy table in the README, in one run.
+# The articles are read from trainer.py's corpus file (or the benchmark fixtures) and featurized once per n-gram
+# size, with every n-gram kept. Each cell prunes those featuresets to its own limits (featurizer.prunedFeatures),
+# which is only a pass over the counts, so no text is split or counted again. The cells are trained by a pool of
+# processes that share the featuresets (inherited when the pool forks).
+# Each cell is split like trainer.py splits its articles, and gets a row with its accuracy, training time, model
+# file sizes, load time and scoring latency, written to a CSV file as soon as it is done.
+
+# Usage:
+# python -m project.sweep --corpus corpus.sqlite3 --sizes 20 50 100 --workers 4
+# python -m project.sweep --classifiers bayes --ngram-sizes 1 --word-mincount 1 2 3 --word-maxcount 30 60 --output unigrams.csv
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+
+from project import benchmark
+from project import cleaner
+from project import extractor
+from project import featurizer
+from project import training
+
+default_output = os.path.join('benchmarks', 'sweep.csv')
+
+columns = ['classifier', 'ngram_size', 'training_articles', 'word_mincount', 'word_maxcount', 'bigram_mincount',
+           'hash_bits', 'features', 'accuracy', 'train_s', 'pickle_bytes', 'compact_bytes', 'load_ms', 'latency_ms', 'error']
+
+# The unpruned (featureset, label) tuples of every article, keyed by n-gram size, shared with the pool's processes
+_featuresets = {}
+
+def setFeaturesets(featuresets):
+    global _featuresets
+    _featuresets = featuresets
+
+# Cleaned article texts by label, from trainer.py's corpus file, in the order the categories listed them
+def corpusTexts(path):
+    from project.corpus import Corpus
+    corpus = Corpus(path)
+    texts = {}
+    for label, category in benchmark.corpus_categories.items():
+        texts[label] = [text for text in (corpus.text(pageid) for pageid in corpus.categoryMembers(category)) if text is not None]
+    corpus.close()
+    return texts
+
+# Cleaned article texts by label, from the benchmark fixture pages
+def fixtureTexts(directory=benchmark.fixture_directory):
+    texts = {}
+    for page, label in benchmark.loadFixtures(directory):
+        texts.setdefault(label, []).append(cleaner.cleanArticle(extractor.contentText(page)))
+    return texts
+
+# Split the first size articles of each label into a training and a test set, the way trainer.py does: the first
+# half of the good articles and the second half of the bad ones are for training, the rest for testing
+# articles holds the indices of each label's articles; returns lists of indices
+def splitArticles(articles, size):
+    mid = size // 2
+    good = articles['Good'][:size]
+    bad = articles['Bad'][:size]
+    return good[:mid] + bad[mid:], good[mid:] + bad[:mid]
+
+# The distinct limits that make a difference for an n-gram size, as (word_mincount, word_maxcount, bigram_mincount)
+# Unigrams only depend on the word limits, bigrams and trigrams on bigram_mincount, and quadgrams on none of them,
+# so the limits that don't apply are None and their values aren't tried one by one
+def sizeLimits(ngram_size, word_mincounts, word_maxcounts, bigram_mincounts):
+    if ngram_size == 1:
+        return [(low, high, None) for low, high in itertools.product(word_mincounts, word_maxcounts) if low <= high]
+    if ngram_size <= 3:
+        return [(None, None, count) for count in bigram_mincounts]
+    return [(None, None, None)]
+
+# Train and measure the model of one cell - run by the pool's processes
+def runCell(cell):
+    kind, ngram_size, size, limits, hash_bits, train, test = cell
+    word_mincount, word_maxcount, bigram_mincount = [default if limit is None else limit for limit, default in zip(limits, featurizer.unpruned_limits)]
+    featuresets = _featuresets[ngram_size]
+    prune = lambda featureset: featurizer.prunedFeatures(featureset, ngram_size, word_mincount, word_maxcount, bigram_mincount, hash_bits)
+    train_set = [(prune(featuresets[i][0]), featuresets[i][1]) for i in train]
+    test_set = [(prune(featuresets[i][0]), featuresets[i][1]) for i in test]
+
+    name = '%s_%dgram%d' % (kind, ngram_size, size)
+    if hash_bits:
+        name += '_hash' + str(hash_bits)
+    result = benchmark.measureModel(kind, name, train_set, test_set)
+    row = dict(zip(columns[:7], (kind, ngram_size, size) + tuple(limits) + (hash_bits,)))
+    row['features'] = len(set(feature for featureset, label in train_set for feature in featureset))
+    row.update((key, result[key]) for key in ('accuracy', 'train_s', 'pickle_bytes', 'compact_bytes', 'load_ms', 'error') if key in result)
+    if 'score_articles_per_s' in result:
+        row['latency_ms'] = 1000.0 / result['score_articles_per_s']
+    return row
+
+# Featurize the texts once per n-gram size and run every cell of the grid, yielding a row for each, in grid order
+# texts holds the cleaned texts of each label
+def runSweep(texts, kinds, ngram_sizes, sizes, word_mincounts, word_maxcounts, bigram_mincounts, hash_bits=None, workers=1, log=sys.stderr):
+    labeled = [(text, label) for label in sorted(texts) for text in texts[label]]
+    articles = {}
+    for i, (text, label) in enumerate(labeled):
+        articles.setdefault(label, []).append(i)
+
+    featuresets = {}
+    for ngram_size in ngram_sizes:
+        log.write('Featurizing ' + str(len(labeled)) + ' articles with ' + str(ngram_size) + '-grams...\n')
+        log.flush()
+        all_featuresets = featurizer.articleFeaturesMany((text for text, label in labeled), [ngram_size], *featurizer.unpruned_limits, workers=workers)
+        featuresets[ngram_size] = [(featureset, label) for featureset, (text, label) in zip(all_featuresets, labeled)]
+
+    cells = []
+    for size in sizes:
+        if any(len(articles.get(label, [])) < size for label in ('Good', 'Bad')):
+            log.write('Skipping ' + str(size) + ' articles - there are fewer of each label\n')
+            continue
+        train, test = splitArticles(articles, size)
+        for kind in kinds:
+            for ngram_size in ngram_sizes:
+                for limits in sizeLimits(ngram_size, word_mincounts, word_maxcounts, bigram_mincounts):
+                    cells.append((kind, ngram_size, size, limits, hash_bits, train, test))
+
+    # The processes are forked after the featuresets are set, so they share them instead of being sent a copy
+    log.write('Training ' + str(len(cells)) + ' models...\n')
+    log.flush()
+    setFeaturesets(featuresets)
+    if workers <= 1:
+        for cell in cells:
+            yield runCell(cell)
+        return
+    with featurizer.poolContext().Pool(workers, initializer=setFeaturesets, initargs=(featuresets,)) as pool:
+        for row in pool.imap(runCell, cells):
+            yield row
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Trains and measures a model for every combination of classifier, n-gram size, training set size and n-gram count limits.')
+    parser.add_argument('--corpus', metavar='FILE', help="trainer.py's corpus file to take the articles from (default: the benchmark fixtures)")
+    parser.add_argument('--output', default=default_output, metavar='FILE', help='the CSV file to write (default ' + default_output + ')')
+    parser.add_argument('--classifiers', nargs='+', default=training.classifier_kinds, choices=training.classifier_kinds, help='the classifiers to train (default all)')
+    parser.add_argument('--ngram-sizes', nargs='+', type=int, default=benchmark.ngram_sizes, choices=benchmark.ngram_sizes, help='the n-gram sizes (default all)')
+    parser.add_argument('--sizes', nargs='+', type=int, metavar='N', help='the numbers of articles of each label, as trainer.py\'s training_set_size (default: all of them)')
+    parser.add_argument('--word-mincount', nargs='+', type=int, default=[featurizer.word_mincount], metavar='N', help='the word_mincount values to try')
+    parser.add_argument('--word-maxcount', nargs='+', type=int, default=[featurizer.word_maxcount], metavar='N', help='the word_maxcount values to try')
+    parser.add_argument('--bigram-mincount', nargs='+', type=int, default=[featurizer.bigram_mincount], metavar='N', help='the bigram_mincount values to try')
+    parser.add_argument('--hash-bits', type=int, default=None, metavar='K', help='hash the kept n-grams into 2^K feature buckets')
+    parser.add_argument('--workers', type=int, default=1, metavar='N', help='number of processes to featurize and train with')
+    args = parser.parse_args()
+
+    texts = corpusTexts(args.corpus) if args.corpus else fixtureTexts()
+    sizes = args.sizes or [min(len(texts.get(label, [])) for label in ('Good', 'Bad'))]
+
+    start = time.time()
+    count = 0
+    with open(args.output, 'w', newline='') as file:
+        writer = csv.DictWriter(file, columns)
+        writer.writeheader()
+        for row in runSweep(texts, args.classifiers, args.ngram_sizes, sizes, args.word_mincount, args.word_maxcount, args.bigram_mincount, args.hash_bits, args.workers):
+            writer.writerow(row)
+            file.flush()
+            count += 1
+            sys.stderr.write('%(classifier)s %(ngram_size)d-grams, %(training_articles)d articles: ' % row + ('%.3f accuracy\n' % row['accuracy'] if 'accuracy' in row else row['error'] + '\n'))
+    sys.stdout.write('%d models trained in %.1f seconds, written to %s\n' % (count, time.time() - start, args.output))
@@ -0,0 +1,10 @@
+# Tests of the project app
+# Run with: IS_HEROKU_TEST=1 python webrunner.py test project
+# or with: python -m pytest project/tests
+
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gettingstarted.settings')
+django.setup()
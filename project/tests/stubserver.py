@@ -0,0 +1,74 @@
+# stubserver.py
+# Natural Language Processing
+
+# A local HTTP server for the tests to point the fetcher and the views at, instead of Wikipedia
+# Each request is answered by a function of the server's, which is given the request handler, and the time and path
+# of every request are recorded
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((time.time(), self.path))
+        self.server.respond(self)
+
+    # Keep the test output quiet
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # A handler still sleeping when the test is over doesn't hold it up
+    block_on_close = False
+
+    # respond(handler) answers each request, e.g. with sendResponse
+    def __init__(self, respond):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.respond = respond
+        self.requests = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exception):
+        self.shutdown()
+        self.server_close()
+
+    # The URL of a path on the server
+    def url(self, path):
+        return 'http://127.0.0.1:%d%s' % (self.server_address[1], path)
+
+    # The paths of the requests received so far
+    def paths(self):
+        return [path for sent, path in self.requests]
+
+# Answer a request with a body (bytes or string), after waiting delay seconds
+# With trickle, the body is sent a piece at a time, waiting trickle seconds before each
+def sendResponse(handler, body=b'', status=200, headers=None, delay=0, trickle=None, pieces=10):
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    time.sleep(delay)
+    handler.send_response(status)
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    try:
+        if trickle is None:
+            handler.wfile.write(body)
+            return
+        size = max(len(body) // pieces, 1)
+        for start in range(0, len(body), size):
+            time.sleep(trickle)
+            handler.wfile.write(body[start:start + size])
+            handler.wfile.flush()
+    except (BrokenPipeError, ConnectionResetError):
+        # The client gave up on the response
+        pass
@@ -0,0 +1,31 @@
+# test_benchmark.py
+# Natural Language Processing
+
+# Tests that the benchmark fixtures record where their pages came from
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from project import benchmark
+
+class FixtureTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testSource(self):
+        pages = benchmark.samplePages(2)
+        benchmark.writeFixtures(pages, 'generated', self.directory)
+        self.assertEqual(benchmark.fixtureSource(self.directory), 'generated')
+        self.assertEqual([(page.decode('utf-8'), label) for page, label in benchmark.loadFixtures(self.directory)], pages)
+        with self.assertRaises(ValueError):
+            benchmark.writeFixtures(pages, 'downloaded', self.directory)
+
+    # The checked-in fixtures are generated pages, and say so
+    def testCheckedInFixtures(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(benchmark.fixtureSource(os.path.join(root, benchmark.fixture_directory)), 'generated')
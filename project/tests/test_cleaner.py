@@ -0,0 +1,32 @@
+# test_cleaner.py
+# Natural Language Processing
+
+# Tests that cleanArticle removes the template messages in the same order as the one-replace-per-pass cleaner
+
+import random
+import unittest
+
+from project import cleaner
+
+class CleanerTest(unittest.TestCase):
+    # Removing a message that comes earlier in the order can join the text around it into a later message, which is
+    # then removed too - but not the other way round
+    def testMessageOrder(self):
+        texts = [
+            'This article ' + cleaner.date_message + 'contains content that is written like an advertisement. Rest',
+            'This ' + cleaner.template_message_part + 'article has multiple issues. Please help improve it or discuss these issues on the talk page. Rest',
+            cleaner.multiple_issues[:20] + cleaner.yet_another_template_message + cleaner.multiple_issues[20:],
+            'A major contributor to ' + cleaner.catch_all + 'this article appears to have a close connection with its subject.',
+            # Both messages start with "This ", and the later one is only whole once the earlier one is removed
+            cleaner.another_interesting_template_message[:30] + cleaner.interesting_template_message + cleaner.another_interesting_template_message[30:] + ' foo',
+        ]
+        for text in texts:
+            self.assertEqual(cleaner.cleanArticle(text), cleaner.cleanArticleByPasses(text))
+
+    def testSampleArticles(self):
+        random.seed(0)
+        for i in range(20):
+            text = cleaner.sampleArticle(['company', 'founded', 'This', 'article', 'résumé'], 500)
+            self.assertEqual(cleaner.cleanArticle(text), cleaner.cleanArticleByPasses(text))
+            ascii_text = text.encode('ascii', 'backslashreplace').decode('ascii')
+            self.assertEqual(cleaner.cleanArticle(ascii_text), cleaner.cleanArticleByPasses(ascii_text))
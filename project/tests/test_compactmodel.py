@@ -0,0 +1,79 @@
+# test_compactmodel.py
+# Natural Language Processing
+
+# Tests that a compact model file, memory-mapped back in, gives the labels and probabilities of the NLTK classifier
+# it was made from
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from project import compactmodel
+from project import scorer
+from project import training
+
+featuresets = [
+    ({'founded in': 3, 'leading provider': 2, 'article_length': 5123}, 'Bad'),
+    ({'founded in': 1, 'award winning': 2, 'article_length': 800}, 'Bad'),
+    ({'award winning': 1, 'leading provider': 1, 'article_length': 2400}, 'Bad'),
+    ({'the river': 2, 'its orbit': 3, 'article_length': 5123}, 'Good'),
+    ({'the river': 1, 'the moon': 2, 'article_length': 2400}, 'Good'),
+    ({'its orbit': 1, 'the moon': 1, 'founded in': 1, 'article_length': 800}, 'Good'),
+]
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # The training featuresets, with other values of their features and features the model has never seen
+    def articles(self):
+        random.seed(0)
+        pairs = [(fname, fval) for featureset, label in featuresets for fname, fval in featureset.items()]
+        return [featureset for featureset, label in featuresets] + scorer.sampleFeaturesets(pairs, 10, 4)
+
+    def checkRoundTrip(self, classifier):
+        path = os.path.join(self.directory, 'model.model')
+        compactmodel.exportClassifier(classifier, path)
+        model = compactmodel.loadModel(path)
+        self.assertIsInstance(model, compactmodel.CompactClassifier)
+        self.assertTrue(any(isinstance(array, numpy.memmap) for array in model._arrays.values()))
+        self.assertEqual(sorted(model.labels()), sorted(classifier.labels()))
+        self.assertTrue(model.informativeFeatures(5))
+
+        articles = self.articles()
+        for in_memory in (compactmodel.fromClassifier(classifier), model):
+            labels = scorer.classify(in_memory, articles)
+            for label, probabilities, featureset in zip(labels, scorer.probabilities(in_memory, articles), articles):
+                expected = classifier.prob_classify(featureset)
+                for name in classifier.labels():
+                    self.assertAlmostEqual(probabilities[name], expected.prob(name), places=9)
+                # Ties (e.g. an article with no known features) are broken differently by NLTK
+                if abs(probabilities['Good'] - probabilities['Bad']) > 1e-9:
+                    self.assertEqual(label, classifier.classify(featureset))
+
+    def testMaxent(self):
+        for backend in training.maxent_backends:
+            self.checkRoundTrip(training.train('maxent', featuresets, max_iter=5, maxent_backend=backend))
+
+    def testBayes(self):
+        self.checkRoundTrip(training.train('bayes', featuresets))
+
+    def testTextVersion(self):
+        classifier = training.train('bayes', featuresets)
+        classifier.text_version = 1
+        path = os.path.join(self.directory, 'model.model')
+        compactmodel.exportClassifier(classifier, path)
+        self.assertEqual(compactmodel.loadModel(path).textVersion(), 1)
+
+    def testNotCompactable(self):
+        classifier = training.train('decisiontree', featuresets)
+        self.assertFalse(compactmodel.isCompactable(classifier))
+        with self.assertRaises(ValueError):
+            compactmodel.fromClassifier(classifier)
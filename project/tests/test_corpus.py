@@ -0,0 +1,34 @@
+# test_corpus.py
+# Natural Language Processing
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from project.corpus import Corpus
+
+class CorpusTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.corpus = Corpus(os.path.join(self.directory, 'corpus.sqlite3'))
+
+    def tearDown(self):
+        self.corpus.close()
+        shutil.rmtree(self.directory)
+
+    # A category listed again with fewer members keeps none of the ones only the earlier listing had
+    def testCategoryMembers(self):
+        self.corpus.setCategoryMembers('Good', [1, 2, 3, 4])
+        self.corpus.setCategoryMembers('Bad', [7, 8])
+        self.corpus.setCategoryMembers('Good', [5, 2])
+        self.assertEqual(self.corpus.categoryMembers('Good'), [5, 2])
+        self.assertEqual(self.corpus.categoryMembers('Bad'), [7, 8])
+        self.corpus.setCategoryMembers('Bad', [])
+        self.assertEqual(self.corpus.categoryMembers('Bad'), [])
+
+    def testStore(self):
+        self.corpus.store(1, 10, '<html>old</html>', 'old text', 1)
+        self.corpus.store(1, 11, '<html>new</html>', 'new text', 1)
+        self.assertEqual(self.corpus.text(1), 'new text')
+        self.assertEqual(self.corpus.text(2), None)
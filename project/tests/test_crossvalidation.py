@@ -0,0 +1,42 @@
+# test_crossvalidation.py
+# Natural Language Processing
+
+import unittest
+
+from project import crossvalidation
+from project import training
+
+class FoldTest(unittest.TestCase):
+    # 7 good and 5 bad articles, in no particular order
+    labels = ['Good', 'Bad', 'Good', 'Good', 'Bad', 'Good', 'Bad', 'Good', 'Good', 'Bad', 'Good', 'Bad']
+
+    def testStratifiedFolds(self):
+        for folds in (2, 3, 5):
+            assigned = crossvalidation.stratifiedFolds(self.labels, folds, seed=1)
+            self.assertEqual(len(assigned), folds)
+
+            # Every row is in exactly one fold
+            self.assertEqual(sorted(row for rows in assigned for row in rows), list(range(len(self.labels))))
+
+            # The folds differ by at most one row in size and in the rows of each label
+            self.assertLessEqual(max(map(len, assigned)) - min(map(len, assigned)), 1)
+            for label in ('Good', 'Bad'):
+                counts = [sum(1 for row in rows if self.labels[row] == label) for rows in assigned]
+                self.assertLessEqual(max(counts) - min(counts), 1, (folds, label, counts))
+
+    def testFoldSplits(self):
+        splits = crossvalidation.foldSplits(self.labels, 3, repeats=2)
+        self.assertEqual(len(splits), 6)
+        for train_rows, test_rows in splits:
+            self.assertFalse(set(train_rows) & set(test_rows))
+            self.assertEqual(sorted(train_rows + test_rows), list(range(len(self.labels))))
+
+        # Each repeat is shuffled differently, the same seed the same way
+        self.assertNotEqual(splits[:3], splits[3:])
+        self.assertEqual(crossvalidation.foldSplits(self.labels, 3, repeats=2), splits)
+
+    def testTooManyFolds(self):
+        data = training.SparseFeaturesets([({'a': 1}, 'Good'), ({'b': 1}, 'Bad')])
+        for folds in (1, 3):
+            with self.assertRaises(ValueError):
+                crossvalidation.crossValidate(data, 'bayes', folds)
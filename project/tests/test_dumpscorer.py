@@ -0,0 +1,73 @@
+# test_dumpscorer.py
+# Natural Language Processing
+
+# Tests of the dump scorer on a small synthetic dump, run as a script like on a real one
+
+import bz2
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from project import dumpscorer
+
+root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+model = os.path.join(root, 'maxent_3gram100.model')
+
+# A dump in the export schema: articles, a redirect and a talk page
+def dumpXml(articles):
+    pages = ''.join('<page><title>%s</title><ns>0</ns><id>%d</id><revision><id>%d</id><text xml:space="preserve">%s</text></revision></page>' % (title, pageid, pageid * 10, text)
+                    for pageid, title, text in articles)
+    pages += '<page><title>Redirect</title><ns>0</ns><id>900</id><redirect title="Moon" /><revision><text>#REDIRECT [[Moon]]</text></revision></page>'
+    pages += '<page><title>Talk:Moon</title><ns>1</ns><id>901</id><revision><text>Talk about the company</text></revision></page>'
+    return '<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/"><siteinfo><sitename>Test</sitename></siteinfo>' + pages + '</mediawiki>'
+
+articles = [
+    (pageid, 'Article %d' % pageid, "'''Article''' is a [[company|leading company]] founded in 2001.{{Infobox|x=1}}<ref>Source</ref> " * (pageid * 5))
+    for pageid in range(1, 9)
+]
+
+class DumpScorerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dump = os.path.join(self.directory, 'dump.xml.bz2')
+        with bz2.open(self.dump, 'wt', encoding='utf-8') as file:
+            file.write(dumpXml(articles))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def runScorer(self, *arguments):
+        output = os.path.join(self.directory, 'scores.tsv')
+        command = [sys.executable, '-m', 'project.dumpscorer', self.dump, model, output] + list(arguments)
+        process = subprocess.run(command, cwd=root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        self.assertEqual(process.returncode, 0, process.stdout)
+        with open(output, encoding='utf-8') as file:
+            return [line.rstrip('\n').split('\t') for line in file]
+
+    def testDumpPages(self):
+        pages = list(dumpscorer.dumpPages(self.dump))
+        self.assertEqual([pageid for pageid, title, text in pages], list(range(1, 9)))
+        text = dumpscorer.wikitextToText(pages[0][2])
+        self.assertIn('Article is a leading company founded in 2001.', text)
+        self.assertNotIn('Infobox', text)
+        self.assertNotIn('Source', text)
+
+    # Without --top, every article is written in the order of the dump
+    def testAllArticles(self):
+        lines = self.runScorer('--workers', '2', '--chunksize', '3')
+        self.assertEqual(lines[0], ['pageid', 'title', 'probability'])
+        self.assertEqual([int(line[0]) for line in lines[1:]], list(range(1, 9)))
+        for line in lines[1:]:
+            self.assertTrue(0 <= float(line[2]) <= 1)
+
+    def testTop(self):
+        everything = dict((int(line[0]), float(line[2])) for line in self.runScorer()[1:])
+        lines = self.runScorer('--top', '3')
+        self.assertEqual(lines[0], ['rank', 'pageid', 'title', 'probability'])
+        self.assertEqual(len(lines), 4)
+        expected = sorted(everything, key=lambda pageid: (-round(everything[pageid], 6), pageid))[:3]
+        self.assertEqual([int(line[1]) for line in lines[1:]], expected)
@@ -0,0 +1,44 @@
+# test_extractor.py
+# Natural Language Processing
+
+# Tests that models are given texts extracted the way their training texts were
+
+import unittest
+
+from project import benchmark
+from project import extractor
+from project import registry
+
+page = '<html><body><div class="mw-content-ltr"><p>Zürich "it\'s" – founded</p>\n<p>Next</p><div class="navbox">Nav</div></div></body></html>'
+
+class TextVersionTest(unittest.TestCase):
+    def testLegacyText(self):
+        legacy = extractor.contentTextAs(page, 0)
+        self.assertEqual(legacy, extractor.contentTextBySoup(page))
+        self.assertIn('Z\\xc3\\xbcrich', legacy)
+        self.assertIn('\\n', legacy)
+
+        # A paragraph made into version 0 text has the same escapes as the whole page did
+        paragraph = next(extractor.contentParagraphs([page.encode('utf-8')]))[1]
+        self.assertIn(extractor.textAs(paragraph, 0), legacy)
+
+    # The version 0 text built from the lxml tree is the text BeautifulSoup gave
+    def testLegacyFixtures(self):
+        for html, label in benchmark.loadFixtures():
+            self.assertEqual(extractor.contentTextLegacy(html), extractor.contentTextBySoup(html))
+
+    def testCurrentText(self):
+        text = extractor.contentTextAs(page)
+        self.assertEqual(text, extractor.contentText(page))
+        self.assertEqual(extractor.textAs(text), text)
+        self.assertNotIn('Nav', text)
+
+    def testMissingContent(self):
+        for text_version in (0, extractor.version):
+            with self.assertRaises(ValueError):
+                extractor.contentTextAs('<html><body><p>No content div</p></body></html>', text_version)
+
+    # The shipped model was trained on the BeautifulSoup extraction, before models recorded their text version
+    def testShippedModel(self):
+        self.assertEqual(registry.textVersion('maxent_3gram100.model'), 0)
+        self.assertEqual(registry.textVersion('maxent_3gram100.pickle'), 0)
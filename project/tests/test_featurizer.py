@@ -0,0 +1,39 @@
+# test_featurizer.py
+# Natural Language Processing
+
+# Tests that the featureset NgramCounts keeps up to date piece by piece is the one articleFeatures gives
+
+import random
+import unittest
+
+from project import featurizer
+from project import streaming
+
+words = ['a', 'b', 'c', 'd', 'e', 'the', 'of', 'company', 'founded', 'résumé']
+
+class NgramCountsTest(unittest.TestCase):
+    def testIncrementalFeatureset(self):
+        random.seed(0)
+        pieces = [' '.join(random.choice(words) for i in range(random.randint(1, 40))) for j in range(25)]
+        full = featurizer.articleFeatures(' '.join(pieces), [1, 2, 3])
+        for orders in ([1], [2], [3], [4], [1, 2, 3]):
+            for hash_bits in (None, 6):
+                for vocabulary in (None, set(list(full)[::2]) | set(featurizer.bucketName(number) for number in range(0, 64, 2))):
+                    counts = featurizer.NgramCounts(orders, hash_bits=hash_bits, vocabulary=vocabulary)
+                    for end, piece in enumerate(pieces, 1):
+                        counts.add(piece)
+                        expected = featurizer.articleFeatures(' '.join(pieces[:end]), orders, hash_bits=hash_bits, vocabulary=vocabulary)
+                        self.assertEqual(counts.featureset(), expected, (orders, hash_bits, vocabulary is not None, end))
+
+    # The article verdict of paragraph mode is the score of the whole article's featureset
+    def testParagraphVerdict(self):
+        random.seed(1)
+        paragraphs = [('Section %d' % (j // 3), ' '.join(random.choice(words) for i in range(60))) for j in range(12)]
+        scored = []
+        def score(featuresets):
+            scored.append(featuresets[-1])
+            return [('Good', None) for featureset in featuresets]
+        result = streaming.classifyParagraphs(paragraphs, score, [2], chunk_words=100)
+        self.assertTrue(result['complete'])
+        self.assertEqual(result['words'], 12 * 60)
+        self.assertEqual(scored[-1], featurizer.articleFeatures(' '.join(text for section, text in paragraphs), [2]))
@@ -0,0 +1,109 @@
+# test_fetcher.py
+# Natural Language Processing
+
+# Tests of the fetcher's retries, backoff, rate limit and response limits, against a stub server
+
+import threading
+import time
+import unittest
+
+import requests
+
+from project.fetcher import Fetcher, ResponseTooLarge
+from project.tests.stubserver import StubServer, sendResponse
+
+# Answer with each of the statuses in turn (with their headers), then with 200 from then on
+def failingResponder(statuses, headers=None):
+    lock = threading.Lock()
+    remaining = list(statuses)
+    def respond(handler):
+        with lock:
+            status = remaining.pop(0) if remaining else 200
+        sendResponse(handler, 'done' if status == 200 else 'failed', status=status, headers=headers if status != 200 else None)
+    return respond
+
+# The seconds between one request and the next
+def gaps(server):
+    times = [sent for sent, path in server.requests]
+    return [later - earlier for earlier, later in zip(times, times[1:])]
+
+class RetryTest(unittest.TestCase):
+    def testRetriesFailedResponses(self):
+        with StubServer(failingResponder([503, 500, 502])) as server:
+            response = Fetcher(rate=0, retries=3, backoff=0).get(server.url('/page'))
+        self.assertEqual(response.text, 'done')
+        self.assertEqual(len(server.requests), 4)
+
+    def testGivesUp(self):
+        with StubServer(failingResponder([500] * 10)) as server:
+            with self.assertRaises(requests.RequestException):
+                Fetcher(rate=0, retries=2, backoff=0).get(server.url('/page'))
+        self.assertEqual(len(server.requests), 3)
+
+    def testNoRetries(self):
+        with StubServer(failingResponder([503])) as server:
+            with self.assertRaises(requests.RequestException):
+                Fetcher(rate=0, retries=0).get(server.url('/page'))
+        self.assertEqual(len(server.requests), 1)
+
+    # The waits between tries grow exponentially (urllib3 retries the first failure at once)
+    def testBackoff(self):
+        with StubServer(failingResponder([503, 503, 503])) as server:
+            Fetcher(rate=0, retries=3, backoff=0.1).get(server.url('/page'))
+        waits = gaps(server)
+        self.assertEqual(len(waits), 3)
+        self.assertGreaterEqual(waits[1], 0.18)
+        self.assertGreaterEqual(waits[2], 0.36)
+        self.assertGreater(waits[2], waits[1])
+
+    def testRetryAfter(self):
+        with StubServer(failingResponder([429], headers={'Retry-After': '1'})) as server:
+            response = Fetcher(rate=0, retries=1, backoff=0).get(server.url('/page'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(gaps(server)[0], 0.9)
+
+class RateLimitTest(unittest.TestCase):
+    def testRate(self):
+        with StubServer(failingResponder([])) as server:
+            list(Fetcher(workers=4, rate=10).getMany([server.url('/page/%d' % i) for i in range(6)]))
+        waits = gaps(server)
+        self.assertEqual(len(server.requests), 6)
+        self.assertGreaterEqual(sum(waits), 0.45)
+        self.assertTrue(all(wait >= 0.08 for wait in waits), waits)
+
+    # Retries are sent by urllib3, but still wait for the rate limiter
+    def testRetriesAreLimited(self):
+        with StubServer(failingResponder([503, 503])) as server:
+            Fetcher(rate=5, retries=2, backoff=0).get(server.url('/page'))
+        waits = gaps(server)
+        self.assertEqual(len(waits), 2)
+        self.assertTrue(all(wait >= 0.18 for wait in waits), waits)
+
+class LimitsTest(unittest.TestCase):
+    def testMaxBytes(self):
+        with StubServer(lambda handler: sendResponse(handler, 'x' * 5000)) as server:
+            fetcher = Fetcher(rate=0, retries=0, max_bytes=1000)
+            with self.assertRaises(ResponseTooLarge):
+                fetcher.get(server.url('/large'))
+            with self.assertRaises(ResponseTooLarge):
+                list(fetcher.stream(server.url('/large')))
+
+    # A response that keeps trickling in is cut off at the deadline
+    def testDeadline(self):
+        with StubServer(lambda handler: sendResponse(handler, 'x' * 1000, trickle=0.3)) as server:
+            start = time.time()
+            with self.assertRaises(requests.Timeout):
+                Fetcher(rate=0, retries=0, timeout=(1, 1), deadline=1).get(server.url('/slow'))
+        self.assertLess(time.time() - start, 2)
+
+    # Requests sharing a time to be done by: the one running at that time times out, and those that would start after
+    # it aren't sent at all
+    def testExpires(self):
+        with StubServer(lambda handler: sendResponse(handler, 'done', delay=0.5)) as server:
+            start = time.time()
+            results = list(Fetcher(workers=1, rate=0, retries=0).getMany([server.url('/page/%d' % i) for i in range(5)], return_exceptions=True, expires=start + 1.2))
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(results[0].text, 'done')
+        self.assertIsInstance(results[2], requests.RequestException)
+        self.assertTrue(all(isinstance(result, requests.Timeout) for result in results[3:]), results)
+        self.assertEqual(len(server.requests), 3)
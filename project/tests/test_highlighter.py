@@ -0,0 +1,53 @@
+# test_highlighter.py
+# Natural Language Processing
+
+# Tests that the marked spans of an article are the n-grams that explain its label
+
+import unittest
+
+from project import compactmodel
+from project import featurizer
+from project import highlighter
+from project import scorer
+from project import training
+
+# Bigram limits low enough to keep every n-gram of these short texts
+limits = dict(word_mincount=1, word_maxcount=100, bigram_mincount=1)
+
+training_texts = [
+    ('the company was founded in a leading provider of award winning solutions', 'Bad'),
+    ('founded in the city the leading provider of innovative solutions', 'Bad'),
+    ('the moon orbits the earth and the river runs to the sea', 'Good'),
+    ('the river basin and the moon landing were in the century', 'Good'),
+]
+
+text = 'the river company was founded in the leading provider of river basin <b> solutions'
+
+class HighlightTest(unittest.TestCase):
+    def testExplainedNgrams(self):
+        featuresets = [(featurizer.articleFeatures(article, [2], **limits), label) for article, label in training_texts]
+        model = compactmodel.fromClassifier(training.train('bayes', featuresets))
+        featureset = featurizer.articleFeatures(text, [2], **limits)
+        probabilities, explanation = scorer.explainedProbabilities(model, [featureset])[0]
+        weights = dict((feature['feature'], ('Bad', feature['contribution'])) for feature in explanation)
+        self.assertIn('founded in', weights)
+
+        spans = highlighter.ngramSpans(text, weights, [2])
+        # Every span is an explained n-gram, and every explained n-gram is marked as often as the article has it
+        for start, end, ngram, label, weight in spans:
+            self.assertEqual(text[start:end], ngram)
+            self.assertEqual(weights[ngram][1], weight)
+        for feature in explanation:
+            self.assertEqual(sum(1 for span in spans if span[2] == feature['feature']), feature['value'])
+
+    def testMarkText(self):
+        weights = {'the river': ('Good', 1.5), 'river basin': ('Good', 0.5), 'founded in': ('Bad', 2.0)}
+        marked = highlighter.markText(text, highlighter.ngramSpans(text, weights, [2]))
+        self.assertTrue(marked.startswith('<mark title="Good +1.500">the river</mark> company was <mark title="Bad +2.000">founded in</mark>'))
+        # Overlapping n-grams are marked once, and the text around them is escaped
+        self.assertIn('of <mark title="Good +0.500">river basin</mark> &lt;b&gt; solutions', marked)
+
+    def testHashedNgrams(self):
+        name = featurizer.bucketName(featurizer.bucket('founded in', 8))
+        spans = highlighter.ngramSpans(text, {name: ('Bad', 1.0)}, [2], hash_bits=8)
+        self.assertIn((text.index('founded in'), text.index('founded in') + len('founded in'), name, 'Bad', 1.0), spans)
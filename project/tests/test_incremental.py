@@ -0,0 +1,99 @@
+# test_incremental.py
+# Natural Language Processing
+
+# Tests that incremental updates give the model retraining would, and that each run only ingests new category members
+
+import json
+import os
+import tempfile
+import unittest
+from urllib.parse import parse_qs, urlsplit
+
+from project import incremental
+from project import training
+from project.fetcher import Fetcher
+from project.tests.stubserver import StubServer, sendResponse
+
+first_featuresets = [
+    ({'founded in': 3, 'leading provider': 2}, 'Bad'),
+    ({'the river': 2, 'its orbit': 3}, 'Good'),
+    ({'founded in': 1, 'award winning': 2}, 'Bad'),
+]
+second_featuresets = [
+    ({'the river': 1, 'the moon': 2}, 'Good'),
+    ({'award winning': 1, 'its orbit': 1}, 'Bad'),
+    ({'the moon': 3, 'founded in': 1}, 'Good'),
+]
+
+# The category as the categorymembers API lists it: sorted by the time each member was added, from cmstart on
+# Two members were added at the same time, which a run may stop between
+members = [
+    {'pageid': 10, 'title': 'A', 'timestamp': '2017-11-01T00:00:00Z'},
+    {'pageid': 11, 'title': 'B', 'timestamp': '2017-11-02T00:00:00Z'},
+    {'pageid': 12, 'title': 'C', 'timestamp': '2017-11-02T00:00:00Z'},
+    {'pageid': 13, 'title': 'D', 'timestamp': '2017-11-03T00:00:00Z'},
+    {'pageid': 14, 'title': 'E', 'timestamp': '2017-11-04T00:00:00Z'},
+]
+
+def listMembers(handler):
+    query = parse_qs(urlsplit(handler.path).query)
+    start = query.get('cmstart', [''])[0]
+    listed = [member for member in members if member['timestamp'] >= start][:int(query['cmlimit'][0])]
+    sendResponse(handler, json.dumps({'query': {'categorymembers': listed}}))
+
+class UpdateTest(unittest.TestCase):
+    # Naive Bayes updated with new articles is the model trained on all of them at once
+    def testBayesUpdate(self):
+        state = incremental.TrainingState('bayes', 2)
+        state.update(first_featuresets)
+        state.update(second_featuresets)
+        updated = state.classifier()
+        retrained = training.train('bayes', first_featuresets + second_featuresets)
+        self.assertEqual(state.version, 2)
+        for featureset, label in first_featuresets + second_featuresets + [({'the moon': 1, 'new n-gram': 1}, None)]:
+            expected = retrained.prob_classify(featureset)
+            probabilities = updated.prob_classify(featureset)
+            for label in expected.samples():
+                self.assertAlmostEqual(probabilities.prob(label), expected.prob(label), places=12)
+
+    def testSaveAndLoad(self):
+        state = incremental.TrainingState('bayes', 2, limits=(1, 60, 2))
+        state.update(first_featuresets)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'state')
+            self.assertIsNone(incremental.loadState(path))
+            state.save(path)
+            loaded = incremental.loadState(path)
+            self.assertEqual(os.listdir(directory), ['state'])
+        self.assertEqual(loaded.settings(), state.settings())
+        self.assertEqual(len(loaded.statistics), len(first_featuresets))
+
+    def testUnsupportedKind(self):
+        with self.assertRaises(ValueError):
+            incremental.TrainingState('decisiontree', 2)
+
+class NewMembersTest(unittest.TestCase):
+    def testNewMembers(self):
+        state = incremental.TrainingState('bayes', 2)
+        with StubServer(listMembers) as server:
+            fetcher = Fetcher(rate=0, retries=0)
+            category_url = server.url('/w/api.php?action=query&list=categorymembers&cmtitle=Category:Test')
+
+            # The first run stops between the two members added at the same time
+            first = state.newMembers(fetcher, category_url, 'Test', 2)
+            self.assertEqual([member['pageid'] for member in first], [10, 11])
+            state.markIngested('Test', first)
+            self.assertEqual(state.categories['Test']['timestamp'], '2017-11-02T00:00:00Z')
+            self.assertEqual(state.categories['Test']['latest'], set([11]))
+
+            # The next one lists from that time again, and skips the member it already has
+            second = state.newMembers(fetcher, category_url, 'Test', 2)
+            self.assertEqual([member['pageid'] for member in second], [12, 13])
+            self.assertIn('cmstart=2017-11-02T00%3A00%3A00Z', server.paths()[-1])
+            state.markIngested('Test', second)
+
+            third = state.newMembers(fetcher, category_url, 'Test', 5)
+            self.assertEqual([member['pageid'] for member in third], [14])
+            state.markIngested('Test', third)
+            self.assertEqual(state.newMembers(fetcher, category_url, 'Test', 5), [])
+        self.assertEqual(len(state), len(members))
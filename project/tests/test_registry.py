@@ -0,0 +1,65 @@
+# test_registry.py
+# Natural Language Processing
+
+# Tests that the registry loads a model file once, and again only when its contents change
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from project import registry
+
+class RegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'model.pickle')
+        self.loads = []
+        registry.clear()
+
+    def tearDown(self):
+        registry.clear()
+        shutil.rmtree(self.directory)
+
+    def write(self, model, mtime):
+        with open(self.path, 'wb') as file:
+            pickle.dump(model, file)
+        os.utime(self.path, (mtime, mtime))
+
+    # Counts the loads, to tell a reload apart from the cached model
+    def loader(self, path):
+        self.loads.append(path)
+        return registry.loadPickle(path)
+
+    def testReloadOnChange(self):
+        self.write({'version': 1}, 1000)
+        first = registry.getModel(self.path, self.loader)
+        first_digest = registry.getDigest(self.path)
+        self.assertEqual(first, {'version': 1})
+        self.assertIs(registry.getModel(self.path, self.loader), first)
+        self.assertEqual(len(self.loads), 1)
+
+        # A new model in the file is loaded, and has a digest of its own
+        self.write({'version': 2}, 2000)
+        second = registry.getModel(self.path, self.loader)
+        self.assertEqual(second, {'version': 2})
+        self.assertEqual(len(self.loads), 2)
+        self.assertNotEqual(registry.getDigest(self.path), first_digest)
+
+    # A file that is only touched, or copied over with the same contents, isn't loaded again
+    def testTouchedFile(self):
+        self.write({'version': 1}, 1000)
+        model = registry.getModel(self.path, self.loader)
+        digest = registry.getDigest(self.path)
+        self.write({'version': 1}, 3000)
+        self.assertIs(registry.getModel(self.path, self.loader), model)
+        self.assertEqual(registry.getDigest(self.path), digest)
+        self.assertEqual(len(self.loads), 1)
+
+    def testClear(self):
+        self.write({'version': 1}, 1000)
+        registry.getModel(self.path, self.loader)
+        registry.clear()
+        registry.getModel(self.path, self.loader)
+        self.assertEqual(len(self.loads), 2)
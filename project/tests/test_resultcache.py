@@ -0,0 +1,30 @@
+# test_resultcache.py
+# Natural Language Processing
+
+import unittest
+
+from project import resultcache
+
+class ArticleKeyTest(unittest.TestCase):
+    def testWikiPath(self):
+        self.assertEqual(resultcache.articleKey('https://en.wikipedia.org/wiki/Moon'), 'en.wikipedia.org/Moon')
+        self.assertEqual(resultcache.articleKey('https://en.m.wikipedia.org/wiki/moon_landing'), 'en.wikipedia.org/Moon landing')
+        self.assertEqual(resultcache.articleKey('https://en.wikipedia.org/wiki/Caf%C3%A9'), 'en.wikipedia.org/Café')
+
+    def testTitleParameter(self):
+        self.assertEqual(resultcache.articleKey('https://en.wikipedia.org/w/index.php?title=Moon'), 'en.wikipedia.org/Moon')
+        self.assertIsNone(resultcache.articleKey('https://en.wikipedia.org/w/index.php?search=Moon'))
+
+    def testFragment(self):
+        self.assertEqual(resultcache.articleKey('https://en.wikipedia.org/wiki/Moon#Orbit'), 'en.wikipedia.org/Moon')
+
+    # Old revisions and diffs aren't the latest revision of the article, so they aren't cached under its title
+    def testOldRevisions(self):
+        self.assertIsNone(resultcache.articleKey('https://en.wikipedia.org/w/index.php?title=Moon&oldid=123'))
+        self.assertIsNone(resultcache.articleKey('https://en.wikipedia.org/wiki/Moon?oldid=123'))
+        self.assertIsNone(resultcache.articleKey('https://en.wikipedia.org/w/index.php?title=Moon&diff=124&oldid=123'))
+        self.assertIsNone(resultcache.articleKey('https://en.wikipedia.org/w/index.php?curid=19331'))
+
+    def testSpecialPages(self):
+        self.assertIsNone(resultcache.articleKey('https://en.wikipedia.org/wiki/Special:Random'))
+        self.assertIsNone(resultcache.articleKey('https://en.wikipedia.org/w/index.php?title=special:Search'))
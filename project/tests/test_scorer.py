@@ -0,0 +1,29 @@
+# test_scorer.py
+# Natural Language Processing
+
+# Tests of the explanations the vectorized scorer gives with its probabilities
+
+import unittest
+
+from project import compactmodel
+from project import scorer
+from project import training
+
+featuresets = [
+    ({'founded in': 3, 'leading provider': 2, 'article_length': 5123}, 'Bad'),
+    ({'founded in': 1, 'award winning': 2, 'article_length': 800}, 'Bad'),
+    ({'the river': 2, 'its orbit': 3, 'article_length': 5123}, 'Good'),
+    ({'the river': 1, 'the moon': 2, 'article_length': 2400}, 'Good'),
+]
+
+class ExplanationTest(unittest.TestCase):
+    # Naive Bayes counts article_length like an n-gram, but only n-grams are given as the reasons for a label
+    def testOnlyNgrams(self):
+        for kind in ('bayes', 'maxent'):
+            model = compactmodel.fromClassifier(training.train(kind, featuresets))
+            results = scorer.explainedProbabilities(model, [featureset for featureset, label in featuresets])
+            for (probabilities, explanation), expected in zip(results, scorer.probabilities(model, [featureset for featureset, label in featuresets])):
+                self.assertEqual(probabilities, expected)
+                names = [feature['feature'] for feature in explanation]
+                self.assertTrue(names, kind)
+                self.assertNotIn('article_length', names)
@@ -0,0 +1,111 @@
+# test_trainer.py
+# Natural Language Processing
+
+# Smoke tests of trainer.py's modes, run as a script on a small corpus file built from the benchmark fixture pages,
+# with --from-cache so nothing is downloaded
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from project import benchmark
+from project import cleaner
+from project import extractor
+from project import registry
+from project.corpus import Corpus
+
+root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Store the fixture pages in a corpus file, as members of the categories trainer.py takes each label from
+# Returns the number of articles of each label
+def buildCorpus(path):
+    corpus = Corpus(path)
+    members = {}
+    for pageid, (page, label) in enumerate(benchmark.loadFixtures(os.path.join(root, benchmark.fixture_directory)), 1):
+        html = page.decode('utf-8')
+        corpus.store(pageid, 1, html, cleaner.cleanArticle(extractor.contentText(html)), extractor.version)
+        members.setdefault(label, []).append(pageid)
+    for label, pageids in members.items():
+        corpus.setCategoryMembers(benchmark.corpus_categories[label], pageids)
+    corpus.close()
+    return min(len(pageids) for pageids in members.values())
+
+class TrainerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.corpus = os.path.join(self.directory, 'corpus.sqlite3')
+        self.size = buildCorpus(self.corpus)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # Run trainer.py in the temporary directory, so the models are saved there; returns its output
+    def runTrainer(self, *arguments, returncode=0):
+        environment = dict(os.environ, PYTHONPATH=root)
+        command = [sys.executable, os.path.join(root, 'trainer.py')] + list(arguments) + ['--from-cache', '--cache', self.corpus]
+        process = subprocess.run(command, cwd=self.directory, env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        self.assertEqual(process.returncode, returncode, process.stdout)
+        return process.stdout
+
+    def modelPath(self, name):
+        return os.path.join(self.directory, name)
+
+    def testSplit(self):
+        output = self.runTrainer('1', str(self.size), 'bayes', '--compact')
+        self.assertIn('Final accuracy', output)
+        self.assertTrue(os.path.exists(self.modelPath('bayes_1gram%d.pickle' % self.size)))
+        self.assertTrue(os.path.exists(self.modelPath('bayes_1gram%d.model' % self.size)))
+
+        # The models record the extractor version of their training texts
+        for extension in ('.pickle', '.model'):
+            self.assertEqual(registry.textVersion(self.modelPath('bayes_1gram%d' % self.size + extension)), extractor.version)
+
+    def testDecisionTree(self):
+        output = self.runTrainer('2', str(self.size), 'decisiontree', '--compact')
+        self.assertIn('Final accuracy', output)
+        self.assertIn("can't be saved in the compact format", output)
+
+    def testFolds(self):
+        output = self.runTrainer('1', str(self.size), 'maxent', '--folds', '2', '--workers', '2')
+        self.assertIn('2-fold cross-validation', output)
+        self.assertNotIn('Final accuracy', output)
+
+    def testBadFolds(self):
+        for folds in ('1', '0'):
+            output = self.runTrainer('1', str(self.size), 'bayes', '--folds', folds, returncode=2)
+            self.assertIn('--folds must be at least 2', output)
+        output = self.runTrainer('1', str(self.size), 'bayes', '--folds', str(2 * self.size + 1), returncode=1)
+        self.assertIn('Error - Cannot split', output)
+
+    def testFoldsWithVocabulary(self):
+        output = self.runTrainer('2', str(self.size), 'bayes', '--folds', '2', '--vocabulary-size', '50')
+        self.assertIn('2-fold cross-validation', output)
+        self.assertIn('Keeping ', output)
+        self.assertTrue(os.path.exists(self.modelPath('bayes_2gram%d.vocab' % self.size)))
+
+    def testVocabulary(self):
+        output = self.runTrainer('1', str(self.size), 'maxent', '--vocabulary-size', '50', '--min-df', '2', '--selection', 'ig', '--compact')
+        self.assertIn('Final accuracy', output)
+        self.assertTrue(os.path.exists(self.modelPath('maxent_1gram%d.vocab' % self.size)))
+
+    # A model trained again without --vocabulary-size loses the vocabulary of the earlier one
+    def testStaleVocabulary(self):
+        self.runTrainer('1', str(self.size), 'bayes', '--vocabulary-size', '20')
+        vocabulary_file = self.modelPath('bayes_1gram%d.vocab' % self.size)
+        self.assertTrue(os.path.exists(vocabulary_file))
+        self.runTrainer('1', str(self.size), 'bayes')
+        self.assertFalse(os.path.exists(vocabulary_file))
+
+    def testMissingArticles(self):
+        output = self.runTrainer('1', str(self.size + 1), 'bayes', returncode=1)
+        self.assertIn('run without --from-cache to download more', output)
+
+    def testIncrementalNeedsNetwork(self):
+        environment = dict(os.environ, PYTHONPATH=root)
+        command = [sys.executable, os.path.join(root, 'trainer.py'), '1', '2', 'bayes', '--incremental', 'state.pickle', '--from-cache', '--cache', self.corpus]
+        process = subprocess.run(command, cwd=self.directory, env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        self.assertEqual(process.returncode, 1)
+        self.assertIn('--incremental needs network access', process.stdout)
@@ -0,0 +1,58 @@
+# test_training.py
+# Natural Language Processing
+
+# Tests that the streamed Naive Bayes counts give NLTK's model, and that the sparse featuresets give back what was put in
+
+import unittest
+
+import nltk
+
+from project import training
+
+featuresets = [
+    ({'founded in': 3, 'leading provider': 2, 'article_length': 5123}, 'Bad'),
+    ({'founded in': 1, 'award winning': 2, 'article_length': 800}, 'Bad'),
+    ({'award winning': 1, 'leading provider': 1, 'article_length': 2400}, 'Bad'),
+    ({'the river': 2, 'its orbit': 3, 'article_length': 5123}, 'Good'),
+    ({'the river': 1, 'the moon': 2, 'article_length': 2400}, 'Good'),
+]
+
+# Featuresets to classify: the training ones, others with values and names never seen in training, and an empty one
+articles = [featureset for featureset, label in featuresets] + [
+    {'founded in': 7, 'the moon': 1, 'article_length': 5123},
+    {'its orbit': 3, 'never seen': 4},
+    {},
+]
+
+class NaiveBayesCountsTest(unittest.TestCase):
+    def assertSameModel(self, classifier, expected):
+        self.assertEqual(sorted(classifier.labels()), sorted(expected.labels()))
+        for featureset in articles:
+            probabilities = classifier.prob_classify(featureset)
+            reference = expected.prob_classify(featureset)
+            for label in expected.labels():
+                self.assertAlmostEqual(probabilities.prob(label), reference.prob(label), places=12)
+
+    def testSameAsNltk(self):
+        counts = training.NaiveBayesCounts()
+        for featureset, label in featuresets:
+            counts.add(featureset, label)
+        self.assertEqual(len(counts), len(featuresets))
+        self.assertSameModel(counts.classifier(), nltk.NaiveBayesClassifier.train(featuresets))
+
+    # Building the classifier leaves the counts as they were, so more featuresets can be added afterwards
+    def testAddAfterClassifier(self):
+        counts = training.NaiveBayesCounts()
+        for featureset, label in featuresets[:3]:
+            counts.add(featureset, label)
+        self.assertSameModel(counts.classifier(), nltk.NaiveBayesClassifier.train(featuresets[:3]))
+        for featureset, label in featuresets[3:]:
+            counts.add(featureset, label)
+        self.assertSameModel(counts.classifier(), nltk.NaiveBayesClassifier.train(featuresets))
+
+class SparseFeaturesetsTest(unittest.TestCase):
+    def testRoundTrip(self):
+        data = training.SparseFeaturesets(featuresets)
+        self.assertEqual(len(data), len(featuresets))
+        self.assertEqual(list(data), featuresets)
+        self.assertEqual(list(data.subset([3, 0])), [featuresets[3], featuresets[0]])
@@ -0,0 +1,145 @@
+# test_views.py
+# Natural Language Processing
+
+# Smoke tests of the classify and batch classification views, with the article pages served by a stub server
+
+import json
+import time
+import unittest
+from unittest import mock
+
+from django.test import RequestFactory
+
+from project import benchmark
+from project import registry
+from project import resultcache
+from project import views
+from project.tests.stubserver import StubServer, sendResponse
+
+# A generated article page, as the stub server sends it, saying which revision it is like Wikipedia's pages do
+page = benchmark.samplePages(1)[0][0].replace('</head>', '<script>RLCONF={"wgRevisionId":42};</script></head>')
+
+# The revision API on the stub server, which answers with this revision id
+stub_revision_api = 'http://%s/w/api.php?action=query&prop=revisions&rvprop=ids&format=json&redirects=1&titles='
+revision_body = json.dumps({'query': {'pages': {'1': {'pageid': 1, 'revisions': [{'revid': 42}]}}}})
+
+# Answer the revision API and article pages, each after its own delay
+def wikiResponder(revision_delay=0, page_delay=0, page_trickle=None):
+    def respond(handler):
+        if handler.path.startswith('/w/api.php'):
+            sendResponse(handler, revision_body, delay=revision_delay)
+        else:
+            sendResponse(handler, page, delay=page_delay, trickle=page_trickle)
+    return respond
+
+# The result pages are checked by the template they render and its context, rather than the HTML
+class ClassifyTest(unittest.TestCase):
+    def setUp(self):
+        for name, value in [('revision_api', stub_revision_api), ('render', lambda request, template, context=None: (template, context))]:
+            patcher = mock.patch.object(views, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def classify(self, url, **fields):
+        fields['article'] = url
+        return views.classify(RequestFactory().post('/classify', fields))
+
+    def testClassify(self):
+        with StubServer(wikiResponder()) as server:
+            template, content = self.classify(server.url('/wiki/Classified'))
+            self.assertEqual(template, 'classify.html')
+            self.assertIn('promotional content', content['result'].lower())
+            self.assertIn('Most informative n-grams', content['ngrams'])
+            self.assertIn("id='thetext'", content['articletext'])
+
+            # The same revision is answered from the result cache, without downloading the page again
+            requests = len(server.requests)
+            self.assertEqual(self.classify(server.url('/wiki/Classified')), (template, content))
+            self.assertEqual(len(server.requests), requests)
+
+    # An old revision is classified without the cache, and doesn't change the remembered latest revision
+    def testOldRevision(self):
+        with StubServer(wikiResponder()) as server:
+            template, content = self.classify(server.url('/w/index.php?title=Old_revision&oldid=7'))
+            self.assertEqual(template, 'classify.html')
+            self.assertIsNone(resultcache.getRevision(resultcache.articleKey(server.url('/wiki/Old_revision'))))
+            self.assertFalse(any(path.startswith('/w/api.php') for path in server.paths()))
+
+    def testParagraphs(self):
+        with StubServer(wikiResponder()) as server:
+            template, content = self.classify(server.url('/wiki/Paragraphs'), paragraphs='on')
+        self.assertEqual(template, 'classify.html')
+        self.assertIn('Sections:', content['ngrams'])
+
+    def testBadUrl(self):
+        self.assertEqual(self.classify('not a url')[0], 'error.html')
+
+    # A slow revision lookup is given up on, and the article is still classified
+    def testSlowRevision(self):
+        with StubServer(wikiResponder(revision_delay=5)) as server, mock.patch.object(views, 'revision_timeout', 0.5):
+            start = time.time()
+            template, content = self.classify(server.url('/wiki/Slow_revision'))
+            elapsed = time.time() - start
+        self.assertEqual(template, 'classify.html')
+        self.assertLess(elapsed, 2)
+
+    # The revision lookup and a page that trickles in share one deadline
+    def testSlowUpstream(self):
+        with StubServer(wikiResponder(revision_delay=0.8, page_trickle=0.5)) as server, \
+                mock.patch.object(views, 'revision_timeout', 1), mock.patch.object(views, 'fetch_deadline', 2):
+            start = time.time()
+            template, content = self.classify(server.url('/wiki/Slow_upstream'))
+            elapsed = time.time() - start
+        self.assertEqual(template, 'error.html')
+        self.assertLess(elapsed, 3)
+
+class PageTest(unittest.TestCase):
+    def testIndex(self):
+        with mock.patch.object(views, 'render', lambda request, template, context=None: template):
+            self.assertEqual(views.index(RequestFactory().get('/')), 'index.html')
+            self.assertEqual(views.classify(RequestFactory().get('/classify')), 'index.html')
+
+    def testPreload(self):
+        model = views.preloadModel()
+        self.assertIs(model, registry.getModel(views.model_file))
+        self.assertEqual(set(model.labels()), set(['Good', 'Bad']))
+
+class BatchTest(unittest.TestCase):
+    def classifyBatch(self, body):
+        request = RequestFactory().post('/classify/batch', json.dumps(body), content_type='application/json')
+        response = views.classifyBatch(request)
+        return response.status_code, json.loads(response.content.decode('utf-8'))
+
+    def testTextsAndUrls(self):
+        with StubServer(lambda handler: sendResponse(handler, page)) as server:
+            status, body = self.classifyBatch({'articles': [{'url': server.url('/wiki/Moon')}, {'text': 'The moon orbits the river basin.'}, {}], 'explain': True})
+        self.assertEqual(status, 200)
+        results = body['results']
+        self.assertEqual(len(results), 3)
+        for result in results[:2]:
+            self.assertIn(result['label'], ('Good', 'Bad'))
+            self.assertAlmostEqual(sum(result['probabilities'].values()), 1.0, places=6)
+            self.assertIsInstance(result['explanation'], list)
+        self.assertIn('fetch_ms', results[0]['timings'])
+        self.assertIn('error', results[2])
+
+    def testBadRequests(self):
+        request = RequestFactory().post('/classify/batch', 'not json', content_type='application/json')
+        self.assertEqual(views.classifyBatch(request).status_code, 400)
+        status, body = self.classifyBatch({'articles': [{'text': 'x'}] * (views.batch_max_articles + 1)})
+        self.assertEqual(status, 400)
+        self.assertEqual(views.classifyBatch(RequestFactory().get('/classify/batch')).status_code, 405)
+
+    # Pages that haven't arrived by the batch deadline get an error, and the others are still answered in time
+    def testDeadline(self):
+        def respond(handler):
+            sendResponse(handler, page, delay=3 if handler.path.startswith('/slow') else 0)
+        with StubServer(respond) as server, mock.patch.object(views, 'batch_deadline', 1):
+            start = time.time()
+            status, body = self.classifyBatch({'articles': [{'url': server.url('/wiki/Fast')}] + [{'url': server.url('/slow/%d' % i)} for i in range(20)]})
+            elapsed = time.time() - start
+        self.assertEqual(status, 200)
+        self.assertLess(elapsed, 2.5)
+        self.assertIn('label', body['results'][0])
+        for result in body['results'][1:]:
+            self.assertIn('error', result)
@@ -0,0 +1,73 @@
+# test_vocabulary.py
+# Natural Language Processing
+
+# Tests of the feature selection scores and the vocabulary they select, on a corpus small enough to work out by hand
+
+import math
+import unittest
+
+import numpy
+
+from project import training
+from project import vocabulary
+
+# "x" is only in good articles and "z" only in bad ones, "y" is in one of each, and "w" in one bad article
+featuresets = [
+    ({'x': 1, 'y': 2, 'article_length': 10}, 'Good'),
+    ({'x': 3, 'article_length': 20}, 'Good'),
+    ({'y': 1, 'z': 1, 'article_length': 30}, 'Bad'),
+    ({'z': 2, 'w': 1, 'article_length': 40}, 'Bad'),
+]
+
+class SelectionTest(unittest.TestCase):
+    def setUp(self):
+        self.data = training.SparseFeaturesets(featuresets)
+        self.frequencies, self.labels = vocabulary.documentFrequencies(self.data)
+        self.label_counts = numpy.array([self.data.labels.count(label) for label in self.labels], dtype=numpy.float64)
+
+    def scores(self, scorer):
+        scores = scorer(self.frequencies, self.label_counts)
+        return dict((name, scores[self.data.columns[name]]) for name in ('x', 'y', 'z', 'w'))
+
+    def testDocumentFrequencies(self):
+        self.assertEqual(self.labels, ['Bad', 'Good'])
+        self.assertEqual(list(self.frequencies[self.data.columns['x']]), [0, 2])
+        self.assertEqual(list(self.frequencies[self.data.columns['y']]), [1, 1])
+        self.assertEqual(list(self.frequencies[self.data.columns['w']]), [1, 0])
+
+    # N (AD - BC)^2 / ((A + C)(B + D)(A + B)(C + D)) of each feature's 2x2 table against the label
+    def testChiSquared(self):
+        scores = self.scores(vocabulary.chiSquaredScores)
+        self.assertAlmostEqual(scores['x'], 4.0)
+        self.assertAlmostEqual(scores['z'], 4.0)
+        self.assertAlmostEqual(scores['y'], 0.0)
+        self.assertAlmostEqual(scores['w'], 4.0 * 4 / 12)
+
+    # One bit of label entropy, less what is left once the feature's presence is known
+    def testInformationGain(self):
+        scores = self.scores(vocabulary.informationGainScores)
+        self.assertAlmostEqual(scores['x'], 1.0)
+        self.assertAlmostEqual(scores['z'], 1.0)
+        self.assertAlmostEqual(scores['y'], 0.0)
+        rest = -(2.0 / 3 * math.log(2.0 / 3, 2) + 1.0 / 3 * math.log(1.0 / 3, 2))
+        self.assertAlmostEqual(scores['w'], 1.0 - 0.75 * rest)
+
+    # x and z tie, and are taken in name order; article_length is always kept
+    def testTopFeatures(self):
+        for method in vocabulary.selection_methods:
+            self.assertEqual(vocabulary.selectVocabulary(self.data, 2, method=method), ['article_length', 'x', 'z'])
+            self.assertEqual(vocabulary.selectVocabulary(self.data, 3, method=method), ['article_length', 'w', 'x', 'z'])
+
+    def testMinDf(self):
+        self.assertEqual(vocabulary.selectVocabulary(self.data, min_df=2), ['article_length', 'x', 'y', 'z'])
+        self.assertEqual(vocabulary.selectVocabulary(self.data, 1, min_df=2, method='ig'), ['article_length', 'x'])
+        self.assertEqual(vocabulary.selectVocabulary(self.data, min_df=3), ['article_length'])
+
+    def testUnknownMethod(self):
+        with self.assertRaises(ValueError):
+            vocabulary.selectVocabulary(self.data, 2, method='mi')
+
+    def testRestrict(self):
+        restricted = list(vocabulary.restrictedFeaturesets(featuresets, set(['x'])))
+        self.assertEqual(restricted[0], ({'x': 1, 'article_length': 10}, 'Good'))
+        self.assertEqual(restricted[3], ({'article_length': 40}, 'Bad'))
@@ -0,0 +1,251 @@
+# training.py
+# Natural Language Processing
+
+# Training helpers that let trainer.py stream articles through instead of keeping every article text and featureset
+# in memory at once.
+# Naive Bayes only needs counts, so featuresets are added to the counts one at a time and then dropped.
+# Maxent (and the decision tree) go over the training data many times, so the featuresets are kept, but as a compact
+# sparse matrix - one row per article, with integer columns standing for the feature names - rather than as dicts
+# holding their own copy of every n-gram string. The rows are turned back into featuresets one at a time as the
+# trainer goes over them.
+# Maxent is trained by default as L2-regularized multinomial logistic regression, with SciPy's L-BFGS optimizer on
+# a sparse matrix of the same joint features NLTK uses, instead of by NLTK's pure-Python IIS. Every iteration is a
+# couple of sparse matrix products, so it converges in seconds, and the regularization keeps the weights from
+# overflowing however many features there are.
+
+from array import array
+from collections import defaultdict
+
+import nltk
+import numpy
+from nltk.classify.maxent import BinaryMaxentFeatureEncoding, MaxentClassifier
+from nltk.classify import NaiveBayesClassifier
+from nltk.probability import ELEProbDist, FreqDist
+
+# Naive Bayes counts, added to one featureset at a time
+# classifier() gives the same model as nltk.NaiveBayesClassifier.train on all the added featuresets,
+# and leaves the counts as they were, so more featuresets can be added afterwards
+class NaiveBayesCounts(object):
+    def __init__(self):
+        self.label_freqdist = FreqDist()
+        self.feature_freqdist = defaultdict(FreqDist)
+        self.feature_values = defaultdict(set)
+
+    def add(self, featureset, label):
+        self.label_freqdist[label] += 1
+        for fname, fval in featureset.items():
+            self.feature_freqdist[label, fname][fval] += 1
+            self.feature_values[fname].add(fval)
+
+    def __len__(self):
+        return self.label_freqdist.N()
+
+    def classifier(self, estimator=ELEProbDist):
+        freqdists = dict(self.feature_freqdist)
+        feature_values = dict((fname, set(values)) for fname, values in self.feature_values.items())
+
+        # Featuresets without a feature count as having the value None for it, like in NLTK
+        for label in self.label_freqdist:
+            num_samples = self.label_freqdist[label]
+            for fname in feature_values:
+                freqdist = freqdists.get((label, fname))
+                count = freqdist.N() if freqdist is not None else 0
+                if num_samples - count > 0:
+                    freqdist = freqdist.copy() if freqdist is not None else FreqDist()
+                    freqdist[None] += num_samples - count
+                    freqdists[label, fname] = freqdist
+                    feature_values[fname].add(None)
+
+        label_probdist = estimator(self.label_freqdist)
+        feature_probdist = {}
+        for (label, fname), freqdist in freqdists.items():
+            feature_probdist[label, fname] = estimator(freqdist, bins=len(feature_values[fname]))
+        return NaiveBayesClassifier(label_probdist, feature_probdist)
+
+# Labeled featuresets stored as a sparse matrix in compressed sparse row form
+# Row i's columns are indices[indptr[i]:indptr[i + 1]], with the feature values in the same places in values
+# Feature values must be integers, as they are for n-gram counts
+# Iterating gives back (featureset, label) tuples with the features in their original order, so it can be passed
+# to NLTK's trainers in place of a list
+class SparseFeaturesets(object):
+    def __init__(self, labeled_featuresets=()):
+        self.names = []
+        self.columns = {}
+        self.indptr = array('q', [0])
+        self.indices = array('i')
+        self.values = array('q')
+        self.labels = []
+        for featureset, label in labeled_featuresets:
+            self.append(featureset, label)
+
+    def append(self, featureset, label):
+        columns = self.columns
+        names = self.names
+        for fname in featureset:
+            if fname not in columns:
+                columns[fname] = len(names)
+                names.append(fname)
+        self.indices.extend(map(columns.__getitem__, featureset))
+        self.values.extend(featureset.values())
+        self.indptr.append(len(self.indices))
+        self.labels.append(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def featureset(self, row):
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return dict(zip(map(self.names.__getitem__, self.indices[start:end]), self.values[start:end]))
+
+    def __iter__(self):
+        for row, label in enumerate(self.labels):
+            yield self.featureset(row), label
+
+    # The featuresets of some of the rows, in the given order, e.g. the training rows of a cross-validation fold
+    # The rows' slices of the arrays are copied as they are, with no featureset built, and the feature names are
+    # shared with this one, so the subset can't be appended to
+    def subset(self, rows):
+        subset = SparseFeaturesets()
+        subset.names = self.names
+        subset.columns = self.columns
+        for row in rows:
+            start, end = self.indptr[row], self.indptr[row + 1]
+            subset.indices.extend(self.indices[start:end])
+            subset.values.extend(self.values[start:end])
+            subset.indptr.append(len(subset.indices))
+            subset.labels.append(self.labels[row])
+        return subset
+
+# The kinds of classifier trainer.py can train
+classifier_kinds = ['maxent', 'bayes', 'decisiontree']
+
+# The ways to train maxent: L-BFGS (trainMaxent), or NLTK's own trainer
+maxent_backends = ['lbfgs', 'nltk']
+
+# The n-gram count limits (word_mincount, word_maxcount, bigram_mincount) for training a kind of classifier
+# Hack: NLTK's maxent trainer crashes with overflow error if there are too many features...
+# (Not needed with hashing, which caps the number of features, or with the regularized L-BFGS trainer.)
+def featureLimits(kind, hash_bits=None, maxent_backend='lbfgs'):
+    if kind == 'maxent' and maxent_backend == 'nltk' and not hash_bits:
+        return 5, 60, 3
+    return 3, 60, 2
+
+# Train a classifier of one of the classifier_kinds on (featureset, label) tuples, which are only read once
+# SparseFeaturesets are used as they are, without being copied
+# Naive Bayes only needs counts, so each featureset is counted and dropped
+# Maxent and the decision tree go over the training data many times, so the featuresets are kept in a compact sparse matrix
+# max_iter is the most iterations of NLTK's maxent trainer; the L-BFGS trainer runs until it converges
+def train(kind, labeled_featuresets, max_iter=15, maxent_backend='lbfgs', l2=1.0):
+    if kind in ('maxent', 'decisiontree') and not isinstance(labeled_featuresets, SparseFeaturesets):
+        labeled_featuresets = SparseFeaturesets(labeled_featuresets)
+    if kind == 'maxent' and maxent_backend == 'lbfgs':
+        return trainMaxent(labeled_featuresets, l2)
+    if kind == 'maxent':
+        return nltk.MaxentClassifier.train(labeled_featuresets, max_iter=max_iter)
+    if kind == 'bayes':
+        counts = NaiveBayesCounts()
+        for featureset, label in labeled_featuresets:
+            counts.add(featureset, label)
+        return counts.classifier()
+    if kind == 'decisiontree':
+        return nltk.DecisionTreeClassifier.train(labeled_featuresets)
+    raise ValueError('Unrecognized classifier ' + repr(kind) + ', use one of ' + ', '.join(classifier_kinds))
+
+# Feature values are offset by this much in the pair keys, so that they are never negative
+value_bias = 2 ** 31
+
+# The (feature name, feature value) pairs of SparseFeaturesets as a sparse 0/1 matrix, one column per distinct pair
+# Returns the matrix and the names and values of its columns
+def pairMatrix(data):
+    from scipy import sparse
+    indices = numpy.frombuffer(data.indices, dtype=numpy.int32).astype(numpy.int64) if len(data.indices) else numpy.zeros(0, dtype=numpy.int64)
+    values = numpy.frombuffer(data.values, dtype=numpy.int64) if len(data.values) else numpy.zeros(0, dtype=numpy.int64)
+    if len(values) and (values.min() <= -value_bias or values.max() >= value_bias):
+        raise ValueError('Maxent training only supports 32-bit integer feature values')
+    pair_keys, columns = numpy.unique((indices << 32) | (values + value_bias), return_inverse=True)
+    matrix = sparse.csr_matrix((numpy.ones(len(columns)), columns.ravel(), numpy.frombuffer(data.indptr, dtype=numpy.int64)), shape=(len(data), len(pair_keys)))
+    pairs = [(data.names[int(key >> 32)], int(key & 0xffffffff) - value_bias) for key in pair_keys]
+    return matrix, pairs
+
+# Train a maxent classifier by L2-regularized multinomial logistic regression, with SciPy's L-BFGS
+# Like NLTK's maxent, each (feature name, feature value, label) is a joint feature with its own weight, and each
+# label gets an always-on weight (its bias, which isn't regularized)
+# l2 is the strength of the regularization: the loss is the negative log likelihood plus l2 / 2 times the sum of
+# the squared weights
+# With a previous maxent classifier, the weights are instead pulled towards its weights (l2 / 2 times the sum of the
+# squared differences), starting from them: the previous model acts as a prior, so it is updated with new data in
+# time proportional to the new data. Its weights for features the new data doesn't have are kept as they were.
+# Returns an nltk.MaxentClassifier, so the model is pickled, converted to a compact model and scored like one
+# trained by NLTK
+def trainMaxent(data, l2=1.0, max_iter=500, previous=None):
+    from scipy import optimize
+
+    previous_weights = {}
+    previous_bias = {}
+    if previous is not None:
+        previous_weights, previous_bias = maxentWeights(previous)
+    labels = sorted(set(data.labels) | set(previous_bias))
+    matrix, pairs = pairMatrix(data)
+    label_index = dict((label, i) for i, label in enumerate(labels))
+    targets = numpy.zeros((len(data), len(labels)))
+    targets[numpy.arange(len(data)), [label_index[label] for label in data.labels]] = 1
+    shape = (len(pairs), len(labels))
+    transposed = matrix.T.tocsr()
+
+    center = numpy.zeros(shape)
+    for row, (fname, fval) in enumerate(pairs):
+        for column, label in enumerate(labels):
+            center[row, column] = previous_weights.get((fname, fval, label), 0.0)
+    bias = numpy.array([previous_bias.get(label, 0.0) for label in labels])
+
+    def loss(parameters):
+        weights = parameters[:-len(labels)].reshape(shape)
+        scores = matrix.dot(weights) + parameters[-len(labels):]
+        scores -= scores.max(axis=1, keepdims=True)
+        log_probabilities = scores - numpy.log(numpy.exp(scores).sum(axis=1, keepdims=True))
+        errors = numpy.exp(log_probabilities) - targets
+        difference = weights - center
+        value = -(log_probabilities * targets).sum() + 0.5 * l2 * (difference * difference).sum()
+        gradient = numpy.concatenate([(transposed.dot(errors) + l2 * difference).ravel(), errors.sum(axis=0)])
+        return value, gradient
+
+    result = optimize.minimize(loss, numpy.concatenate([center.ravel(), bias]), jac=True, method='L-BFGS-B', options={'maxiter': max_iter})
+    weights = result.x[:-len(labels)].reshape(shape)
+
+    # Joint feature ids are laid out like the weights: pair by pair, one per label, then the previous model's
+    # features the new data doesn't have, then the always-on features
+    mapping = {}
+    values = []
+    for row, (fname, fval) in enumerate(pairs):
+        for column, label in enumerate(labels):
+            mapping[fname, fval, label] = len(values)
+            values.append(weights[row, column])
+    for joint, weight in previous_weights.items():
+        if joint not in mapping:
+            mapping[joint] = len(values)
+            values.append(weight)
+    encoding = BinaryMaxentFeatureEncoding(labels, mapping, alwayson_features=True)
+    return MaxentClassifier(encoding, numpy.concatenate([values, result.x[-len(labels):]]))
+
+# The weights of a maxent classifier, as a dict keyed by (feature name, feature value, label), and its always-on
+# weight (bias) per label
+# Only classifiers with NLTK's binary feature encoding can be updated - not GIS models, or ones with unseen-value features
+def maxentWeights(classifier):
+    encoding = classifier._encoding
+    if not isinstance(encoding, BinaryMaxentFeatureEncoding) or hasattr(encoding, '_C') or getattr(encoding, '_unseen', None) or not classifier._logarithmic:
+        raise ValueError('Only maxent models with a binary feature encoding can be updated')
+    weights = classifier._weights
+    joint = dict((key, float(weights[fid])) for key, fid in encoding._mapping.items())
+    bias = dict((label, 0.0) for label in encoding.labels())
+    if encoding._alwayson:
+        bias.update((label, float(weights[fid])) for label, fid in encoding._alwayson.items())
+    return joint, bias
+
+# Fraction of labeled featuresets the classifier gets right, going over them once
+def accuracy(classifier, labeled_featuresets):
+    correct = 0
+    total = 0
+    for featureset, label in labeled_featuresets:
+        correct += classifier.classify(featureset) == label
+        total += 1
+    return float(correct) / total if total else 0.0
@@ -6,44 +6,80 @@
 # Django gets the user's input.
 # Model returns a decision - promotional article or not?
 
-import os
 import requests
-import nltk
-import numpy
-import pickle
-import re
-import sys
-import io
-
-from bs4 import BeautifulSoup
-import xml.etree.ElementTree as et
+import html
+import json
+import time
+from urllib.parse import quote
 
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from project import cleaner
+from project import extractor
+from project import featurizer
+from project import highlighter
+from project import registry
+from project import resultcache
+from project import scorer
+from project import streaming
+from project.compactmodel import CompactClassifier
+from project.fetcher import Fetcher
 
 # This is the model file to use - alter this variable to change to another model file
-model_file = 'maxent_3gram100.pickle'
-
-# Template messages need to be parsed out
-template_message = 'This article contains content that is written like an advertisement. Please help improve it by removing promotional content and inappropriate external links, and by adding encyclopedic content written from a neutral point of view.'
-template_message_part = '(Learn how and when to remove this template message)'
-ad_message = 'This article contains content that is written like an advertisement.'
-date_message = '(November 2017)'
-interesting_template_message = "This article may have been created or edited in return for undisclosed payments, a violation of Wikipedia's terms of use. It may require cleanup to comply with Wikipedia's content policies."
-another_interesting_template_message = "This article reads like a press release or a news article or is entirely based on routine coverage. Please expand this article with properly sourced content to meet Wikipedia's quality standards, event notability guideline, or encyclopedic content policy."
-bio_template_message = "This biographical article is written like a résumé. Please help improve it by revising it to be neutral and encyclopedic."
-multiple_issues = "This article has multiple issues. Please help improve it or discuss these issues on the talk page. "
-autobio_template_message = "This article is an autobiography or has been extensively edited by the subject or by someone connected to the subject."
-yet_another_template_message = "A major contributor to this article appears to have a close connection with its subject."
-catch_all = "This article"
+# Either a pickled model from trainer.py, or a compact .model file (much faster to load)
+model_file = 'maxent_3gram100.model'
 
 # Minimum appearance of bigrams (also trigrams)
 bigram_mincount = 2
 
+# How many of the model's most informative features are shown with each result
+informative_feature_count = 20
+
+# How many of the article's own n-grams are shown with each result, as the reasons for its label
+explanation_count = 20
+
+# Paragraph mode (the "paragraphs" option of the form) scores chunks of about this many words on their own, and
+# stops reading the article once its verdict has this probability, after at least this many words
+paragraph_chunk_words = 150
+paragraph_confidence = 0.99
+paragraph_min_words = 1000
+
+# The most articles one batch classification request may hold, and the most seconds its pages may take to download
+# in all - pages still missing then get an error, so the request is answered well within gunicorn's 30 second timeout
+batch_max_articles = 200
+batch_deadline = 20
+
+# Outbound requests give up after these limits, so that a slow or huge upstream response holds a worker for at most
+# the deadline plus one read timeout
+# They aren't retried either, as a retry (or waiting out a Retry-After header) would hold the worker longer still
+fetch_connect_timeout = 3.05
+fetch_read_timeout = 5
+fetch_deadline = 15
+fetch_max_bytes = 8 * 1024 * 1024
+
+# A classify request looks up the article's latest revision and downloads its page within one fetch_deadline
+# The revision lookup only gets this many seconds of it, and the article is just classified if it takes longer
+revision_timeout = 2
+
+# Gives the latest revision id of an article, given its host and title
+revision_api = 'https://%s/w/api.php?action=query&prop=revisions&rvprop=ids&format=json&redirects=1&titles='
+
+# All outbound requests go through one client per worker process, which keeps its connections alive between requests
+# Batch requests download several articles at a time through it
+# It has no rate limit: each request only waits on its own downloads, and a limit per worker process wouldn't bound
+# the site's total rate anyway
+http_client = Fetcher(workers=8, rate=0, retries=0, timeout=(fetch_connect_timeout, fetch_read_timeout), max_bytes=fetch_max_bytes, deadline=fetch_deadline)
+
+# Load the model before any request comes in
+# Called from wsgi.py, so with gunicorn --preload the model (and its vocabulary) is loaded once and shared by all forked workers
+def preloadModel():
+    registry.getVocabulary(model_file)
+    return registry.preload(model_file)
+
 # Main view - index.html
 def index(request):
-    r = requests.get('http://httpbin.org/status/418')
-    print(r.text)
     return render(request, 'index.html')
 
 # POST /classify route performs the classification
@@ -56,55 +92,68 @@ def classify(request):
         # URL must contain http (or https) to be valid
         if "http" in article:
 
-            # Load the previously trained model
-            file = open(model_file, 'rb')
-            classifier = pickle.load(file)
-            file.close()
+            # The revision lookup and the download of the page share one deadline
+            expires = time.time() + fetch_deadline
+
+            # Get the previously trained model - it is only loaded from disk once per worker process
+            classifier = registry.getModel(model_file)
+            model_version = registry.getDigest(model_file)
+
+            # Paragraph mode classifies the article as it is downloaded, and shows a verdict for each part of it
+            if request.POST.get('paragraphs'):
+                try:
+                    finalres = classifyArticleParagraphs(classifier, article)
+                except (requests.RequestException, ValueError):
+                    return render(request, 'error.html', {})
+                return render(request, 'classify.html', paragraphResults(classifier, article, finalres))
+
+            # An article already classified in its latest revision (by the same model) is answered from the result cache
+            article_key = resultcache.articleKey(article)
+            if article_key is not None:
+                revid = resultcache.getRevision(article_key)
+                if revid is None:
+                    revid = latestRevision(article_key, min(expires, time.time() + revision_timeout))
+                    if revid is not None:
+                        resultcache.setRevision(article_key, revid)
+                if revid is not None:
+                    cached = resultcache.getResult(model_version, article_key, revid)
+                    if cached is not None:
+                        return render(request, 'classify.html', {'result': resultHeader(article, cached["label"]), 'ngrams': cached["ngrams"], 'articletext': cached["articletext"]})
 
             # Classify new article
-            finalres = classifyArticle(classifier,article);
+            # If the page can't be downloaded in time (or isn't an article), render the error page
+            try:
+                finalres = classifyArticle(classifier,article,explain=True,expires=expires);
+            except (requests.RequestException, ValueError):
+                return render(request, 'error.html', {})
             
             # Build output HTML
-            res = ""
-            if finalres["label"].strip() == 'Good':
-                res = article + " <br /> <span style='color:green'>" + finalres["label"] + " - No promotional content detected.</span>"
-            else:
-                res = article + " <br /> <span style='color:red'>" + finalres["label"] + " - Promotional content detected.</span>"
-            marked_article = "<div id='thetext'>" + finalres["article"] + "</div>"
+            res = resultHeader(article, finalres["label"])
             ngrams = "<h3>Most informative n-grams:</h3> <br />"
-            best_features = ""
-
-            # Bayesian classifiers return most informative features
-            if 'bayes' in model_file:
-                best_features = classifier.most_informative_features(20)
-                for ngram in best_features:
-                    marked_article = marked_article.replace(ngram[0], '<mark>' + ngram[0] + '</mark>')
-                    ngrams += str(ngram[0]) + " = " + str(ngram[1]) + "<br />"
-            
-            # Maxent classifiers only PRINT the informative features, not return them
-            # Have to redirect stdout in order to capture the information
-            else:
-                oldout = sys.stdout
-                stream = io.StringIO()
-                sys.stdout = stream
-                classifier.show_most_informative_features(20)
-                sys.stdout = oldout
-                best_features = str(stream.getvalue())
-                bestfeatures = best_features.split('\n')
-                '''
-                for ngram in bestfeatures:
-                    parts = ngram.split(" ")
-                    word_one = parts[1]
-                    word_two = parts[2]
-                    word_three = parts[3].split("==")[0]
-                    real_ngram = word_one + ' ' + word_two + ' ' + word_three
-                    marked_article = marked_article.replace(real_ngram, '<mark>' + real_ngram + '</mark>')
-                '''
-                # Nice formatting
-                best_features = best_features.replace("'Good'", "'Good'<br />")
-                ngrams += best_features
+
+            # The model's most informative features were ranked when it was exported or loaded, not per request
+            features = informativeFeatures(classifier, informative_feature_count)
+            for feature in features:
+                ngrams += informativeFeatureHtml(feature) + "<br />"
+
+            # The article's own n-grams that decided its label, from the scores of its features
+            explained = explanationFeatures(finalres)
+            if explained:
+                ngrams += "<h3>N-grams that decided this article:</h3> <br />"
+                for feature in explained:
+                    ngrams += explanationFeatureHtml(feature) + "<br />"
+
+            # Mark them all in the article text, in one pass over its words
+            marked_article = "<div id='thetext'>" + highlightArticle(finalres["article"], explained + features) + "</div>"
+            articletext = '<h3>Article text:</h3> <br />' + marked_article
+
+            # Keep the result for the next request for this revision of the article
+            # Only the revisions API says which revision is the latest, so the page's own revid isn't remembered as it
+            if article_key is not None and finalres["revid"] is not None:
+                resultcache.setResult(model_version, article_key, finalres["revid"], {'label': finalres["label"], 'probabilities': finalres["probabilities"], 'ngrams': ngrams, 'articletext': articletext})
+
             # Render the output page
-            return render(request, 'classify.html', {'result': res, 'ngrams': ngrams, 'articletext': '<h3>Article text:</h3> <br />' + marked_article})
+            return render(request, 'classify.html', {'result': res, 'ngrams': ngrams, 'articletext': articletext})
         else:
             # If bad URL, render error page.
             return render(request, 'error.html', {})
@@ -112,117 +161,245 @@ def classify(request):
         # If not POST, just render the main page
         return render(request, 'index.html')
 
-# Function to clean punctuation and Wikipedia template messages and references out of an article text
-def cleanArticle(article):
-    article = article.replace(template_message, '');
-    article = article.replace(ad_message, '');
-    article = article.replace(template_message_part, '');
-    article = article.replace(date_message, '');
-    article = article.replace(interesting_template_message, '');
-    article = article.replace(another_interesting_template_message, '');
-    article = article.replace(bio_template_message, '');
-    article = article.replace(multiple_issues, '');
-    article = article.replace(autobio_template_message, '');
-    article = article.replace(yet_another_template_message, '');
-    article = article.replace(catch_all, '');
-
-    # This is a reference regex. Wikipedia articles contain references in the form of: [1] which need to be removed
-    article = re.sub(r"(\[[0-9]+\])", "", article) 
-    
-    article = article.replace("\n", " ")
-    article = article.replace("\\n", " ")
-    article = article.replace(",", "")
-    article = article.replace(".", "")
-    article = article.replace(";", "")
-    return article
-
-# Constructs a bag of words out of quadgrams
-def findQuadgrams(wordlist):
-    featureset = {}
-    for w in range(0, len(wordlist)-3):
-        word_one = wordlist[w]
-        word_two = wordlist[w+1]
-        word_three = wordlist[w+2]
-        word_four = wordlist[w+3]
-        quadgram = word_one + ' ' + word_two + ' ' + word_three + ' ' + word_four
-        if quadgram in featureset:
-            featureset[quadgram] += 1
-        else:
-            featureset[quadgram] = 1
-    return featureset
-
-# Constructs a bag of words out of trigrams
-def findTrigrams(wordlist):
-    featureset = {}
-    for w in range(0, len(wordlist)-2):
-        word_one = wordlist[w]
-        word_two = wordlist[w+1]
-        word_three = wordlist[w+2]
-        trigram = word_one + ' ' + word_two + ' ' + word_three
-        if trigram in featureset:
-            featureset[trigram] += 1
+# The output of paragraph mode: the article's verdict, the verdict of each of its chunks, and its text with each
+# chunk bordered in the color of its label
+def paragraphResults(classifier, article, result):
+    res = resultHeader(article, result["label"])
+    if not result["complete"]:
+        res += " <br /> (Decided after the first " + str(result["words"]) + " words.)"
+
+    features = informativeFeatures(classifier, informative_feature_count)
+    ngrams = "<h3>Sections:</h3> <br />"
+    marked_article = ""
+    for chunk in result["chunks"]:
+        probability = chunk["probabilities"][chunk["label"]] if chunk["probabilities"] else None
+        ngrams += html.escape("%s (%d words): %s" % (chunk["section"] or "Introduction", chunk["words"], chunk["label"]))
+        ngrams += (" (%.0f%%)" % (100 * probability) if probability is not None else "") + "<br />"
+        color = 'green' if chunk["label"].strip() == 'Good' else 'red'
+        marked_article += "<p style='border-left: 4px solid " + color + "; padding-left: 8px'>" + highlightArticle(chunk["text"], features) + "</p>"
+    ngrams += "<h3>Most informative n-grams:</h3> <br />"
+    for feature in features:
+        ngrams += informativeFeatureHtml(feature) + "<br />"
+    articletext = "<h3>Article text:</h3> <br /><div id='thetext'>" + marked_article + "</div>"
+    return {'result': res, 'ngrams': ngrams, 'articletext': articletext}
+
+# The line at the top of the result page, saying whether promotional content was found
+def resultHeader(article, label):
+    if label.strip() == 'Good':
+        return article + " <br /> <span style='color:green'>" + label + " - No promotional content detected.</span>"
+    return article + " <br /> <span style='color:red'>" + label + " - Promotional content detected.</span>"
+
+# The model's n most informative features, as dicts of feature name, value, label and weight
+# (see CompactClassifier.informativeFeatures), or an empty list for models that don't rank their features
+def informativeFeatures(classifier, n):
+    if isinstance(classifier, CompactClassifier):
+        return classifier.informativeFeatures(n)
+    return []
+
+# One line of the informative feature list, e.g. "2.104 founded in the==1 and label is 'Bad'"
+def informativeFeatureHtml(feature):
+    return html.escape('%.3f %s==%r and label is %r' % (feature['weight'], feature['feature'], feature['value'], feature['label']))
+
+# The explanation of a classification result as features like informativeFeatures gives, each with the label it
+# points to - the result's label or the runner-up - and its contribution to the log odds between them as its weight
+def explanationFeatures(result):
+    if not result["explanation"] or not result["probabilities"] or len(result["probabilities"]) < 2:
+        return []
+    label, runner_up = sorted(result["probabilities"], key=result["probabilities"].get, reverse=True)[:2]
+    return [{'feature': feature['feature'], 'value': feature['value'], 'label': label if feature['contribution'] > 0 else runner_up, 'weight': abs(feature['contribution'])}
+            for feature in result["explanation"] if feature['contribution'] != 0]
+
+# One line of the explanation, e.g. "founded in the (2 times) points to 'Bad' by 1.386"
+def explanationFeatureHtml(feature):
+    return html.escape('%s (%d times) points to %r by %.3f' % (feature['feature'], feature['value'], feature['label'], feature['weight']))
+
+# An article text as HTML, with the n-grams of the given features marked (see project/highlighter.py)
+def highlightArticle(fulltext, features):
+    weights = {}
+    for feature in features:
+        if feature['feature'] not in featurizer.non_ngram_features and feature['feature'] not in weights:
+            weights[feature['feature']] = (feature['label'], feature['weight'])
+    spans = highlighter.ngramSpans(fulltext, weights, [modelNgramSize()], modelHashBits())
+    return highlighter.markText(fulltext, spans)
+
+# Ask Wikipedia for the latest revision id of an article ("host/Title", see resultcache.articleKey)
+# Returns None if the article doesn't exist or Wikipedia can't be reached by expires (see Fetcher.get), in which case
+# the article is just classified
+def latestRevision(article_key, expires=None):
+    host, title = article_key.split('/', 1)
+    try:
+        response = http_client.get(revision_api % host + quote(title), expires)
+        pages = response.json()['query']['pages']
+    except (requests.RequestException, ValueError, KeyError):
+        return None
+    for page in pages.values():
+        if 'revisions' in page:
+            return page['revisions'][0]['revid']
+    return None
+
+# POST /classify/batch route classifies many articles at once, in JSON
+# The request body is a list of articles, each given by its URL or by its text:
+# {"articles": [{"url": "https://en.wikipedia.org/wiki/Moon"}, {"text": "The article text..."}]}
+# The response has a result for each article, in the same order - its label, the probability of each label, and
+# how long it took to fetch, to prepare (extract, clean and featurize) and to score - or an error for that article:
+# {"results": [{"url": "...", "label": "Good", "probabilities": {"Bad": 0.1, "Good": 0.9}, "timings": {...}}, ...], "timings": {...}}
+# With "explain": true in the request, each result also has an "explanation": the article's n-grams that decided
+# its label, with their contributions to its log odds (see scorer.explainedProbabilities)
+# The pages are downloaded concurrently, and all the featuresets are scored together as one batch
+@csrf_exempt
+def classifyBatch(request):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        body = json.loads(request.body.decode('utf-8'))
+        articles = body['articles']
+        explain = body.get('explain') is True
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'The request body must be a JSON object with an "articles" list.'}, status=400)
+    if not isinstance(articles, list) or len(articles) > batch_max_articles:
+        return JsonResponse({'error': 'The "articles" list must hold at most ' + str(batch_max_articles) + ' articles.'}, status=400)
+
+    start = time.time()
+    classifier = registry.getModel(model_file)
+    results = []
+    pages = {}
+    urls = []
+    for position, article in enumerate(articles):
+        result = {'timings': {}}
+        if isinstance(article, dict) and isinstance(article.get('url'), str) and article['url'].startswith(('http://', 'https://')):
+            result['url'] = article['url']
+            urls.append(position)
+        elif isinstance(article, dict) and isinstance(article.get('text'), str):
+            pages[position] = None
         else:
-            featureset[trigram] = 1
-    for trigram in list(featureset.keys()):
-        if featureset[trigram] < bigram_mincount:
-            del featureset[trigram]
-    return featureset
-
-# Constructs a bag of words out of bigrams
-def findBigrams(wordlist):
-    featureset = {}
-    for w in range(0, len(wordlist)-1):
-        word_one = wordlist[w]
-        word_two = wordlist[w+1]
-        bigram = word_one + ' ' + word_two
-        if bigram in featureset:
-            featureset[bigram] += 1
+            result['error'] = 'Each article must be an object with an http(s) "url" or a "text".'
+        results.append(result)
+
+    # Download the pages, all within the batch deadline
+    fetch_start = time.time()
+    responses = http_client.getMany([articles[position]['url'] for position in urls], return_exceptions=True, expires=fetch_start + batch_deadline)
+    for position, response in zip(urls, responses):
+        if isinstance(response, Exception):
+            results[position]['error'] = 'Could not download the article: ' + str(response)
         else:
-            featureset[bigram] = 1
-    for bigram in list(featureset.keys()):
-        if featureset[bigram] < bigram_mincount:
-            del featureset[bigram]
-    return featureset
-
-# Constructs a bag of words out of unigrams (single words)
-def findWords(wordlist):
-    featureset = {}
-    for w in range(0, len(wordlist)):
-        word = wordlist[w]
-        if word in featureset:
-            featureset[word] += 1
+            results[position]['timings']['fetch_ms'] = 1000 * response.elapsed.total_seconds()
+            pages[position] = response.content
+    fetch_time = time.time() - fetch_start
+
+    # Extract, clean and featurize each article, the way the model's training articles were
+    prepare_start = time.time()
+    text_version = modelTextVersion()
+    positions = []
+    featuresets = []
+    for position in sorted(pages):
+        item_start = time.time()
+        try:
+            if pages[position] is None:
+                fulltext = extractor.textAs(articles[position]['text'], text_version)
+            else:
+                fulltext = extractor.contentTextAs(pages[position], text_version)
+            featuresets.append(articleFeatureset(cleaner.cleanArticle(fulltext)))
+            positions.append(position)
+        except ValueError as error:
+            results[position]['error'] = str(error)
+        results[position]['timings']['prepare_ms'] = 1000 * (time.time() - item_start)
+    prepare_time = time.time() - prepare_start
+
+    # Score every featureset at once
+    score_start = time.time()
+    for position, (label, probabilities, explanation) in zip(positions, scoreBatch(classifier, featuresets, explain)):
+        results[position]['label'] = label
+        results[position]['probabilities'] = probabilities
+        if explain:
+            results[position]['explanation'] = explanation
+    score_time = time.time() - score_start
+    for position in positions:
+        results[position]['timings']['score_ms'] = 1000 * score_time / len(positions)
+
+    timings = {
+        'fetch_ms': 1000 * fetch_time,
+        'prepare_ms': 1000 * prepare_time,
+        'score_ms': 1000 * score_time,
+        'total_ms': 1000 * (time.time() - start),
+    }
+    return JsonResponse({'model': model_file, 'results': results, 'timings': timings})
+
+# Label, label probabilities (or None, if the model can't give them) and explanation for each of a batch of featuresets
+# Compact maxent and Bayes models score the whole batch at once with the vectorized scorer
+# With explain, they also give the explanation of each label: the explanation_count n-grams of the article that
+# moved its log odds the most (see scorer.explainedProbabilities). Other models give None.
+def scoreBatch(classifier, featuresets, explain=False):
+    if isinstance(classifier, CompactClassifier):
+        if not featuresets:
+            return []
+        if explain:
+            scores = scorer.explainedProbabilities(classifier, featuresets, explanation_count)
         else:
-            featureset[word] = 1
-    for word in list(featureset.keys()):
-        if featureset[word] < word_mincount or featureset[word] > word_maxcount:
-            del featureset[word]
-    return featureset
+            scores = [(probabilities, None) for probabilities in scorer.probabilities(classifier, featuresets)]
+        return [(max(probabilities, key=probabilities.get), probabilities, explanation) for probabilities, explanation in scores]
+    scores = []
+    for featureset in featuresets:
+        try:
+            distribution = classifier.prob_classify(featureset)
+        except NotImplementedError:
+            scores.append((classifier.classify(featureset), None, None))
+            continue
+        scores.append((distribution.max(), dict((label, distribution.prob(label)) for label in distribution.samples()), None))
+    return scores
+
+# The n-gram size the model was trained on, from its filename
+def modelNgramSize():
+    return registry.ngramSize(model_file)
+
+# The number of hash bits the model was trained with, or None if its features aren't hashed
+def modelHashBits():
+    return registry.hashBits(model_file)
+
+# The extractor version of the texts the model was trained on (see extractor.version)
+def modelTextVersion():
+    return registry.textVersion(model_file)
+
+# The model's vocabulary, or None if it was trained on every n-gram
+def modelVocabulary():
+    return registry.getVocabulary(model_file)
+
+# The featureset of a cleaned article text, built the way the model's training articles were
+# N-grams outside the model's vocabulary are left out as they are counted
+def articleFeatureset(fulltext):
+    return featurizer.articleFeatures(fulltext, [modelNgramSize()], bigram_mincount=bigram_mincount, hash_bits=modelHashBits(), vocabulary=modelVocabulary())
 
 # Parse, clean, process and classify a Wikipedia article from URL
-def classifyArticle(classifier,url):
+# With explain, the result also holds the n-grams of the article that decided its label (see scoreBatch)
+# With expires, the page must be downloaded by then (see Fetcher.get)
+def classifyArticle(classifier,url,explain=False,expires=None):
     # Extract and parse the given article
-    full_res = requests.get(url)
-    article_html = et.fromstring(full_res.content)
-    fullarticle = str(full_res.content).encode('utf-8').strip()
-    parsed_html = BeautifulSoup(fullarticle, 'lxml')
-    fulltext = parsed_html.body.find('div', attrs={'class':'mw-content-ltr'}).text
-    fulltext = cleanArticle(fulltext)
-    wordlist = fulltext.split(" ")
+    full_res = http_client.get(url, expires)
+    fulltext = extractor.contentTextAs(full_res.content, modelTextVersion())
+    fulltext = cleaner.cleanArticle(fulltext)
 
     # Construct the appropriate featureset based on which model we're using
-    featureset = {}
-    if '1gram' in model_file:
-        featureset = findWords(wordlist)
-    elif '2gram' in model_file:
-        featureset = findBigrams(wordlist)
-    elif '3gram' in model_file:
-        featureset = findTrigrams(wordlist)
-    else:
-        featureset = findQuadgrams(wordlist)
-    featureset["article_length"] = len(wordlist)
+    featureset = articleFeatureset(fulltext)
     
-    # Return the decision label and the text
+    # Return the decision label, the label probabilities, the explanation, the text and the revision id of the page
+    # Maxent and Bayes models are scored by the vectorized scorer (project/scorer.py), not by NLTK
     package = {}
-    package["label"] = classifier.classify(featureset)
+    package["label"], package["probabilities"], package["explanation"] = scoreBatch(classifier, [featureset], explain)[0]
     package["article"] = fulltext
-    return package
\ No newline at end of file
+    package["revid"] = extractor.pageRevision(full_res.content)
+    return package
+
+# Classify a Wikipedia article from URL paragraph by paragraph, as it is downloaded (see project/streaming.py)
+# Returns the article's label and label probabilities, and those of each chunk of its paragraphs
+def classifyArticleParagraphs(classifier, url):
+    chunks = http_client.stream(url)
+    paragraphs = extractor.contentParagraphs(chunks)
+    text_version = modelTextVersion()
+    texts = ((section, extractor.textAs(text, text_version)) for section, text in paragraphs)
+    try:
+        return streaming.classifyParagraphs(texts, lambda featuresets: scoreBatch(classifier, featuresets), [modelNgramSize()],
+                                            bigram_mincount=bigram_mincount, hash_bits=modelHashBits(), vocabulary=modelVocabulary(), chunk_words=paragraph_chunk_words,
+                                            confidence=paragraph_confidence, min_words=paragraph_min_words)
+    finally:
+        # Stop downloading the rest of the page if the verdict came early
+        paragraphs.close()
+        chunks.close()
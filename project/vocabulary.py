@@ -0,0 +1,114 @@
+# vocabulary.py
+# Natural Language Processing
+
+# Selects the vocabulary of a model from its training corpus, for trainer.py --vocabulary-size.
+# Per-article pruning (featurizer.keptNgrams) only looks at counts within one article, so every article still
+# brings thousands of n-grams of its own. Here the features are ranked over the whole training corpus: those in
+# fewer than min_df articles are dropped, and of the rest the top K by how strongly they tell the labels apart
+# (chi-squared or information gain of their presence in an article) are kept. The model is trained on these
+# features only, so it is smaller, and the vocabulary is saved next to the model file (a .vocab file with the same
+# name). The featurizer then leaves out every n-gram outside the vocabulary as it builds the featuresets of the
+# articles the front-end classifies, which the model would have ignored anyway.
+
+import json
+import os
+
+import numpy
+
+from project import featurizer
+
+# The ways features can be ranked
+selection_methods = ['chi2', 'ig']
+
+# Features that are always kept, whatever their rank
+kept_features = featurizer.non_ngram_features
+
+# The number of articles of each label that have each feature of SparseFeaturesets, as a matrix with a row per
+# feature name and a column per label, and the labels of the columns
+def documentFrequencies(data):
+    labels = sorted(set(data.labels))
+    label_ids = numpy.array([labels.index(label) for label in data.labels], dtype=numpy.int64)
+    indptr = numpy.frombuffer(data.indptr, dtype=numpy.int64)
+    indices = numpy.frombuffer(data.indices, dtype=numpy.int32).astype(numpy.int64) if len(data.indices) else numpy.zeros(0, dtype=numpy.int64)
+
+    # A feature appears at most once in an article's row, so counting its entries counts the articles it is in
+    row_labels = numpy.repeat(label_ids, numpy.diff(indptr))
+    counts = numpy.bincount(indices * len(labels) + row_labels, minlength=len(data.names) * len(labels))
+    return counts.reshape(len(data.names), len(labels)), labels
+
+# Chi-squared statistic of a feature's presence against each label, for document frequencies as above
+# A feature's score is its highest over the labels
+def chiSquaredScores(frequencies, label_counts):
+    total = float(label_counts.sum())
+    present = frequencies.sum(axis=1, keepdims=True).astype(numpy.float64)
+    both = frequencies.astype(numpy.float64)
+    feature_only = present - both
+    label_only = label_counts - both
+    neither = total - present - label_only
+    denominator = (both + label_only) * (feature_only + neither) * (both + feature_only) * (label_only + neither)
+    numerator = total * (both * neither - feature_only * label_only) ** 2
+    scores = numpy.divide(numerator, denominator, out=numpy.zeros_like(numerator), where=denominator > 0)
+    return scores.max(axis=1)
+
+# Entropy, in bits, of each row of a matrix of counts
+def entropy(counts):
+    totals = counts.sum(axis=1, keepdims=True)
+    probabilities = numpy.divide(counts, totals, out=numpy.zeros_like(counts), where=totals > 0)
+    logs = numpy.log2(probabilities, out=numpy.zeros_like(probabilities), where=probabilities > 0)
+    return -(probabilities * logs).sum(axis=1)
+
+# Information gain about the label from knowing whether an article has a feature, for document frequencies as above
+def informationGainScores(frequencies, label_counts):
+    total = float(label_counts.sum())
+    with_feature = frequencies.astype(numpy.float64)
+    without_feature = label_counts - with_feature
+    present = with_feature.sum(axis=1)
+    conditional = (present * entropy(with_feature) + (total - present) * entropy(without_feature)) / total
+    return entropy(label_counts[numpy.newaxis, :].astype(numpy.float64))[0] - conditional
+
+scorers = {'chi2': chiSquaredScores, 'ig': informationGainScores}
+
+# Select the vocabulary of SparseFeaturesets: the size features with the highest scores by method, among those in at
+# least min_df articles, plus kept_features; every feature in min_df articles if size is None
+# Ties are broken by document frequency, then by name, so the same corpus always gives the same vocabulary
+# Returns the feature names, sorted
+def selectVocabulary(data, size=None, min_df=1, method='chi2'):
+    if method not in scorers:
+        raise ValueError('Unrecognized feature selection method ' + repr(method) + ', use one of ' + ', '.join(selection_methods))
+    frequencies, labels = documentFrequencies(data)
+    label_counts = numpy.array([data.labels.count(label) for label in labels], dtype=numpy.float64)
+    scores = scorers[method](frequencies, label_counts)
+    document_counts = frequencies.sum(axis=1)
+
+    candidates = [column for column in numpy.flatnonzero(document_counts >= max(min_df, 1)) if data.names[column] not in kept_features]
+    candidates.sort(key=lambda column: (-scores[column], -document_counts[column], data.names[column]))
+    if size is not None:
+        candidates = candidates[:size]
+    selected = set(data.names[column] for column in candidates)
+    selected.update(name for name in kept_features if name in data.columns)
+    return sorted(selected)
+
+# A featureset without the features outside a vocabulary (a set of feature names)
+def restrict(featureset, vocabulary):
+    return dict((name, value) for name, value in featureset.items() if name in vocabulary or name in kept_features)
+
+# (featureset, label) tuples without the features outside a vocabulary
+def restrictedFeaturesets(labeled_featuresets, vocabulary):
+    for featureset, label in labeled_featuresets:
+        yield restrict(featureset, vocabulary), label
+
+# Filename of the vocabulary of a model file, which is kept next to it
+def vocabularyPath(model_path):
+    return os.path.splitext(model_path)[0] + '.vocab'
+
+# Save a vocabulary, with how it was selected (e.g. the method, size and min_df)
+def writeVocabulary(path, features, selection):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump({'selection': selection, 'features': list(features)}, file, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+# Load a saved vocabulary, as a frozenset of feature names
+def loadVocabulary(path):
+    with open(path, encoding='utf-8') as file:
+        return frozenset(json.load(file)['features'])
@@ -6,16 +6,21 @@
 # Using the module 'pickle', the model is saved in a file for quick use by a Web front-end.
 
 import sys
-import nltk
 import pickle
-import requests
 from random import shuffle
-import io
-
-import xml.etree.ElementTree as et
-import html2text
-from bs4 import BeautifulSoup
-import re
+import os
+import argparse
+
+from project import cleaner
+from project import compactmodel
+from project import crossvalidation
+from project import extractor
+from project import featurizer
+from project import incremental
+from project import training
+from project import vocabulary
+from project.corpus import Corpus
+from project.fetcher import Fetcher
 
 # Gets all article IDs for a category.
 cat_api = 'https://en.wikipedia.org/w/api.php?action=query&list=categorymembers&format=json&cmtitle=Category:';
@@ -23,26 +28,14 @@ cat_api = 'https://en.wikipedia.org/w/api.php?action=query&list=categorymembers&
 # Gets a page by ID
 full_api = 'https://en.wikipedia.org/?curid=';
 
+# Gets the current revision IDs of pages (the page IDs are appended, separated by |)
+rev_api = 'https://en.wikipedia.org/w/api.php?action=query&prop=revisions&rvprop=ids&format=json&pageids=';
+
 # Featured articles were used as "good" examples. These are the best examples available of what a Wikipedia article should be like.
 # The latest marked promotional articles were used as "bad" examples. I used these because older examples might have been already fixed.
 good_article_category = 'Featured articles' 
 bad_article_category = 'Articles with a promotional tone from November 2017'
 
-# The promotional articles already contain these template messages.
-# I parse them out because it would bias the training set to expect these alerts to appear in any random article.
-# Articles in question may not be marked with these template messages, so I remove them from the training input.
-ad_message = 'This article contains content that is written like an advertisement.'
-template_message = 'This article contains content that is written like an advertisement. Please help improve it by removing promotional content and inappropriate external links, and by adding encyclopedic content written from a neutral point of view.'
-template_message_part = '(Learn how and when to remove this template message)'
-date_message = '(November 2017)'
-interesting_template_message = "This article may have been created or edited in return for undisclosed payments, a violation of Wikipedia's terms of use. It may require cleanup to comply with Wikipedia's content policies."
-another_interesting_template_message = "This article reads like a press release or a news article or is entirely based on routine coverage. Please expand this article with properly sourced content to meet Wikipedia's quality standards, event notability guideline, or encyclopedic content policy."
-bio_template_message = "This biographical article is written like a résumé. Please help improve it by revising it to be neutral and encyclopedic."
-multiple_issues = "This article has multiple issues. Please help improve it or discuss these issues on the talk page. "
-autobio_template_message = "This article is an autobiography or has been extensively edited by the subject or by someone connected to the subject."
-yet_another_template_message = "A major contributor to this article appears to have a close connection with its subject."
-catch_all = "This article"
-
 # Capture arguments
 # Example to use Max Entropy classifier, train on 50 articles with bi-grams:
 # python trainer.py 2 50 maxent
@@ -50,14 +43,60 @@ catch_all = "This article"
 # training_set_size can be any number, upper limit being 21,558 (that's how many promotional articles are marked as of right now and may change)
 # the more articles in the training set, the longer training will take
 # classifier_to_use can be "maxent", "bayes", or "decisiontree"
-
-if len(sys.argv) < 3:
-	print('Error - Needs 3 arguments: the n-gram size, number of articles to train on, and the classifier to use - maxent, bayes or decisiontree.')
-	sys.exit()
-
-ngram_size = sys.argv[1]
-training_set_size = sys.argv[2]
-classifier_to_use = sys.argv[3]
+# --compact also saves the model in the compact .model format (maxent and bayes only), which the Web front-end loads much faster
+# --hash-bits K hashes the n-grams into 2^K buckets (e.g. 18), so the model size no longer grows with the vocabulary
+# --fetch-workers N downloads N articles at once (default 8), and --rate R sends at most R requests per second to Wikipedia (default 20)
+# Downloaded articles are kept in a local corpus file (--cache FILE, default corpus.sqlite3), so later runs only download
+# new articles and articles that have been edited since
+# --from-cache trains on the articles already in the corpus file, without any network access
+# --workers N featurizes the articles in N processes (default 1), which speeds up preprocessing of large training sets
+# --maxent-backend picks how maxent is trained: lbfgs (the default, regularized logistic regression with SciPy's L-BFGS,
+# which takes seconds) or nltk (NLTK's own trainer, 15 iterations), and --l2 sets the lbfgs regularization strength
+# --good-category and --bad-category change the categories the examples are taken from
+# --incremental STATE updates a model with only the articles added to the categories since the last update, instead
+# of training it from the start (maxent and bayes only). training_set_size is then the most new articles to take from
+# each category. The state file keeps the model's statistics and the articles already ingested between runs.
+# --folds K reports the accuracy of stratified K-fold cross-validation on all the articles instead of the one fixed
+# split (mean and standard deviation over the folds, and each label's precision and recall), --repeats R repeats it
+# with R different shuffles, and the saved model is then trained on all the articles. The folds are trained in
+# --workers processes.
+# --vocabulary-size K keeps only the K n-grams that best tell the labels apart over the training articles (by --selection
+# chi2 or ig, information gain), among those in at least --min-df N of them. The vocabulary is saved next to the model
+# (a .vocab file), and the front-end leaves out every other n-gram when it featurizes articles.
+
+parser = argparse.ArgumentParser(description='Gets a training set and trains a promotional content model for Wikipedia articles.')
+parser.add_argument('ngram_size', choices=['1', '2', '3', '4'], help='the n-gram size, 1-4')
+parser.add_argument('training_set_size', help='the number of articles to train on')
+parser.add_argument('classifier_to_use', help='the classifier to use - maxent, bayes or decisiontree')
+parser.add_argument('--compact', action='store_true', help='also save the model as a compact .model file')
+parser.add_argument('--hash-bits', type=int, default=None, metavar='K', help='hash n-grams into 2^K feature buckets')
+parser.add_argument('--fetch-workers', type=int, default=8, metavar='N', help='number of articles to download at once')
+parser.add_argument('--rate', type=float, default=20, metavar='R', help='most requests per second to send to Wikipedia')
+parser.add_argument('--cache', default='corpus.sqlite3', metavar='FILE', help='corpus file that keeps downloaded articles')
+parser.add_argument('--workers', type=int, default=1, metavar='N', help='number of processes to featurize articles with')
+parser.add_argument('--from-cache', action='store_true', help='only use articles already in the corpus file, without network access')
+parser.add_argument('--maxent-backend', choices=training.maxent_backends, default='lbfgs', help='how to train maxent models (default lbfgs)')
+parser.add_argument('--l2', type=float, default=1.0, help='L2 regularization strength of the lbfgs maxent trainer (default 1.0)')
+parser.add_argument('--good-category', default=good_article_category, metavar='NAME', help='category of the good examples')
+parser.add_argument('--bad-category', default=bad_article_category, metavar='NAME', help='category of the promotional examples')
+parser.add_argument('--folds', type=int, default=None, metavar='K', help='evaluate with stratified K-fold cross-validation')
+parser.add_argument('--repeats', type=int, default=1, metavar='R', help='repeat the cross-validation with R different shuffles (default 1)')
+parser.add_argument('--vocabulary-size', type=int, default=None, metavar='K', help='only keep the K n-grams that best tell the labels apart')
+parser.add_argument('--min-df', type=int, default=None, metavar='N', help='only keep n-grams that appear in at least N training articles')
+parser.add_argument('--selection', choices=vocabulary.selection_methods, default='chi2', help='how n-grams are ranked for --vocabulary-size (default chi2)')
+parser.add_argument('--incremental', default=None, metavar='STATE', help='update the model kept in this training state file with new category members only')
+args = parser.parse_args()
+if args.folds is not None and args.folds < 2:
+	parser.error('--folds must be at least 2')
+if args.repeats < 1:
+	parser.error('--repeats must be at least 1')
+
+ngram_size = args.ngram_size
+training_set_size = args.training_set_size
+classifier_to_use = args.classifier_to_use
+hash_bits = args.hash_bits
+if hash_bits:
+	sys.stdout.write("Hashing n-grams into " + str(2 ** hash_bits) + " buckets...\n")
 sys.stdout.write("Using " + ngram_size + "-grams, getting " + training_set_size + " articles, and creating a " + classifier_to_use + " model...\n")
 sys.stdout.flush()
  
@@ -66,56 +105,44 @@ accuracy = "";
 
 # To decrease the number of features, I placed limits on the acceptable n-gram count.
 # N-grams that appear too few or too many times are not included in the featureset.
-word_mincount = 3
-word_maxcount = 60
-bigram_mincount = 2
+# (NLTK's maxent trainer gets stricter limits, see training.featureLimits.)
+word_mincount, word_maxcount, bigram_mincount = training.featureLimits(classifier_to_use, hash_bits, args.maxent_backend)
 
-# Hack: maxent crashes with overflow error if there are too many features...
-if classifier_to_use == 'maxent':
-	word_mincount = 5
-	bigram_mincount = 3
+# How the model's vocabulary is selected from the training articles, or None to keep every n-gram
+selection = None
+if args.vocabulary_size or args.min_df:
+	selection = {'size': args.vocabulary_size, 'min_df': args.min_df or 1, 'method': args.selection}
 
 # Function to get an article list. 
 # The arguments:
 # The type of articles to get - "good" or "bad"
 # The total number of articles to get
-# If the request is continuing, add the continue parameter to the next request
-# The current list of articles being built up
-def getArticleList(type, number, continueRequest, articleList):
-	# Which article category to get, and whether or not it's continuing - the request is a URL
-	req = cat_api + bad_article_category
+def getArticleList(type, number):
+	# Which article category to get
+	category = args.bad_category
 	if type == 'good':
-		req = cat_api + good_article_category
-	if continueRequest != "":
-		req += "&cmcontinue=" + continueRequest
-
-	# Perform request to get JSON	
-	res = requests.get(req)
-	members = res.json()['query']['categorymembers']
-	
-	# For each article metadata
-	for x in range(0, len(members)):
+		category = args.good_category
+
+	if args.from_cache:
+		# Use the category members recorded by an earlier run
+		pageids = corpus.categoryMembers(category)[:number]
+		if len(pageids) < number:
+			sys.stdout.write('Error - only ' + str(len(pageids)) + ' ' + type + ' articles are in ' + args.cache + ', run without --from-cache to download more.\n')
+			sys.stdout.flush()
+			sys.exit(1)
+	else:
+		# Get the article metadata - the pageid uniquely references the article so we can get the full text
+		members = fetcher.categoryMembers(cat_api + category, number)
+		pageids = [member['pageid'] for member in members]
+		corpus.setCategoryMembers(category, pageids)
+		updateCorpus(pageids)
+	refreshTexts(pageids)
+
+	# Only the pageids are kept - the texts stay in the corpus until the article is featurized
+	articleList = []
+	for pageid in pageids:
 		datapoint = {}
-
-		# The pageid uniquely references the article so we can get the full text
-		pid = members[x]['pageid']
-		full_req = full_api + str(pid)
-		full_res = requests.get(full_req)
-		
-		
-		#article_html = et.fromstring(full_res.content)
-		
-		# Convert the raw response into html
-		fullarticle = str(full_res.content).encode('utf-8').strip()
-		parsed_html = BeautifulSoup(fullarticle, 'lxml')
-		
-		# Unicode chars are ok as long as you don't print them
-		# Find the content div - this contains the page's content text
-		datapoint["text"] = parsed_html.body.find('div', attrs={'class':'mw-content-ltr'}).text
-
-		# The training examples have already been marked with a message from Wikipedia
-		# We need to remove this message so it is not used as a feature!
-		datapoint["text"] = cleanArticle(datapoint["text"])
+		datapoint["pageid"] = pageid
 		
 		# Set the label
 		if type == 'good':
@@ -125,101 +152,131 @@ def getArticleList(type, number, continueRequest, articleList):
 		
 		# Add to list
 		articleList.append(datapoint)
-	
-	# The Wikipedia API sends chunked responses back to save time
-	# The cmcontinue parameter allows for another request to get more articles that are part of that category
-	# getArticleList continues to call recursively until enough articles are found to train on
-	if len(articleList) < number:
-		getArticleList(type, number, res.json()['continue']['cmcontinue'], articleList)
 
 	return articleList	
 
-# Function to clean punctuation and Wikipedia template messages and references out of an article text
-def cleanArticle(article):
-	article = article.replace(template_message, '');
-	article = article.replace(ad_message, '');
-	article = article.replace(template_message_part, '');
-	article = article.replace(date_message, '');
-	article = article.replace(interesting_template_message, '');
-	article = article.replace(another_interesting_template_message, '');
-	article = article.replace(bio_template_message, '');
-	article = article.replace(multiple_issues, '');
-	article = article.replace(autobio_template_message, '');
-	article = article.replace(yet_another_template_message, '');
-	article = article.replace(catch_all, '');
-
-	# This is a reference regex. Wikipedia articles contain references in the form of: [1] which need to be removed
-	article = re.sub(r"(\[[0-9]+\])", "", article) 
-	
-	article = article.replace("\n", " ")
-	article = article.replace("\\n", " ")
-	article = article.replace(",", "")
-	article = article.replace(".", "")
-	article = article.replace(";", "")
-	return article
-
-
-# Constructs a bag of words out of quadgrams
-def findQuadgrams(wordlist):
-	featureset = {}
-	for w in range(0, len(wordlist)-3):
-		word_one = wordlist[w]
-		word_two = wordlist[w+1]
-		word_three = wordlist[w+2]
-		word_four = wordlist[w+3]
-		quadgram = word_one + ' ' + word_two + ' ' + word_three + ' ' + word_four
-		if quadgram in featureset:
-			featureset[quadgram] += 1
-		else:
-			featureset[quadgram] = 1
-	return featureset
-
-# Constructs a bag of words out of trigrams
-def findTrigrams(wordlist):
-	featureset = {}
-	for w in range(0, len(wordlist)-2):
-		word_one = wordlist[w]
-		word_two = wordlist[w+1]
-		word_three = wordlist[w+2]
-		trigram = word_one + ' ' + word_two + ' ' + word_three
-		if trigram in featureset:
-			featureset[trigram] += 1
-		else:
-			featureset[trigram] = 1
-	for trigram in list(featureset.keys()):
-		if featureset[trigram] < bigram_mincount:
-			del featureset[trigram]
-	return featureset
-
-# Constructs a bag of words out of bigrams
-def findBigrams(wordlist):
-	featureset = {}
-	for w in range(0, len(wordlist)-1):
-		word_one = wordlist[w]
-		word_two = wordlist[w+1]
-		bigram = word_one + ' ' + word_two
-		if bigram in featureset:
-			featureset[bigram] += 1
-		else:
-			featureset[bigram] = 1
-	for bigram in list(featureset.keys()):
-		if featureset[bigram] < bigram_mincount:
-			del featureset[bigram]
-	return featureset
-
-# Constructs a bag of words out of unigrams (single words)
-def findWords(wordlist):
-	featureset = {}
-	for w in range(0, len(wordlist)):
-		word = wordlist[w]
-		if word in featureset:
-			featureset[word] += 1
-		else:
-			featureset[word] = 1
-	for word in list(featureset.keys()):
-		if featureset[word] < word_mincount or featureset[word] > word_maxcount:
-			del featureset[word]
-	return featureset
+# Function to download the articles that aren't in the corpus yet, or have been edited since they were stored
+def updateCorpus(pageids):
+	latest = fetcher.latestRevisions(rev_api, pageids)
+	stale = []
+	for pageid in pageids:
+		stored = corpus.revision(pageid)
+		if stored is None or (pageid in latest and stored != latest[pageid]):
+			stale.append(pageid)
+	if len(stale) < len(pageids):
+		sys.stdout.write(str(len(pageids) - len(stale)) + " articles are already in " + args.cache + "...\n")
+		sys.stdout.flush()
+
+	# The pages are downloaded several at a time, and come back in the same order as the pageids
+	for pageid, full_res in zip(stale, fetcher.getMany([full_api + str(pageid) for pageid in stale])):
+		html = full_res.text
+		corpus.store(pageid, pageRevision(html, latest.get(pageid)), html, articleText(html), extractor.version)
+
+# Function to find the revision ID of a downloaded page
+# Falls back to the revision the API reported, as the page may not say
+def pageRevision(html, default):
+	revid = extractor.pageRevision(html)
+	if revid is None:
+		return default
+	return revid
+
+# Function to get the cleaned text of an article page
+def articleText(html):
+	# Find the content div - this contains the page's content text
+	text = extractor.contentText(html)
+
+	# The training examples have already been marked with a message from Wikipedia
+	# We need to remove this message so it is not used as a feature!
+	return cleaner.cleanArticle(text)
+
+# Function to extract the texts of stored articles again if an older version of the extractor produced them
+# Only the stored HTML is needed, so this works with --from-cache too
+def refreshTexts(pageids):
+	for pageid in pageids:
+		text_version = corpus.textVersion(pageid)
+		if text_version is not None and text_version != extractor.version:
+			article = corpus.article(pageid)
+			corpus.setText(pageid, article["revid"], articleText(article["html"]), extractor.version)
+
+# Generator that reads the articles' texts out of the corpus one at a time, and turns each into a featureset
+# Yields (featureset, label) tuples in the same order as the articles, so only a few article texts are in memory at once
+# With --workers, the featuresets are built by a pool of processes
+def labeledFeaturesets(articles):
+	texts = (corpus.text(article["pageid"]) for article in articles)
+	featuresets = featurizer.articleFeaturesMany(texts, [int(ngram_size)], word_mincount, word_maxcount, bigram_mincount, hash_bits, workers=args.workers)
+	for featureset, article in zip(featuresets, articles):
+		yield featureset, article["label"]
+
+# Articles are downloaded through one shared, rate-limited connection pool, and kept in the corpus file
+fetcher = Fetcher(workers=args.fetch_workers, rate=args.rate)
+corpus = Corpus(args.cache)
+
+# Incremental mode: update the model with the new members of the categories, publish its next version and stop
+if args.incremental:
+	if args.from_cache or selection or classifier_to_use not in incremental.incremental_kinds:
+		sys.stdout.write('Error - --incremental needs network access and a maxent or bayes classifier, and can\'t select a vocabulary.\n')
+		sys.stdout.flush()
+		sys.exit(1)
+	settings = (classifier_to_use, int(ngram_size), hash_bits, (word_mincount, word_maxcount, bigram_mincount))
+	state = incremental.loadState(args.incremental)
+	if state is None:
+		state = incremental.TrainingState(*settings)
+	elif state.settings() != settings:
+		sys.stdout.write('Error - ' + args.incremental + ' holds a model trained with other settings: ' + repr(state.settings()) + '\n')
+		sys.stdout.flush()
+		sys.exit(1)
+
+	# Only the category members that weren't ingested by an earlier run are downloaded
+	new_articles = []
+	new_members = {}
+	for label, category in [('Good', args.good_category), ('Bad', args.bad_category)]:
+		members = state.newMembers(fetcher, cat_api + category, category, int(training_set_size))
+		pageids = [member['pageid'] for member in members]
+		sys.stdout.write(str(len(pageids)) + " new articles in " + category + "...\n")
+		sys.stdout.flush()
+		updateCorpus(pageids)
+		refreshTexts(pageids)
+		new_articles.extend({"pageid": pageid, "label": label} for pageid in pageids)
+		new_members[category] = members
+	if not new_articles:
+		sys.stdout.write("No new articles, version " + str(state.version) + " is up to date.\n")
+		sys.stdout.flush()
+		sys.exit(0)
+	shuffle(new_articles)
+	new_featuresets = list(labeledFeaturesets(new_articles))
+
+	# The new articles haven't been seen by the current version, so they test it before it learns from them
+	previous = state.classifier()
+	if previous is not None:
+		sys.stdout.write("***Accuracy of version " + str(state.version) + " on the new articles: ***\n")
+		sys.stdout.write(str(training.accuracy(previous, new_featuresets)) + "\n")
+		sys.stdout.flush()
+
+	sys.stdout.write("Updating the model with " + str(len(new_featuresets)) + " articles...\n")
+	sys.stdout.flush()
+	state.update(new_featuresets, l2=args.l2)
+	for category, members in new_members.items():
+		state.markIngested(category, members)
+	classifier = state.classifier()
+
+	# The model is replaced in one step, so the front-end picks up the new version on its next request
+	# It records the extractor version of its texts, so the front-end extracts the articles it classifies the same way
+	classifier.text_version = extractor.version
+	model_name = classifier_to_use + '_' + ngram_size + 'gram_incremental'
+	if hash_bits:
+		model_name += '_hash' + str(hash_bits)
+	sys.stdout.write("Saving version " + str(state.version) + " (" + str(len(state)) + " articles) to " + model_name + '.pickle' + "...\n")
+	sys.stdout.flush()
+	incremental.dumpAtomic(classifier, model_name + '.pickle')
+	if args.compact:
+		sys.stdout.write("Saving compact model to " + model_name + '.model' + "...\n")
+		compactmodel.exportClassifier(classifier, model_name + '.model')
+
+	# The state is saved last - if anything failed before, the next run ingests the same articles again
+	state.save(args.incremental)
+	sys.stdout.write("Done!\n")
+	sys.stdout.flush()
+	sys.exit(0)
 
 # Set up training and test sets
 training_data_articles = [] 
@@ -228,10 +285,10 @@ test_data_articles = []
 # Get a mix of good and bad article examples
 sys.stdout.write("Getting some good article examples...\n")
 sys.stdout.flush()
-good_articles = getArticleList('good', int(training_set_size), "", [])
+good_articles = getArticleList('good', int(training_set_size))
 sys.stdout.write("Getting some promotional article examples...\n")
 sys.stdout.flush()
-bad_articles = getArticleList('bad', int(training_set_size), "", [])
+bad_articles = getArticleList('bad', int(training_set_size))
 
 # Here, the training set gets the first half of good articles and the second half of bad articles
 # Likewise, the test set gets the first half of bad articles and the second half of good articles
@@ -255,92 +312,88 @@ for d in range(0, mid):
 shuffle(training_data_articles)
 shuffle(test_data_articles)
 
-# These are the actual data lists
-training_data = []
-test_data = []
-accuracy_test = []
-counter = 0
-
-# Wrangle training articles
-for article in training_data_articles:
-	point = ["", ""];
-	point[0] = article["text"]
-	point[1] = article["label"]
-	training_data.append(point)
-	counter += 1
-
-# Wrangle test articles
-for article in test_data_articles:
-	test_data.append(article["text"])
-	point = ["", ""];
-	point[0] = article["text"]
-	point[1] = article["label"]
-	accuracy_test.append(point)
-	counter += 1
-
-# Convert raw text into feature set
-sys.stdout.write("Processing data...\n")
-sys.stdout.flush()
-for data in training_data:
-	fulltext = data[0]
-	wordlist = fulltext.split(" ")
-	if ngram_size == '4':
-		featureset = findQuadgrams(wordlist)
-	elif ngram_size == '3':
-		featureset = findTrigrams(wordlist)
-	elif ngram_size == '2':
-		featureset = findBigrams(wordlist)
-	else:
-		featureset = findWords(wordlist)
-	featureset["article_length"] = len(wordlist)
-	data[0] = featureset
-
-# Convert test data text into featuresets
-true_test_data = []
-for x in range(0, len(test_data)):
-	fulltext = test_data[x]
-	wordlist = fulltext.split(" ")
-	if ngram_size == '4':
-		featureset = findQuadgrams(wordlist)
-	elif ngram_size == '3':
-		featureset = findTrigrams(wordlist)
-	elif ngram_size == '2':
-		featureset = findBigrams(wordlist)
-	else:
-		featureset = findWords(wordlist)
-	featureset["article_length"] = len(wordlist)
-	true_test_data.append(featureset)
-	accuracy_test[x][0] = featureset	
-
-# Train the classifier
-sys.stdout.write("Training on examples...\n")
+# Convert raw text into feature sets and train the classifier
+# Naive Bayes only needs counts, so each featureset is counted and dropped
+# Maxent and the decision tree go over the training data many times, so the featuresets are kept in a compact sparse matrix
+sys.stdout.write("Processing data and training on examples...\n")
 sys.stdout.flush()
-if classifier_to_use == 'maxent':
-	classifier = nltk.MaxentClassifier.train(training_data, max_iter=15)
-elif classifier_to_use == 'bayes':
-	classifier = nltk.NaiveBayesClassifier.train(training_data)
-elif classifier_to_use == 'decisiontree':
-	classifier = nltk.DecisionTreeClassifier.train(training_data)
-else:
+if classifier_to_use not in training.classifier_kinds:
 	sys.stdout.write('Error - Unrecognized classifier, please use maxent, bayes or decisiontree as the 4th argument.\n')
 	sys.stdout.flush()
 	sys.exit()
+if args.folds:
+	# Every article is featurized once, and each fold trains on a slice of the same sparse matrix
+	all_data = training.SparseFeaturesets(labeledFeaturesets(good_articles + bad_articles))
+	try:
+		results = crossvalidation.crossValidate(all_data, classifier_to_use, args.folds, args.repeats, args.workers, selection=selection, maxent_backend=args.maxent_backend, l2=args.l2)
+	except ValueError as error:
+		sys.stdout.write('Error - ' + str(error) + '.\n')
+		sys.stdout.flush()
+		sys.exit(1)
+	sys.stdout.write("***Cross-validated accuracy is: ***\n")
+	for line in crossvalidation.report(results):
+		sys.stdout.write(line + "\n")
+	sys.stdout.flush()
 
-# Report the accuracy (via test set)
-sys.stdout.write("***Final accuracy is: ***\n")
-sys.stdout.flush()
-sys.stdout.write(str(nltk.classify.accuracy(classifier, accuracy_test)) + "\n")
-sys.stdout.flush()
+	# The saved model learns from all the articles
+	training_data = all_data
+else:
+	training_data = labeledFeaturesets(training_data_articles)
+
+# Fit the vocabulary on the training articles, which then have to be kept to be gone over twice
+model_vocabulary = None
+if selection:
+	training_data = training_data if isinstance(training_data, training.SparseFeaturesets) else training.SparseFeaturesets(training_data)
+	model_vocabulary = vocabulary.selectVocabulary(training_data, **selection)
+	sys.stdout.write("Keeping " + str(len(model_vocabulary)) + " of " + str(len(training_data.names)) + " features...\n")
+	sys.stdout.flush()
+	training_data = vocabulary.restrictedFeaturesets(training_data, frozenset(model_vocabulary))
+classifier = training.train(classifier_to_use, training_data, maxent_backend=args.maxent_backend, l2=args.l2)
+
+if not args.folds:
+	# Report the accuracy (via test set), with the test articles featurized the way the front-end will featurize them
+	test_data = labeledFeaturesets(test_data_articles)
+	if model_vocabulary is not None:
+		test_data = vocabulary.restrictedFeaturesets(test_data, frozenset(model_vocabulary))
+	sys.stdout.write("***Final accuracy is: ***\n")
+	sys.stdout.flush()
+	sys.stdout.write(str(training.accuracy(classifier, test_data)) + "\n")
+	sys.stdout.flush()
 if classifier_to_use != 'decisiontree':
 	sys.stdout.write("***10 best features: ***\n")
 	sys.stdout.flush()
 	classifier.show_most_informative_features(10)
 	
 # Save model for later so we don't have to train it again in the front end
-sys.stdout.write("Saving model to " + classifier_to_use + '_' + ngram_size + 'gram' + training_set_size + '.pickle' + "...\n")
+# The front end reads the n-gram size and hashing from the filename, and the extractor version of the training texts
+# from the model, so that it extracts the articles it classifies the same way
+classifier.text_version = extractor.version
+model_name = classifier_to_use + '_' + ngram_size + 'gram' + training_set_size
+if hash_bits:
+	model_name += '_hash' + str(hash_bits)
+sys.stdout.write("Saving model to " + model_name + '.pickle' + "...\n")
 sys.stdout.flush()
-file = open(classifier_to_use + '_' + ngram_size + 'gram' + training_set_size + '.pickle', 'wb')
+file = open(model_name + '.pickle', 'wb')
 pickle.dump(classifier, file)
 file.close()
+
+# The vocabulary goes next to the model, and a vocabulary left over from an earlier model of the same name is removed
+vocabulary_file = vocabulary.vocabularyPath(model_name + '.pickle')
+if model_vocabulary is not None:
+	sys.stdout.write("Saving vocabulary to " + vocabulary_file + "...\n")
+	sys.stdout.flush()
+	vocabulary.writeVocabulary(vocabulary_file, model_vocabulary, selection)
+elif os.path.exists(vocabulary_file):
+	os.remove(vocabulary_file)
+
+# The compact format only holds maxent and bayes models
+if args.compact:
+	if classifier_to_use == 'decisiontree':
+		sys.stdout.write("Decision tree models can't be saved in the compact format, skipping...\n")
+	else:
+		compact_file = model_name + '.model'
+		sys.stdout.write("Saving compact model to " + compact_file + "...\n")
+		compactmodel.exportClassifier(classifier, compact_file)
+	sys.stdout.flush()
 sys.stdout.write("Done!\n")
 sys.stdout.flush()
\ No newline at end of file